@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+
+"""
+The performance benchmarks of the ELM estimators on the bundled datasets, run with `python -m intelelm.benchmarks`.
+"""
+
+from intelelm.benchmarks.runner import run_benchmarks, compare_results, save_results, load_results
+
+__all__ = ["run_benchmarks", "compare_results", "save_results", "load_results"]
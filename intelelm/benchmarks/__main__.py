@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+"""
+Run the benchmarks, e.g.:
+
+    python -m intelelm.benchmarks --datasets Iris diabetes --hidden-sizes 10 50 --output new.json --compare old.json
+    python -m intelelm.benchmarks --models mha --solvers pinv cholesky --modes swarm batch
+
+It exits with the status 1 if a regression is found by the comparison.
+"""
+
+import sys
+import argparse
+from intelelm.benchmarks.runner import (DEFAULT_DATASETS, SUPPORTED_MODELS, SUPPORTED_BOUNDS, SUPPORTED_MODES, run_benchmarks,
+                                        save_results, load_results, compare_results, print_regressions, print_evals_to_target,
+                                        print_speedups)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m intelelm.benchmarks",
+                                     description="Benchmark the ELM estimators on the bundled datasets.")
+    parser.add_argument("--datasets", nargs="+", default=list(DEFAULT_DATASETS),
+                        help="The names of the datasets, or 'all', 'reg' and 'cls'.")
+    parser.add_argument("--models", nargs="+", default=list(SUPPORTED_MODELS), choices=SUPPORTED_MODELS)
+    parser.add_argument("--hidden-sizes", nargs="+", type=int, default=[10, 50])
+    parser.add_argument("--solvers", nargs="+", default=["pinv"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--pop-size", type=int, default=10)
+    parser.add_argument("--optim", default="BaseGA")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bounds", nargs="+", default=["default"], choices=list(SUPPORTED_BOUNDS),
+                        help="The search bounds of the 'mha' models, several bounds report the evaluations to a target loss.")
+    parser.add_argument("--modes", nargs="+", default=["single"], choices=SUPPORTED_MODES,
+                        help="The modes of fit() of the 'mha' models, several modes report the speedup over the first one.")
+    parser.add_argument("--target-tol", type=float, default=0.01,
+                        help="The relative tolerance of the target loss over the best final loss of the bounds.")
+    parser.add_argument("--output", default="benchmark_results.json", help="The JSON file of the results.")
+    parser.add_argument("--compare", default=None, help="The JSON file of a previous run to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="The relative change flagged as a regression.")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.datasets, args.models, args.hidden_sizes, args.solvers, args.repeats, args.epochs,
+                             args.pop_size, args.optim, args.seed, bounds=args.bounds, modes=args.modes,
+                             target_tol=args.target_tol)
+    print_evals_to_target(results)
+    print_speedups(results)
+    save_results(results, args.output)
+    print(f"Results saved to {args.output}")
+    if args.compare is not None:
+        regressions = compare_results(load_results(args.compare), results, args.threshold)
+        print_regressions(regressions)
+        if regressions:
+            return 1
+        print("No regression found.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
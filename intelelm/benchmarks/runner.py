@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+
+import sys
+import json
+import time
+import platform
+from datetime import datetime, timezone
+import numpy as np
+import scipy
+from sklearn.metrics import accuracy_score, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+import intelelm
+from intelelm.utils.data_loader import get_dataset, list_datasets
+from intelelm.model.standard_elm import ElmRegressor, ElmClassifier
+from intelelm.model.base_elm import BaseMhaElm
+from intelelm.model.mha_elm import MhaElmRegressor, MhaElmClassifier
+
+SUPPORTED_MODELS = ("elm", "mha")
+# The metrics whose relative change is flagged by `compare_results()`, True if higher is better
+COMPARED_METRICS = {"fit_throughput": True, "predict_throughput": True, "fitness_evals_per_second": True,
+                    "peak_memory": False}
+DEFAULT_DATASETS = ("Iris", "BreastCancer", "diabetes", "boston-housing")
+# The search bounds of the "mha" models: "default" is the default lb and ub of fit(), "auto" the data-driven bounds
+SUPPORTED_BOUNDS = {"default": {}, "auto": {"lb": "auto", "ub": "auto"}}
+# The modes of fit() of the "mha" models that run in this process
+SUPPORTED_MODES = ("single", "swarm", "thread", "batch")
+
+
+def get_model(task, model, hidden_size, solver, epochs=5, pop_size=10, optim="BaseGA", seed=42):
+    """
+    Args:
+        task (str): "reg" or "cls".
+        model (str): "elm" (closed-form ELM) or "mha" (metaheuristic-based ELM).
+        hidden_size (int): The number of hidden nodes.
+        solver (str): The solver of the output weights.
+        epochs (int): The number of epochs of the optimizer ("mha" only).
+        pop_size (int): The population size of the optimizer ("mha" only).
+        optim (str): The name of the optimizer ("mha" only).
+        seed (int): The seed of the model.
+
+    Returns:
+        The unfitted estimator.
+    """
+    if model == "elm":
+        estimator = ElmRegressor if task == "reg" else ElmClassifier
+        return estimator(layer_sizes=(hidden_size, ), act_name="elu", seed=seed, solver=solver)
+    if model == "mha":
+        estimator = MhaElmRegressor if task == "reg" else MhaElmClassifier
+        obj_name = "MSE" if task == "reg" else "F1S"
+        return estimator(layer_sizes=(hidden_size, ), act_name="elu", obj_name=obj_name, optim=optim,
+                         optim_paras={"epoch": epochs, "pop_size": pop_size}, seed=seed, solver=solver)
+    raise ValueError(f"model should be one of {SUPPORTED_MODELS}.")
+
+
+def load_dataset(name, test_size=0.2, seed=42):
+    """
+    Load a bundled dataset, split it with a fixed seed and standardize its features.
+
+    Args:
+        name (str): The name of the dataset, see `intelelm.utils.data_loader.list_datasets()`.
+        test_size (float): The fraction of the test set.
+        seed (int): The seed of the split.
+
+    Returns:
+        tuple: The task ("reg" or "cls") and the X_train, X_test, y_train, y_test arrays.
+    """
+    task = "cls" if name in list_datasets()["cls"] else "reg"
+    data = get_dataset(name, verbose=False)
+    X, y = np.asarray(data.X, dtype=float), np.asarray(data.y)
+    stratify = y if task == "cls" and np.unique(y, return_counts=True)[1].min() >= 2 else None
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed, stratify=stratify)
+    scaler = StandardScaler().fit(X_train)
+    return task, scaler.transform(X_train), scaler.transform(X_test), y_train, y_test
+
+
+def benchmark_model(estimator_factory, X_train, y_train, X_test, y_test, task, repeats=3, fit_kwargs=None):
+    """
+    Time the training and the prediction of an estimator.
+
+    The timings are the best of `repeats` runs (the least disturbed by the other processes of the machine). The peak
+    memory is traced by an extra run, because tracemalloc slows down the allocations.
+
+    Args:
+        estimator_factory (callable): Create a new unfitted estimator.
+        X_train, y_train, X_test, y_test (np.ndarray): The data.
+        task (str): "reg" or "cls", the score is R2 or the accuracy on the test set.
+        repeats (int): The number of timed runs.
+        fit_kwargs (dict): The extra parameters of `fit()`.
+
+    Returns:
+        dict: The fit and predict time (seconds) and throughput (samples/second), the peak memory (bytes), the test
+            score, the number of fitness evaluations and their rate, and the loss curve, i.e. the (number of
+            evaluations, best fitness) of each epoch (None for the closed-form ELM).
+    """
+    fit_kwargs = {} if fit_kwargs is None else fit_kwargs
+    fit_times, predict_times, evals, evals_per_second = [], [], None, None
+    for _ in range(repeats):
+        model = estimator_factory()
+        with model.profile(memory=False):
+            start = time.perf_counter()
+            model.fit(X_train, y_train, **fit_kwargs)
+            fit_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            model.predict(X_test)
+            predict_times.append(time.perf_counter() - start)
+        durations = model.profile_report_.durations.get("fitness")
+        if durations:
+            # The "batch" mode records one duration per group of solutions, so the evaluations are counted by the optimizer
+            evals = model.optimizer.nfe_counter
+            rate = evals / max(sum(durations), 1e-12)
+            evals_per_second = rate if evals_per_second is None else max(evals_per_second, rate)
+    model = estimator_factory()
+    loss_curve = None
+    if isinstance(model, BaseMhaElm):
+        loss_curve = []
+        fit_kwargs = {**fit_kwargs, "callbacks": [lambda epoch, logs: loss_curve.append([logs["n_evals"], logs["best_fitness"]])]}
+    with model.profile(memory=True):
+        model.fit(X_train, y_train, **fit_kwargs)
+        model.predict(X_test)
+    peak_memory = max(model.profile_report_.peak_memory.values(), default=None)
+    # sklearn accepts the predicted labels missing from a small test set, unlike the `score()` of the models
+    score_func = r2_score if task == "reg" else accuracy_score
+    score = score_func(y_test, model.predict(X_test))
+    fit_time, predict_time = min(fit_times), min(predict_times)
+    return {"fit_time": fit_time, "predict_time": predict_time,
+            "fit_throughput": len(X_train) / max(fit_time, 1e-12),
+            "predict_throughput": len(X_test) / max(predict_time, 1e-12),
+            "peak_memory": peak_memory, "score": float(score),
+            "fitness_evals": evals, "fitness_evals_per_second": evals_per_second, "loss_curve": loss_curve}
+
+
+def get_evals_to_target(records, minmax="min", tol=0.01):
+    """
+    Set the number of evaluations each record needs to reach the target loss, the best final loss of the records
+    relaxed by the relative tolerance `tol`. The records that never reach it get None (not reached).
+
+    Args:
+        records (list): The records of the same dataset, model, hidden size and solver with different bounds.
+        minmax (str): "min" if a lower loss is better, else "max".
+        tol (float): The relative tolerance of the target over the best final loss.
+    """
+    curves = [record["loss_curve"] for record in records if record.get("loss_curve")]
+    if len(curves) == 0:
+        return
+    finals = [curve[-1][1] for curve in curves]
+    best = min(finals) if minmax == "min" else max(finals)
+    target = best + tol * abs(best) if minmax == "min" else best - tol * abs(best)
+    for record in records:
+        record["target_loss"], record["evals_to_target"] = target, None
+        for n_evals, loss in record.get("loss_curve") or []:
+            if (loss <= target) if minmax == "min" else (loss >= target):
+                record["evals_to_target"] = n_evals
+                break
+
+
+def get_dataset_names(datasets):
+    """
+    Args:
+        datasets (list): The names of the datasets, or "all", "reg" and "cls" for all datasets of a task.
+
+    Returns:
+        list: The names of the datasets.
+    """
+    names = []
+    for name in ([datasets] if isinstance(datasets, str) else datasets):
+        if name == "all":
+            names += list_datasets()["reg"] + list_datasets()["cls"]
+        elif name in ("reg", "cls"):
+            names += list_datasets()[name]
+        else:
+            names.append(name)
+    return names
+
+
+def get_speedups(records):
+    """
+    Set the speedup of the fit time of each record over the first record, e.g. of the "batch" mode over the "swarm" mode.
+
+    Args:
+        records (list): The records of the same dataset, model, hidden size, solver and bounds with different modes.
+    """
+    for record in records:
+        record["speedup"] = records[0]["fit_time"] / max(record["fit_time"], 1e-12)
+
+
+def run_benchmarks(datasets=DEFAULT_DATASETS, models=SUPPORTED_MODELS, hidden_sizes=(10, 50), solvers=("pinv", ),
+                   repeats=3, epochs=5, pop_size=10, optim="BaseGA", seed=42, test_size=0.2, bounds=("default", ),
+                   modes=("single", ), target_tol=0.01, verbose=True):
+    """
+    Benchmark the ELM estimators on the bundled datasets.
+
+    Args:
+        datasets (list): The names of the datasets, or "all", "reg" and "cls" for all datasets of a task.
+        models (list): "elm" (ElmRegressor, ElmClassifier) and/or "mha" (MhaElmRegressor, MhaElmClassifier).
+        hidden_sizes (list): The numbers of hidden nodes.
+        solvers (list): The solvers of the output weights.
+        repeats (int): The number of timed runs of each configuration.
+        epochs (int): The number of epochs of the optimizer of the "mha" models.
+        pop_size (int): The population size of the optimizer of the "mha" models.
+        optim (str): The optimizer of the "mha" models.
+        seed (int): The seed of the splits and of the models.
+        test_size (float): The fraction of the test set of each dataset.
+        bounds (list): The search bounds of the "mha" models, "default" and/or "auto". With several bounds, the records
+            report the number of evaluations needed to reach the best of their final losses within `target_tol`
+            (evals_to_target), None if never reached.
+        modes (list): The modes of `fit()` of the "mha" models, e.g. "swarm" and "batch". With several modes, the records
+            report the speedup of their fit time over the first mode (speedup).
+        target_tol (float): The relative tolerance of the target loss of evals_to_target.
+        verbose (bool): Print each result.
+
+    Returns:
+        dict: The "metadata" of the run (versions, platform, time and configuration) and the list of "results", one
+            record per dataset, model, hidden size, solver, bounds and mode (None for the "elm" models).
+    """
+    names = get_dataset_names(datasets)
+    for model in models:
+        if model not in SUPPORTED_MODELS:
+            raise ValueError(f"model should be one of {SUPPORTED_MODELS}.")
+    for bound in bounds:
+        if bound not in SUPPORTED_BOUNDS:
+            raise ValueError(f"bounds should be in {tuple(SUPPORTED_BOUNDS)}.")
+    for mode in modes:
+        if mode not in SUPPORTED_MODES:
+            raise ValueError(f"modes should be in {SUPPORTED_MODES}.")
+    config = {"datasets": names, "models": list(models), "hidden_sizes": list(hidden_sizes), "solvers": list(solvers),
+              "repeats": repeats, "epochs": epochs, "pop_size": pop_size, "optim": optim, "seed": seed,
+              "test_size": test_size, "bounds": list(bounds), "modes": list(modes),
+              "target_tol": target_tol}
+    results = []
+    for name in names:
+        task, X_train, X_test, y_train, y_test = load_dataset(name, test_size, seed)
+        for model in models:
+            for hidden_size in hidden_sizes:
+                for solver in solvers:
+                    def estimator_factory():
+                        return get_model(task, model, hidden_size, solver, epochs, pop_size, optim, seed)
+                    records = []
+                    for bound in (bounds if model == "mha" else (None, )):
+                        mode_records = []
+                        for mode in (modes if model == "mha" else (None, )):
+                            fit_kwargs = None if bound is None else {**SUPPORTED_BOUNDS[bound], "mode": mode}
+                            res = benchmark_model(estimator_factory, X_train, y_train, X_test, y_test, task, repeats, fit_kwargs)
+                            mode_records.append({"dataset": name, "task": task, "n_samples": len(X_train) + len(X_test),
+                                                 "n_features": X_train.shape[1], "model": model, "hidden_size": hidden_size,
+                                                 "solver": solver, "bounds": bound, "mode": mode, **res})
+                            if verbose:
+                                print(f"{name} | {model} | hidden_size: {hidden_size} | solver: {solver} | bounds: {bound} | "
+                                      f"mode: {mode} | fit: {res['fit_throughput']:.1f} samples/s | "
+                                      f"predict: {res['predict_throughput']:.1f} samples/s | score: {res['score']:.4f}")
+                        if len(mode_records) > 1:
+                            get_speedups(mode_records)
+                        records += mode_records
+                    if len(records) > 1:
+                        get_evals_to_target(records, "min" if task == "reg" else "max", target_tol)
+                    results += records
+    metadata = {"intelelm": intelelm.__version__, "python": platform.python_version(), "numpy": np.__version__,
+                "scipy": scipy.__version__, "platform": platform.platform(), "machine": platform.machine(),
+                "time": datetime.now(timezone.utc).isoformat(), "config": config}
+    return {"metadata": metadata, "results": results}
+
+
+def save_results(results, path):
+    """
+    Args:
+        results (dict): The output of `run_benchmarks()`.
+        path (str): The path of the JSON file.
+    """
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def load_results(path):
+    """
+    Args:
+        path (str): The path of a JSON file written by `save_results()`.
+
+    Returns:
+        dict: The results.
+    """
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """
+    Compare two benchmark runs on their common configurations (dataset, model, hidden size, solver, bounds and mode).
+
+    Args:
+        baseline (dict): The results of the reference run, e.g. of the previous version.
+        current (dict): The results of the new run.
+        threshold (float): The relative change of a metric flagged as a regression, e.g. 0.1 for a throughput 10%
+            lower or a peak memory 10% higher than the baseline.
+
+    Returns:
+        list: The regressions, each a dict with the configuration, the metric, the baseline and current values and
+            their relative change.
+    """
+    def get_key(record):
+        return record["dataset"], record["model"], record["hidden_size"], record["solver"], record.get("bounds"), record.get("mode")
+
+    baseline_records = {get_key(record): record for record in baseline["results"]}
+    regressions = []
+    for record in current["results"]:
+        reference = baseline_records.get(get_key(record))
+        if reference is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = reference.get(metric), record.get(metric)
+            if old is None or new is None or old <= 0:
+                continue
+            change = (new - old) / old
+            if (change < -threshold) if higher_is_better else (change > threshold):
+                regressions.append({"dataset": record["dataset"], "model": record["model"],
+                                    "hidden_size": record["hidden_size"], "solver": record["solver"],
+                                    "metric": metric, "baseline": old, "current": new, "change": change})
+    return regressions
+
+
+def print_evals_to_target(results, file=sys.stdout):
+    """
+    Args:
+        results (dict): The output of `run_benchmarks()` with several bounds.
+        file: The output stream.
+    """
+    for record in results["results"]:
+        if "evals_to_target" in record:
+            evals = "not reached" if record["evals_to_target"] is None else record["evals_to_target"]
+            print(f"{record['dataset']} | {record['model']} | hidden_size: {record['hidden_size']} | solver: {record['solver']} | "
+                  f"bounds: {record['bounds']} | evaluations to reach {record['target_loss']:.6g}: {evals}", file=file)
+
+
+def print_speedups(results, file=sys.stdout):
+    """
+    Args:
+        results (dict): The output of `run_benchmarks()` with several modes.
+        file: The output stream.
+    """
+    for record in results["results"]:
+        if "speedup" in record:
+            print(f"{record['dataset']} | {record['model']} | hidden_size: {record['hidden_size']} | solver: {record['solver']} | "
+                  f"bounds: {record['bounds']} | mode: {record['mode']} | fit time: {record['fit_time']:.4f} s | "
+                  f"speedup: {record['speedup']:.2f}x", file=file)
+
+
+def print_regressions(regressions, file=sys.stdout):
+    """
+    Args:
+        regressions (list): The output of `compare_results()`.
+        file: The output stream.
+    """
+    for reg in regressions:
+        print(f"REGRESSION {reg['dataset']} | {reg['model']} | hidden_size: {reg['hidden_size']} | solver: {reg['solver']} | "
+              f"{reg['metric']}: {reg['baseline']:.4g} -> {reg['current']:.4g} ({reg['change']:+.1%})", file=file)
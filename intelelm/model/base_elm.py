@@ -4,15 +4,35 @@
 #       Github: https://github.com/thieu1995        %                         
 # --------------------------------------------------%
 
+import os
+import copy
+import time
 import pickle
+import itertools
 import numpy as np
 import pandas as pd
 from pathlib import Path
 from typing import Optional
+from contextlib import contextmanager
 from sklearn.base import BaseEstimator
+from sklearn.model_selection import train_test_split
 from permetrics import RegressionMetric, ClassificationMetric
 from mealpy import get_optimizer_by_name, Optimizer, get_all_optimizers, FloatVar
+from mealpy.utils.target import Target
 from intelelm.utils import activation, validator
+from intelelm.utils.profiler import Profiler, record, profiled, lap
+from intelelm.utils.solver import solve_output_weights, solve_output_weights_batch, SUPPORTED_SOLVERS
+from intelelm.utils.solver import inverse_gram_matrix, update_output_weights, accumulate_gram_matrix, solve_gram
+from intelelm.utils.data_loader import iter_chunks
+from intelelm.utils.fitness import FitnessContext, StratifiedSubsampler, FitnessCache
+from intelelm.utils.metric import FitnessMetric
+from intelelm.utils.shared_data import SharedDataset
+from intelelm.utils.callbacks import CallbackList
+from intelelm.utils.history import CompactHistory, SUPPORTED_HISTORY_MODES
+from intelelm.utils.islands import IslandProcess
+from intelelm.utils.hooks import OptimizerHooks, FitnessFunction
+from intelelm.utils.options import Subsample, Cache, Surrogate, Checkpoint, History, Islands, get_options
+from intelelm.utils.surrogate import RandomFeatureSurrogate, SurrogateTarget, SUPPORTED_SURROGATES
 from intelelm.utils.evaluator import get_all_regression_metrics, get_all_classification_metrics
 
 
@@ -31,41 +51,128 @@ class MultiLayerELM:
         "hard_shrink", "softmin", "softmax", "log_softmax"). Default is 'relu'.
     seed : int, optional
         Seed for random number generator. Default is None.
+    solver : str, optional
+        Solver used to compute the output weights ("pinv", "cholesky", "qr", "svd", "auto"). Default is 'pinv'.
+        The "auto" solver picks the cheapest stable path from the shape and the conditioning of the hidden matrix.
+    alpha : float, optional
+        The ridge (L2) regularization of the output weights. Default is 0.0 (no regularization).
+    dtype : str or np.dtype, optional
+        The floating point type of the weights, the hidden activations and the predictions ("float32" or "float64").
+        Default is 'float64'.
+    solver_dtype : str or np.dtype, optional
+        The floating point type used to solve the output weights. Default is None (same as dtype). Set it to
+        "float64" with dtype="float32" to keep the fast float32 forward pass with a stable solve.
+    search_space : str, optional
+        How the weights and biases are encoded in a solution vector ("full", "scale", "low_rank"). Default is 'full'.
+
+        - "full": all the weights and biases, input_size * size + size values per layer
+        - "scale": a scale per neuron of fixed random weights and the biases, 2 * size values per layer
+        - "low_rank": the weights are the product A @ B of two matrices with `rank` columns/rows and the biases,
+          rank * (input_size + size) + size values per layer
+    rank : int, optional
+        The rank of the weights in the "low_rank" search space (at most min(input_size, size)). Default is 10.
+    feature_selection : bool, optional
+        Add a mask gene per input feature at the end of the solution vector, the feature is selected when its gene is
+        at least 0.5 (at least one feature is always selected). The weights of the dropped features are zeros, and the
+        decoded network only reads the selected columns of X. Default is False.
+    width_selection : bool, optional
+        Add a width gene per hidden layer before the mask genes, the number of active hidden units of the layer (rounded,
+        between 1 and its size in layer_sizes). Only the active prefix of the hidden units of each layer is decoded, so
+        the output weights are solved on the active units of the last layer. Default is False.
     """
-    def __init__(self, layer_sizes=(10, ), act_name='relu', seed=None):
+    SUPPORTED_DTYPES = ("float32", "float64")
+    SUPPORTED_SEARCH_SPACES = ("full", "scale", "low_rank")
+    # Number of hidden-sized temporaries created by an activation function (selu/gelu peak at about 4.2)
+    ACT_MEMORY_FACTOR = 5
+    # Activation functions normalized over the hidden units, they can't be computed tile by tile
+    COUPLED_ACTIVATIONS = ("softmin", "softmax", "log_softmax")
+    # The half-width of the pre-activations where the activation is not saturated (or not linear), used by the "auto"
+    # bounds, default is 3.0
+    ACTIVE_RANGES = {"sigmoid": 4.0, "log_sigmoid": 4.0, "hard_sigmoid": 2.5, "tanh": 2.0, "hard_tanh": 1.0,
+                     "soft_sign": 3.0, "swish": 4.0, "hard_swish": 3.0}
+    # The value of a mask gene from which its feature is selected, the mask genes are bounded by [0, 1]
+    FEATURE_THRESHOLD = 0.5
+
+    def __init__(self, layer_sizes=(10, ), act_name='relu', seed=None, solver="pinv", alpha=0.0, dtype="float64", solver_dtype=None,
+                 search_space="full", rank=10, feature_selection=False, width_selection=False):
         """
         Initializes the Multi-Layer ELM model.
 
         Parameters:
         - layer_sizes: List of integers, where each integer represents the number of neurons in the respective hidden layers. Default is (10, )
         - act_name: Activation function to be used in the hidden layers. Default is 'relu'.
+        - solver: Solver used to compute the output weights. Default is 'pinv'.
+        - alpha: The ridge (L2) regularization of the output weights. Default is 0.0.
+        - dtype: The floating point type of the weights, hidden activations and predictions. Default is 'float64'.
+        - solver_dtype: The floating point type used to solve the output weights. Default is None (same as dtype).
+        - search_space: How the weights and biases are encoded in a solution vector. Default is 'full'.
+        - rank: The rank of the weights in the "low_rank" search space. Default is 10.
+        - feature_selection: Add a mask gene per input feature to the solution vector. Default is False.
+        - width_selection: Add a width gene per hidden layer to the solution vector. Default is False.
         """
         if not isinstance(layer_sizes, (list, tuple, np.ndarray, int)):
             raise ValueError(f"layer_sizes should be an int, list, tuple, or np.ndarray. Got {type(layer_sizes)}")
         self.layer_sizes = layer_sizes if isinstance(layer_sizes, (list, tuple, np.ndarray)) else [layer_sizes]
         self.act_name = act_name
         self.act_func = getattr(activation, self.act_name)
+        self.solver = validator.check_str("solver", solver, SUPPORTED_SOLVERS)
+        self.alpha = validator.check_float("alpha", alpha, [0., float("inf")])
+        self.dtype = self._check_dtype("dtype", dtype)
+        self.solver_dtype = self.dtype if solver_dtype is None else self._check_dtype("solver_dtype", solver_dtype)
+        self.search_space = validator.check_str("search_space", search_space, self.SUPPORTED_SEARCH_SPACES)
+        self.rank = validator.check_int("rank", rank, [1, float("inf")])
+        self.feature_selection = bool(feature_selection)
+        self.feature_mask = None
+        self.width_selection = bool(width_selection)
+        self.active_sizes = None
+        self.base_weights = None
         self.generator = np.random.default_rng(seed)
         self.weights = []
         self.biases = []
         self.beta = None
+        self.P = None
         self.input_size, self.obj_scaler = None, None
 
+    def _check_dtype(self, name, dtype):
+        try:
+            dtype = np.dtype(dtype)
+        except TypeError:
+            raise ValueError(f"{name} should be one of {self.SUPPORTED_DTYPES}. Got {dtype}")
+        if dtype.name not in self.SUPPORTED_DTYPES:
+            raise ValueError(f"{name} should be one of {self.SUPPORTED_DTYPES}. Got {dtype}")
+        return dtype
+
+    def _solve(self, H, y):
+        # Solve the output weights in solver_dtype, then cast them back to dtype
+        with record("solve"):
+            H = np.asarray(H, dtype=self.solver_dtype)
+            y = np.asarray(y, dtype=self.solver_dtype)
+            return solve_output_weights(H, y, self.solver, self.alpha).astype(self.dtype, copy=False)
+
     def _initialize_weights(self, input_size):
         self.weights = []
         self.biases = []
+        self.feature_mask, self.active_sizes = None, None
         for size in self.layer_sizes:
-            weight = self.generator.standard_normal(size=(input_size, size))
-            bias = self.generator.standard_normal(size)
+            # Drawn in float64 and cast, so the same seed gives the same network in every dtype
+            weight = self.generator.standard_normal(size=(input_size, size)).astype(self.dtype, copy=False)
+            bias = self.generator.standard_normal(size).astype(self.dtype, copy=False)
             self.weights.append(weight)
             self.biases.append(bias)
             input_size = size
 
-    def _forward(self, X):
-        # Forward pass through multiple layers
-        for i in range(len(self.layer_sizes)):
-            X = self.act_func(np.dot(X, self.weights[i]) + self.biases[i])
-        return X
+    def _forward(self, X, weights=None, biases=None):
+        # Forward pass through multiple layers, with the weights of the network or the given (decoded) ones
+        if weights is None and self.feature_mask is not None:
+            # Only the selected features are read, the weights of the dropped features are zeros
+            X, weights = X[:, self.feature_mask], [self.weights[0][self.feature_mask]] + list(self.weights[1:])
+        weights = self.weights if weights is None else weights
+        biases = self.biases if biases is None else biases
+        with record("forward"):
+            X = np.asarray(X, dtype=self.dtype)
+            for i in range(len(self.layer_sizes)):
+                X = self.act_func(np.dot(X, weights[i]) + biases[i])
+            return X
 
     def fit(self, X, y):
         """Fit the model to data matrix X and target(s) y.
@@ -89,86 +196,442 @@ class MultiLayerELM:
         self._initialize_weights(input_size=self.input_size)
         # Forward pass to compute hidden layer output
         H = self._forward(X)
-        # Compute output weights (beta) using Moore-Penrose pseudoinverse
-        self.beta = np.dot(np.linalg.pinv(H), y)
+        # Compute output weights (beta) using the selected solver (Moore-Penrose pseudoinverse by default)
+        self.beta = self._solve(H, y)
+        self.P = None
+        return self
+
+    def fit_stream(self, chunks):
+        """Fit the model chunk by chunk, for datasets that don't fit in memory.
+
+        H^T H and H^T y are accumulated over the chunks and the normal equations are solved once at the end,
+        so the peak memory is O(chunk_size * n_hidden + n_hidden^2) instead of O(n_samples * n_hidden).
+        The normal equations are always used here (Cholesky, or the eigen-decomposition for ill-conditioned data).
+
+        Parameters
+        ----------
+        chunks : iterable of (X_chunk, y_chunk)
+            The chunks of input data and target values.
+
+        Returns
+        -------
+        self : object
+            Returns a trained ELM model.
+        """
+        G, HtY = None, None
+        for X, y in chunks:
+            if G is None:
+                self.input_size = X.shape[1]
+                self._initialize_weights(input_size=self.input_size)
+            H = np.asarray(self._forward(X), dtype=self.solver_dtype)
+            y = np.asarray(y, dtype=self.solver_dtype)
+            G = accumulate_gram_matrix(G, H)
+            HtY = np.dot(H.T, y) if HtY is None else HtY + np.dot(H.T, y)
+        if G is None:
+            raise ValueError("fit_stream() needs at least one chunk of data.")
+        self.beta = solve_gram(G, HtY, self.alpha).astype(self.dtype, copy=False)
+        self.P = None
+        return self
+
+    def partial_fit(self, X, y):
+        """Update the model with a single batch of data (Online Sequential ELM).
+
+        The first call initializes the random weights and the inverse Gram matrix P = (H^T H + alpha I)^-1.
+        The next calls update P and beta with the block Woodbury identity (recursive least squares), so the cost
+        of each call only depends on the batch size and the number of hidden nodes, not on the past batches.
+
+        Parameters
+        ----------
+        X : ndarray of shape (n_samples, n_features)
+            The input data of the batch.
+
+        y : ndarray of shape (n_samples,) or (n_samples, n_outputs)
+            The target values of the batch.
+
+        Returns
+        -------
+        self : object
+            Returns an updated ELM model.
+        """
+        if self.P is None:
+            self.input_size = X.shape[1]
+            self._initialize_weights(input_size=self.input_size)
+        H = np.asarray(self._forward(X), dtype=self.solver_dtype)
+        y = np.asarray(y, dtype=self.solver_dtype)
+        if self.P is None:
+            self.P = inverse_gram_matrix(H, self.alpha)
+            beta = np.dot(self.P, np.dot(H.T, y))
+        else:
+            self.P, beta = update_output_weights(self.P, np.asarray(self.beta, dtype=self.solver_dtype), H, y)
+        self.beta = beta.astype(self.dtype, copy=False)
         return self
 
-    def predict(self, X):
+    def _get_block_sizes(self, n_samples, n_features, batch_size=None, max_memory=None):
+        # Choose the number of rows and hidden units processed at once, so the temporaries fit in max_memory bytes
+        n_hidden = self.weights[0].shape[1]
+        tileable = len(self.layer_sizes) == 1 and self.act_name not in self.COUPLED_ACTIVATIONS
+        n_rows = n_samples if batch_size is None else min(batch_size, n_samples)
+        if max_memory is None:
+            return max(n_rows, 1), n_hidden
+        itemsize = self.dtype.itemsize
+        n_outputs = 1 if self.beta.ndim == 1 else self.beta.shape[1]
+        # Per row: the input block (cast to dtype), the partial output, and for each hidden unit the activation
+        # temporaries plus the activation of the previous layer
+        row_bytes = itemsize * (n_features + 2 * n_outputs)
+        unit_bytes = itemsize * (self.ACT_MEMORY_FACTOR + 1)
+        width = max(self.layer_sizes)
+        min_tile = min(n_hidden, 256) if tileable else width
+        n_rows = min(n_rows, max_memory // (row_bytes + unit_bytes * min_tile))
+        if n_rows < 1:
+            raise ValueError(f"max_memory={max_memory} bytes is too small to predict a single sample.")
+        n_tile = min(n_hidden, (max_memory // n_rows - row_bytes) // unit_bytes) if tileable else n_hidden
+        return n_rows, n_tile
+
+    def predict(self, X, batch_size=None, max_memory=None):
         """Predict using the Extreme Learning Machine model.
 
+        With `batch_size` or `max_memory`, the samples are processed block by block, so the full hidden matrix
+        is never materialized. Single-layer models (with an element-wise activation) also split the hidden units
+        into tiles and sum act(X W_t + b_t) beta_t, which keeps large hidden layers within the budget.
+
         Parameters
         ----------
         X : {array-like, sparse matrix} of shape (n_samples, n_features)
             The input data.
 
+        batch_size : int, default=None
+            The maximum number of samples processed at once. None means all samples (or as many as max_memory allows).
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the temporary arrays, the returned predictions are not counted.
+            None means no budget.
+
         Returns
         -------
         y : ndarray of shape (n_samples, n_outputs)
             The predicted values.
         """
-        H = self._forward(X)
-        return np.dot(H, self.beta)
-
-    def encode(self):
+        if batch_size is None and max_memory is None:
+            H = self._forward(X)
+            return np.dot(H, self.beta)
+        if batch_size is not None:
+            batch_size = validator.check_int("batch_size", batch_size, [1, float("inf")])
+        if max_memory is not None:
+            max_memory = validator.check_int("max_memory", max_memory, [1, float("inf")])
+        X = X if hasattr(X, "shape") else np.asarray(X)
+        n_samples, n_features = X.shape
+        n_rows, n_tile = self._get_block_sizes(n_samples, n_features, batch_size, max_memory)
+        y_pred = np.empty((n_samples,) + self.beta.shape[1:], dtype=self.dtype)
+        weight = self.weights[0] if self.feature_mask is None else self.weights[0][self.feature_mask]
+        for idx in range(0, n_samples, n_rows):
+            X_block = np.asarray(X[idx:idx + n_rows], dtype=self.dtype)
+            if n_tile >= weight.shape[1]:
+                y_pred[idx:idx + n_rows] = np.dot(self._forward(X_block), self.beta)
+                continue
+            if self.feature_mask is not None:
+                X_block = X_block[:, self.feature_mask]
+            y_block = y_pred[idx:idx + n_rows]
+            y_block[...] = 0
+            for jdx in range(0, weight.shape[1], n_tile):
+                tile = slice(jdx, jdx + n_tile)
+                H_tile = self.act_func(np.dot(X_block, weight[:, tile]) + self.biases[0][tile])
+                y_block += np.dot(H_tile, self.beta[tile])
+        return y_pred
+
+    def _get_layer_rank(self, input_size, size):
+        return min(self.rank, input_size, size)
+
+    def _get_base_weights(self):
+        # The fixed random weights of the "scale" search space, drawn once per network
+        if self.search_space == "scale" and self.base_weights is None:
+            input_sizes = [self.input_size] + list(self.layer_sizes[:-1])
+            self.base_weights = [self.generator.standard_normal(size=(input_size, size)).astype(self.dtype, copy=False)
+                                 for input_size, size in zip(input_sizes, self.layer_sizes)]
+        return self.base_weights
+
+    def encode(self, weights=None, biases=None, feature_mask=None):
         """
-        Encode the current weights and biases into a 1-D vector (solution vector).
+        Encode the weights and biases into a 1-D vector (solution vector) of the search space, in the same order as
+        `decode()`. In the compact search spaces, the weights are approximated: the least-squares scales of the fixed
+        random weights ("scale"), or the truncated SVD of the weights ("low_rank").
+
+        Parameters:
+        - weights: The weight matrices of each layer, default is the current weights of the network.
+        - biases: The bias vectors of each layer, default is the current biases of the network.
+        - feature_mask: The selected features encoded by the mask genes (with feature_selection), default is the
+          current mask of the network without weights, and all the features with weights.
+
+        With width_selection, the layers can be narrower than layer_sizes (e.g. the active units of a decoded network),
+        their widths are encoded by the width genes and the inactive units are zeros.
 
         Returns:
         - A 1-D numpy array containing all the weights and biases of the network.
         """
-        flat_weights = [w.flatten() for w in self.weights]  # Flatten each weight matrix
-        flat_biases = [b.flatten() for b in self.biases]  # Flatten each bias vector
-        solution_vector = np.concatenate(flat_weights + flat_biases)  # Concatenate all into a 1-D vector
-        return solution_vector
+        if weights is None:
+            feature_mask = self.feature_mask if feature_mask is None else feature_mask
+        weights = self.weights if weights is None else weights
+        biases = self.biases if biases is None else biases
+        input_sizes = [self.input_size] + list(self.layer_sizes[:-1])
+        active_sizes = [np.shape(bias)[0] for bias in biases]
+        if self.width_selection:
+            # Pad the narrow layers with the inactive units
+            weights = [np.pad(weight, ((0, input_size - np.shape(weight)[0]), (0, size - np.shape(weight)[1])))
+                       for weight, input_size, size in zip(weights, input_sizes, self.layer_sizes)]
+            biases = [np.pad(bias, (0, size - np.shape(bias)[0])) for bias, size in zip(biases, self.layer_sizes)]
+        if [np.shape(w) for w in weights] != list(zip(input_sizes, self.layer_sizes)):
+            raise ValueError(f"The weights should have the shapes {list(zip(input_sizes, self.layer_sizes))}.")
+        base_weights = self._get_base_weights()
+        list_params = []
+        for idx, (weight, bias) in enumerate(zip(weights, biases)):
+            if self.search_space == "full":
+                list_params.append(np.ravel(weight))
+            elif self.search_space == "scale":
+                base = base_weights[idx]
+                list_params.append(np.sum(weight * base, axis=0) / np.sum(base * base, axis=0))
+            else:
+                rank = self._get_layer_rank(*np.shape(weight))
+                U, S, Vt = np.linalg.svd(weight, full_matrices=False)
+                list_params += [np.ravel(U[:, :rank] * np.sqrt(S[:rank])), np.ravel(np.sqrt(S[:rank])[:, None] * Vt[:rank])]
+            list_params.append(np.ravel(bias))
+        if self.width_selection:
+            list_params.append(np.array(active_sizes, dtype=float))
+        if self.feature_selection:
+            list_params.append(np.ones(self.input_size) if feature_mask is None else np.asarray(feature_mask, dtype=float))
+        return np.concatenate(list_params)
+
+    def get_structure_bounds(self):
+        """
+        Get the bounds of the genes of the structure, at the end of the solution vector: the width genes of
+        width_selection, then the mask genes of feature_selection.
 
-    def decode(self, solution_vector, X, y):
+        Returns:
+        - The lower and upper bounds, 1-D numpy arrays (empty without width_selection and feature_selection).
         """
-        Decode a 1-D solution vector into the weights and biases of the network.
+        lb, ub = [], []
+        if self.width_selection:
+            lb, ub = lb + [1.0] * len(self.layer_sizes), ub + [float(size) for size in self.layer_sizes]
+        if self.feature_selection:
+            lb, ub = lb + [0.0] * self.input_size, ub + [1.0] * self.input_size
+        return np.array(lb, dtype=float), np.array(ub, dtype=float)
+
+    def get_active_sizes(self, solutions):
+        """
+        Get the number of active hidden units of each layer encoded by the width genes of a population of solution vectors.
 
         Parameters:
-        - solution_vector: 1-D numpy array containing the flattened weights and biases.
+        - solutions: 2-D numpy array with shape (n_agents, n_dims), each row is a solution vector.
+
+        Returns:
+        - An integer numpy array with shape (n_agents, n_layers), None without width_selection.
+        """
+        if not self.width_selection:
+            return None
+        start = len(self.get_structure_bounds()[0])
+        genes = np.atleast_2d(solutions)[:, -start:][:, :len(self.layer_sizes)]
+        return np.clip(np.rint(genes), 1, self.layer_sizes).astype(int)
+
+    def get_feature_masks(self, solutions):
+        """
+        Get the features selected by the mask genes of a population of solution vectors.
+
+        Parameters:
+        - solutions: 2-D numpy array with shape (n_agents, n_dims), each row is a solution vector.
+
+        Returns:
+        - A boolean numpy array with shape (n_agents, input_size), None without feature_selection.
         """
+        if not self.feature_selection:
+            return None
+        genes = np.atleast_2d(solutions)[:, -self.input_size:]
+        masks = genes >= self.FEATURE_THRESHOLD
+        # A network needs at least one input, keep the feature with the highest gene
+        masks[np.arange(len(genes)), np.argmax(genes, axis=1)] = True
+        return masks
+
+    def _decode_population(self, solutions, active_sizes=None):
+        # Decode the weights (n_agents, input_size, size) and biases (n_agents, size) of each layer of all solutions,
+        # only the active prefix of the hidden units of each layer with active_sizes (the same for all solutions)
         start = 0
+        input_active = self.input_size
         input_size = self.input_size
-        self.weights = []
-        self.biases = []
-
+        solutions = np.asarray(solutions, dtype=self.dtype)
+        base_weights = self._get_base_weights()
+        layers = []
+        for idx, size in enumerate(self.layer_sizes):
+            if self.search_space == "full":
+                weights = solutions[:, start:start + input_size * size].reshape((-1, input_size, size))
+                start += input_size * size
+            elif self.search_space == "scale":
+                weights = base_weights[idx] * solutions[:, None, start:start + size]
+                start += size
+            else:
+                rank = self._get_layer_rank(input_size, size)
+                left = solutions[:, start:start + input_size * rank].reshape((-1, input_size, rank))
+                start += input_size * rank
+                right = solutions[:, start:start + rank * size].reshape((-1, rank, size))
+                start += rank * size
+                weights = np.matmul(left, right)
+            if idx == 0 and self.feature_selection:
+                weights = weights * self.get_feature_masks(solutions)[:, :, None]
+            active = size if active_sizes is None else active_sizes[idx]
+            layers.append((weights[:, :input_active, :active], solutions[:, start:start + active]))
+            start += size
+            input_size, input_active = size, active
+        return layers
+
+    def _decode_weights(self, solution_vector):
         # Decode weights and biases for each layer
-        for i, size in enumerate(self.layer_sizes):
-            weight_size = input_size * size
-            bias_size = size
+        active_sizes = self.get_active_sizes(solution_vector)
+        layers = self._decode_population(np.asarray(solution_vector)[None, :], None if active_sizes is None else active_sizes[0])
+        return [weights[0] for weights, _ in layers], [biases[0] for _, biases in layers]
 
-            # Extract the weights and reshape them to the correct matrix shape
-            weight = solution_vector[start:start + weight_size].reshape((input_size, size))
-            self.weights.append(weight)
-            start += weight_size
-
-            # Extract the biases
-            bias = solution_vector[start:start + bias_size]
-            self.biases.append(bias)
-            start += bias_size
+    def decode(self, solution_vector, X, y):
+        """
+        Decode a 1-D solution vector into the weights and biases of the network.
 
-            input_size = size
+        Parameters:
+        - solution_vector: 1-D numpy array containing the flattened weights and biases.
+        """
+        self.weights, self.biases = self._decode_weights(solution_vector)
+        masks = self.get_feature_masks(solution_vector)
+        self.feature_mask = None if masks is None else masks[0]
+        self.active_sizes = None if not self.width_selection else [len(bias) for bias in self.biases]
 
         # Update beta
         H = self._forward(X)
-        self.beta = np.dot(np.linalg.pinv(H), y)
+        self.beta = self._solve(H, y)
+
+    def _forward_population(self, solutions, X, active_sizes=None, buffers=None):
+        # Forward pass of all networks at once, each layer is a single batched matmul: (n_agents, n_samples, size). The
+        # hidden matrices are written in the flat buffers of each layer when given, instead of new arrays
+        with record("forward"):
+            X = np.asarray(X, dtype=self.dtype)
+            for idx, (weights, biases) in enumerate(self._decode_population(solutions, active_sizes)):
+                shape = (weights.shape[0], X.shape[-2], weights.shape[2])
+                H = np.empty(shape, dtype=self.dtype) if buffers is None else buffers[idx][:np.prod(shape)].reshape(shape)
+                np.matmul(X, weights, out=H)
+                for H_agent, bias in zip(H, biases):
+                    # Network by network, so the temporaries of the activation stay in the cache
+                    H_agent += bias
+                    H_agent[...] = self.act_func(H_agent)
+                X = H
+            return X
+
+    def evaluate_population(self, solutions, X, y, X_eval=None, buffers=None):
+        """
+        Decode a population of solution vectors and predict X with every decoded network at once.
+
+        The weights of the network itself are not changed.
+
+        Parameters:
+        - solutions: 2-D numpy array with shape (n_agents, n_dims), each row is a solution vector.
+        - X: The input data used to compute the hidden matrices and to solve the output weights.
+        - y: The target used to solve the output weights of each network.
+        - X_eval: The input data that is predicted (e.g. a validation set), default is X.
+        - buffers: The flat arrays (one per layer, in dtype) where the hidden matrices are written, each one with at
+          least n_agents * max(n_samples) * size items. Default is None (new arrays).
+
+        Returns:
+        - A numpy array with shape (n_agents, n_samples) or (n_agents, n_samples, n_outputs).
+        """
+        solutions = np.atleast_2d(solutions)
+        sizes = self.get_active_sizes(solutions)
+        if sizes is None:
+            return self._evaluate_group(solutions, X, y, X_eval, buffers=buffers)
+        # The networks with the same active widths are evaluated together
+        y_preds = None
+        for active_sizes in np.unique(sizes, axis=0):
+            group = np.all(sizes == active_sizes, axis=1)
+            preds = self._evaluate_group(solutions[group], X, y, X_eval, active_sizes, buffers)
+            if y_preds is None:
+                y_preds = np.empty((len(solutions), ) + preds.shape[1:], dtype=preds.dtype)
+            y_preds[group] = preds
+        return y_preds
+
+    def _evaluate_group(self, solutions, X, y, X_eval=None, active_sizes=None, buffers=None):
+        # Evaluate solutions with the same active widths by batched matmuls and solves
+        H = self._forward_population(solutions, X, active_sizes, buffers)
+        with record("solve"):
+            betas = solve_output_weights_batch(np.asarray(H, dtype=self.solver_dtype), np.asarray(y, dtype=self.solver_dtype),
+                                               self.solver, self.alpha).astype(self.dtype, copy=False)
+        if X_eval is not None:
+            H = self._forward_population(solutions, X_eval, active_sizes, buffers)
+        if betas.ndim == 2:
+            return np.matmul(H, betas[..., None])[..., 0]
+        return np.matmul(H, betas)
 
     def get_ndim(self):
         """
-        Get the total number of dimensions (weights + biases) in the network.
+        Get the total number of dimensions (weights + biases) of the search space of the network.
 
         Returns:
         - An integer representing the total number of parameters (weights + biases).
         """
+        # The fixed weights of the "scale" search space are drawn before any solution is decoded
+        self._get_base_weights()
         total_params = 0
         input_size = self.input_size
         for i, size in enumerate(self.layer_sizes):
-            total_params += input_size * size  # Add weights
+            if self.search_space == "full":
+                total_params += input_size * size  # Add weights
+            elif self.search_space == "scale":
+                total_params += size  # Add the scales of the fixed weights
+            else:
+                total_params += self._get_layer_rank(input_size, size) * (input_size + size)  # Add the low-rank factors
             total_params += size  # Add biases
             input_size = size
+        total_params += len(self.get_structure_bounds()[0])  # Add the width and mask genes
         return total_params
 
+    def get_auto_bounds(self, X, n_samples=1000):
+        """
+        Get data-driven bounds of each parameter of the search space, so the pre-activations of the hidden nodes
+        stay within the active range of the activation function instead of saturating it.
+
+        The bound of the weights of an input is scaled by the fan-in and the root mean square of the input, so the
+        pre-activations have a standard deviation of half the active range (on average over the bounds). The biases
+        are bounded by the active range, the width and mask genes by `get_structure_bounds()`. The inputs of the
+        deeper layers are estimated by forwarding a sample of X through weights drawn within the bounds of the
+        previous layers.
+
+        Parameters:
+        - X: The training features.
+        - n_samples: The maximum number of samples of X used to estimate the statistics of the inputs.
+
+        Returns:
+        - The lower and upper bounds, 1-D numpy arrays with the size of the search space.
+        """
+        self._get_base_weights()
+        active_range = self.ACTIVE_RANGES.get(self.act_name, 3.0)
+        generator = np.random.default_rng(0)
+        X = np.asarray(X, dtype=float)
+        H = X if len(X) <= n_samples else X[generator.choice(len(X), n_samples, replace=False)]
+        list_bounds = []
+        for idx, size in enumerate(self.layer_sizes):
+            fan_in = H.shape[1]
+            rms = np.sqrt(np.mean(H ** 2, axis=0))
+            # The constant zero inputs don't matter, don't let them blow up the bounds
+            rms = np.maximum(rms, max(1e-3 * np.mean(rms), 1e-12))
+            if self.search_space == "full":
+                bound = active_range / 2 * np.sqrt(3. / fan_in) / rms
+                list_bounds.append(np.repeat(bound, size))
+                weights = generator.uniform(-1., 1., (fan_in, size)) * bound[:, None]
+            elif self.search_space == "scale":
+                bound = active_range / 2 * np.sqrt(3.) / np.sqrt(np.sum(rms ** 2))
+                list_bounds.append(np.full(size, bound))
+                weights = self.base_weights[idx] * generator.uniform(-bound, bound, size)
+            else:
+                rank = self._get_layer_rank(fan_in, size)
+                bound = (active_range ** 2 / 4 * 9. / (fan_in * rank)) ** 0.25
+                list_bounds += [np.repeat(bound / rms, rank), np.full(rank * size, bound)]
+                weights = np.dot(generator.uniform(-1., 1., (fan_in, rank)) * (bound / rms)[:, None],
+                                 generator.uniform(-bound, bound, (rank, size)))
+            list_bounds.append(np.full(size, active_range))
+            H = self.act_func(np.dot(H, weights) + generator.uniform(-active_range, active_range, size))
+        ub = np.concatenate(list_bounds)
+        lb_structure, ub_structure = self.get_structure_bounds()
+        return np.concatenate([-ub, lb_structure]), np.concatenate([ub, ub_structure])
+
     def get_weights(self):
         print( [w.shape for w in self.weights])
         print(self.beta.shape)
@@ -200,19 +663,36 @@ class BaseElm(BaseEstimator):
 
         n_labels : int
             Number of labels in the dataset.
+
+        solver : str
+            The solver used to compute the output weights ("pinv", "cholesky", "qr", "svd", "auto").
+
+        alpha : float
+            The ridge (L2) regularization of the output weights.
+
+        dtype : str
+            The floating point type of the weights, the hidden activations and the predictions ("float32" or "float64").
+
+        solver_dtype : str or None
+            The floating point type used to solve the output weights, None means the same as dtype.
     """
 
     SUPPORTED_CLS_METRICS = get_all_classification_metrics()
     SUPPORTED_REG_METRICS = get_all_regression_metrics()
+    SUPPORTED_SOLVERS = SUPPORTED_SOLVERS
     CLS_OBJ_LOSSES = None
 
-    def __init__(self, layer_sizes=(10, ), act_name='relu'):
+    def __init__(self, layer_sizes=(10, ), act_name='relu', solver="pinv", alpha=0.0, dtype="float64", solver_dtype=None):
         super().__init__()
         # Directly assign layer_sizes without modification
         if not isinstance(layer_sizes, (list, tuple, np.ndarray, int)):
             raise ValueError(f"layer_sizes should be an int, list, tuple, or np.ndarray. Got {type(layer_sizes)}")
         self.layer_sizes = layer_sizes if isinstance(layer_sizes, (list, tuple, np.ndarray)) else [layer_sizes]
         self.act_name = act_name
+        self.solver = solver
+        self.alpha = alpha
+        self.dtype = dtype
+        self.solver_dtype = solver_dtype
         self.network, self.loss_train, self.n_labels, self.input_size = None, None, None, None
 
     @staticmethod
@@ -233,6 +713,31 @@ class BaseElm(BaseEstimator):
         """
         return self.network.get_weights()
 
+    @contextmanager
+    def profile(self, memory=True):
+        """
+        Profile the phases of the training and the prediction (fit, predict, fitness, forward, solve, metric and the
+        optimizer overhead) run inside the `with` block, see `intelelm.utils.profiler`. The report is saved in
+        `profile_report_`, and `profile_report_.to_dataframe()` gives the counts, the wall times and their percentiles,
+        and the peak allocations of each phase.
+
+        Parameters
+        ----------
+        memory : bool, default=True
+            Trace the peak allocations with tracemalloc (it slows down the allocations).
+
+        Yields
+        ------
+        profiler : Profiler
+            The active profiler.
+        """
+        profiler = Profiler(memory=memory)
+        try:
+            with profiler:
+                yield profiler
+        finally:
+            self.profile_report_ = profiler.get_report()
+
     def create_network(self, X, y) -> Optional["MultiLayerELM"]:
         """
         Parameters
@@ -249,6 +754,7 @@ class BaseElm(BaseEstimator):
         """
         return None
 
+    @profiled("fit")
     def fit(self, X, y):
         """
         Parameters
@@ -264,7 +770,35 @@ class BaseElm(BaseEstimator):
         self.network.fit(X, y_scaled)
         return self
 
-    def predict(self, X, return_prob=False):
+    def __fit_stream(self, X, y=None, chunk_size=10000, classes=None):
+        """
+        Parameters
+        ----------
+        X : np.ndarray, np.memmap, str, Path or iterable
+            The features data, the path of a ".npy" file, or an iterable of (X_chunk, y_chunk) pairs.
+
+        y : np.ndarray, np.memmap, str, Path or None
+            The ground truth data or the path of a ".npy" file, None if X is an iterable of pairs.
+
+        chunk_size : int
+            The number of samples in each chunk when X and y are arrays.
+
+        classes : array-like, default=None
+            All the labels of a classification problem, used to create the network instead of the first chunk.
+        """
+        chunk_size = validator.check_int("chunk_size", chunk_size, [1, float("inf")])
+        chunks = iter_chunks(X, y, chunk_size)
+        try:
+            X_first, y_first = next(chunks)
+        except StopIteration:
+            raise ValueError("fit_stream needs at least one chunk of data.") from None
+        self.network = self.create_network(X_first, y_first if classes is None else np.asarray(classes))
+        scaler = self.network.obj_scaler
+        self.network.fit_stream((X_chunk, scaler.transform(y_chunk)) for X_chunk, y_chunk in itertools.chain([(X_first, y_first)], chunks))
+        return self
+
+    @profiled("predict")
+    def predict(self, X, return_prob=False, batch_size=None, max_memory=None):
         """
         Inherit the predict function from BaseElm class, with 1 more parameter `return_prob`.
 
@@ -278,8 +812,14 @@ class BaseElm(BaseEstimator):
 
             - If True, the returned results are the probability for each sample
             - If False, the returned results are the predicted labels
+
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction, see `MultiLayerELM.predict`. None means no budget.
         """
-        pred = self.network.predict(X)
+        pred = self.network.predict(X, batch_size=batch_size, max_memory=max_memory)
         if return_prob:
             return pred
         return self.network.obj_scaler.inverse_transform(pred)
@@ -312,7 +852,7 @@ class BaseElm(BaseEstimator):
         cm = ClassificationMetric(y_true, y_pred)
         return cm.get_metrics_by_list_names(list_metrics)
 
-    def __score_reg(self, X, y, method="RMSE"):
+    def __score_reg(self, X, y, method="RMSE", batch_size=None, max_memory=None):
         """
         Parameters
         ----------
@@ -325,6 +865,12 @@ class BaseElm(BaseEstimator):
         method : str, optional, default="RMSE"
             The regression metric to be used for scoring. Must be one of the supported metrics in SUPPORTED_REG_METRICS.
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         float
@@ -332,10 +878,10 @@ class BaseElm(BaseEstimator):
 
         """
         method = self._check_method(method, list(self.SUPPORTED_REG_METRICS.keys()))
-        y_pred = self.network.predict(X)
+        y_pred = self.network.predict(X, batch_size=batch_size, max_memory=max_memory)
         return RegressionMetric(y, y_pred).get_metric_by_name(method)[method]
 
-    def __scores_reg(self, X, y, list_methods=("MSE", "MAE")):
+    def __scores_reg(self, X, y, list_methods=("MSE", "MAE"), batch_size=None, max_memory=None):
         """
         Parameters
         ----------
@@ -347,11 +893,17 @@ class BaseElm(BaseEstimator):
 
         list_methods : tuple of str, optional
             List of evaluation metrics to be used. Default is ("MSE", "MAE").
+
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
         """
-        y_pred = self.network.predict(X)
+        y_pred = self.network.predict(X, batch_size=batch_size, max_memory=max_memory)
         return self.__evaluate_reg(y_true=y, y_pred=y_pred, list_metrics=list_methods)
 
-    def __score_cls(self, X, y, method="AS"):
+    def __score_cls(self, X, y, method="AS", batch_size=None, max_memory=None):
         """
         Parameters
         ----------
@@ -364,6 +916,12 @@ class BaseElm(BaseEstimator):
         method : str, default="AS"
             Scoring method to use. Supported methods are determined by the keys in self.SUPPORTED_CLS_METRICS.
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         float
@@ -374,11 +932,11 @@ class BaseElm(BaseEstimator):
         if self.n_labels > 2:
             if method in self.CLS_OBJ_LOSSES:
                 return_prob = True
-        y_pred = self.predict(X, return_prob=return_prob)
+        y_pred = self.predict(X, return_prob=return_prob, batch_size=batch_size, max_memory=max_memory)
         cm = ClassificationMetric(y_true=y, y_pred=y_pred)
         return cm.get_metric_by_name(method)[method]
 
-    def __scores_cls(self, X, y, list_methods=("AS", "RS")):
+    def __scores_cls(self, X, y, list_methods=("AS", "RS"), batch_size=None, max_memory=None):
         """
         Parameters
         ----------
@@ -391,6 +949,12 @@ class BaseElm(BaseEstimator):
         list_methods : tuple of str, optional
             List of method names to evaluate. Possible values include 'AS', 'RS', etc. Default is ('AS', 'RS').
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         dict
@@ -403,9 +967,9 @@ class BaseElm(BaseEstimator):
             return_prob = False
             if self.n_labels > 2:
                 return_prob = True
-            y_pred = self.predict(X, return_prob=return_prob)
+            y_pred = self.predict(X, return_prob=return_prob, batch_size=batch_size, max_memory=max_memory)
             t1 = self.__evaluate_cls(y_true=y, y_pred=y_pred, list_metrics=list_errors)
-        y_pred = self.predict(X, return_prob=False)
+        y_pred = self.predict(X, return_prob=False, batch_size=batch_size, max_memory=max_memory)
         t2 = self.__evaluate_cls(y_true=y, y_pred=y_pred, list_metrics=list_scores)
         return {**t2, **t1}
 
@@ -430,7 +994,7 @@ class BaseElm(BaseEstimator):
         """
         pass
 
-    def score(self, X, y, method=None):
+    def score(self, X, y, method=None, batch_size=None, max_memory=None):
         """Return the metric of the prediction.
 
         Parameters
@@ -445,6 +1009,12 @@ class BaseElm(BaseEstimator):
         method : str, default="RMSE"
             You can get metrics from Permetrics library: https://github.com/thieu1995/permetrics
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         result : float
@@ -452,7 +1022,7 @@ class BaseElm(BaseEstimator):
         """
         pass
 
-    def scores(self, X, y, list_methods=None):
+    def scores(self, X, y, list_methods=None, batch_size=None, max_memory=None):
         """Return the list of metrics of the prediction.
 
         Parameters
@@ -467,6 +1037,12 @@ class BaseElm(BaseEstimator):
         list_methods : list, default=("MSE", "MAE")
             You can get metrics from Permetrics library: https://github.com/thieu1995/permetrics
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         results : dict
@@ -507,7 +1083,7 @@ class BaseElm(BaseEstimator):
         df = pd.DataFrame.from_dict(results, orient='index').T
         df.to_csv(f"{save_path}/{filename}", index=False)
 
-    def save_y_predicted(self, X, y_true, save_path="history", filename="y_predicted.csv"):
+    def save_y_predicted(self, X, y_true, save_path="history", filename="y_predicted.csv", batch_size=None, max_memory=None):
         """
         Save the predicted results to csv file
 
@@ -517,9 +1093,11 @@ class BaseElm(BaseEstimator):
         y_true : The ground truth data
         save_path : saved path (relative path, consider from current executed script path)
         filename : name of the file, needs to have ".csv" extension
+        batch_size : the maximum number of samples predicted at once, None means all samples
+        max_memory : the memory budget (in bytes) of the prediction, None means no budget
         """
         Path(save_path).mkdir(parents=True, exist_ok=True)
-        y_pred = self.predict(X, return_prob=False)
+        y_pred = self.predict(X, return_prob=False, batch_size=batch_size, max_memory=max_memory)
         data = {"y_true": np.squeeze(np.asarray(y_true)), "y_pred": np.squeeze(np.asarray(y_pred))}
         pd.DataFrame(data).to_csv(f"{save_path}/{filename}", index=False)
 
@@ -578,7 +1156,9 @@ class BaseMhaElm(BaseElm):
 
     Methods
     -------
-    __init__(layer_sizes=None, act_name="elu", obj_name=None, optim="BaseGA", optim_paras=None, seed=None, verbose=True)
+    __init__(layer_sizes=None, act_name="elu", obj_name=None, optim="BaseGA", optim_paras=None, seed=None, verbose=True, solver="pinv", alpha=0.0,
+             dtype="float64", solver_dtype=None, search_space="full", rank=10, feature_selection=False, sparsity_penalty=0.0,
+             width_selection=False, width_penalty=0.0)
         Initializes the `BaseMhaElm` with specified parameters.
 
     get_name()
@@ -605,13 +1185,22 @@ class BaseMhaElm(BaseElm):
     fitness_function(solution=None)
         Placeholder fitness function to be overridden by the subclass or user.
 
-    _get_lb_ub(lb=None, ub=None, problem_size=None)
+    batch_fitness_function(solutions=None)
+        Evaluates the fitness of a whole population at once, used by the "batch" mode.
+
+    _get_lb_ub(lb=None, ub=None, problem_size=None, X=None)
         Computes the lower and upper bounds based on the provided inputs and problem size.
 
     _get_minmax(obj_name=None)
         Retrieves the minmax value for the specified objective name.
 
-    fit(X, y, lb=(-10.0, ), ub=(10.0, ), mode="single", n_workers=None, termination=None, save_population=False)
+    save_checkpoint(optimizer, epoch, path)
+        Saves the state of the training after an epoch, used by `fit(..., checkpoint=...)` and `fit(..., resume_from=...)`.
+
+    fit(X, y, lb=(-10.0, ), ub=(10.0, ), mode="single", n_workers=None, termination=None, save_population=False, batch_size=None,
+        subsample=None, cache=None, surrogate=None, validation_data=None, validation_fraction=None, patience=None,
+        init_population=None, init_ratio=1.0, warm_start=False, checkpoint=None, resume_from=None, callbacks=None, backend=None,
+        history="full", islands=None)
         Fits the model to the provided data using the specified optimization parameters.
     """
     SUPPORTED_OPTIMIZERS = list(get_all_optimizers().keys())
@@ -619,8 +1208,17 @@ class BaseMhaElm(BaseElm):
     SUPPORTED_REG_OBJECTIVES = get_all_regression_metrics()
 
     def __init__(self, layer_sizes=(10, ), act_name="elu",
-                 obj_name=None, optim="BaseGA", optim_paras=None, seed=None, verbose=True):
-        super().__init__(layer_sizes=layer_sizes, act_name=act_name)
+                 obj_name=None, optim="BaseGA", optim_paras=None, seed=None, verbose=True,
+                 solver="pinv", alpha=0.0, dtype="float64", solver_dtype=None, search_space="full", rank=10,
+                 feature_selection=False, sparsity_penalty=0.0, width_selection=False, width_penalty=0.0):
+        super().__init__(layer_sizes=layer_sizes, act_name=act_name, solver=solver, alpha=alpha,
+                         dtype=dtype, solver_dtype=solver_dtype)
+        self.search_space = search_space
+        self.rank = rank
+        self.feature_selection = feature_selection
+        self.sparsity_penalty = sparsity_penalty
+        self.width_selection = width_selection
+        self.width_penalty = width_penalty
         self.obj_name = obj_name
         if optim_paras is None:
             optim_paras = {"epoch": 500, "pop_size": 20}
@@ -628,7 +1226,8 @@ class BaseMhaElm(BaseElm):
         self.optim = optim
         self.verbose = verbose
         self.seed = seed
-        self.network, self.obj_weights = None, None
+        self.network, self.obj_weights, self.population = None, None, None
+        self.feature_mask, self.active_sizes = None, None
 
     def get_name(self):
         if type(self.optim) is str:
@@ -691,16 +1290,393 @@ class BaseMhaElm(BaseElm):
         self.seed = seed
 
     def _get_history_loss(self, optimizer=None):
+        if isinstance(optimizer.history, CompactHistory):
+            return np.array(optimizer.history.list_global_best_objectives)[:, 0]
         list_global_best = optimizer.history.list_global_best
         # 2D array / matrix 2D
         global_obj_list = np.array([agent.target.objectives for agent in list_global_best])
         # Make each obj_list as an element in array for drawing
         return global_obj_list[:, 0]
 
+    def _create_fitness_context(self, X, y, X_valid=None, y_valid=None):
+        """
+        Create the precomputed data of the fitness function. The subclass can override it to decode the targets once.
+        With a validation set, the output weights are solved on (X, y) and the metric is computed on (X_valid, y_valid).
+        """
+        y_eval = y if y_valid is None else y_valid
+        return FitnessContext(self.network, X, y, metric=FitnessMetric(self.obj_name, y_eval, task="regression"),
+                              X_eval=X_valid, y_eval=y_valid)
+
+    def _get_validation_strata(self, y):
+        # The classifier overrides it to stratify the validation split by the labels
+        return None
+
+    def _split_validation_data(self, X, y, validation_data=None, validation_fraction=None):
+        """
+        Returns
+        -------
+        result : tuple
+            The training data and the validation data (X_train, y_train, X_valid, y_valid), the latter are None without validation.
+        """
+        if validation_data is not None and validation_fraction is not None:
+            raise ValueError("validation_data and validation_fraction can't be used together.")
+        if validation_data is not None:
+            if type(validation_data) not in (list, tuple) or len(validation_data) != 2:
+                raise TypeError("validation_data should be a tuple (X_valid, y_valid).")
+            return X, y, validation_data[0], validation_data[1]
+        if validation_fraction is not None:
+            validation_fraction = validator.check_float("validation_fraction", validation_fraction, [0., 1.])
+            if validation_fraction in (0., 1.):
+                raise ValueError("validation_fraction should be a float in range (0, 1).")
+            X_train, X_valid, y_train, y_valid = train_test_split(X, y, test_size=validation_fraction, random_state=self.seed,
+                                                                  stratify=self._get_validation_strata(y))
+            return X_train, y_train, X_valid, y_valid
+        return X, y, None, None
+
     def fitness_function(self, solution=None):
         pass
 
-    def _get_lb_ub(self, lb=None, ub=None, problem_size=None):
+    def batch_fitness_function(self, solutions=None):
+        """
+        Evaluates the fitness of a population of solutions. The subclass can override it with a vectorized version.
+
+        Parameters
+        ----------
+        solutions : np.ndarray with shape (n_agents, n_dims)
+
+        Returns
+        -------
+        result: np.ndarray
+            The fitness value of each solution
+        """
+        return np.array([self.fitness_function(solution) for solution in solutions])
+
+    def _add_sparsity_penalty(self, fitness, solutions):
+        """
+        Add the penalties of the size of the network to the fitness (subtract them for a maximized objective):
+        sparsity_penalty times the fraction of the input features selected by the solution (with feature_selection),
+        plus width_penalty times the fraction of the hidden units that are active (with width_selection).
+
+        Parameters
+        ----------
+        fitness : float or np.ndarray
+            The fitness of a solution, or of each solution of a population (with shape (n_agents, ) or (n_agents, n_outputs))
+        solutions : np.ndarray with shape (n_dims, ) or (n_agents, n_dims)
+
+        Returns
+        -------
+        result: float or np.ndarray
+            The penalized fitness
+        """
+        masks = self.network.get_feature_masks(solutions) if self.sparsity_penalty > 0 else None
+        sizes = self.network.get_active_sizes(solutions) if self.width_penalty > 0 else None
+        if masks is None and sizes is None:
+            return fitness
+        penalty = np.zeros(len(np.atleast_2d(solutions)))
+        if masks is not None:
+            penalty += self.sparsity_penalty * np.mean(masks, axis=1)
+        if sizes is not None:
+            penalty += self.width_penalty * np.sum(sizes, axis=1) / np.sum(self.network.layer_sizes)
+        if self._get_minmax(self.obj_name) == "max":
+            penalty = -penalty
+        if np.ndim(solutions) == 1:
+            return fitness + penalty[0]
+        return np.asarray(fitness) + penalty.reshape((-1, ) + (1, ) * (np.ndim(fitness) - 1))
+
+    def _get_fitness(self, solution=None):
+        """
+        The fitness function used as objective, recorded as the "fitness" phase by the profiler.
+        """
+        with record("fitness"):
+            return self.fitness_function(solution)
+
+    def _get_cached_fitness(self, solution=None):
+        """
+        The fitness function used as objective when the cache is enabled.
+        """
+        key = self.fitness_cache.get_key(solution)
+        fit = self.fitness_cache.get(key)
+        if fit is None:
+            fit = self._get_fitness(solution)
+            self.fitness_cache.put(key, fit)
+        return fit
+
+    def _get_batch_fitness(self, solutions, batch_size=None):
+        # Only the solutions missing from the cache are evaluated (once, even if they are repeated in the population)
+        list_fitness = [None] * len(solutions)
+        missing = {}
+        if self.fitness_cache is None:
+            missing = {idx: [idx] for idx in range(len(solutions))}
+        else:
+            for idx, solution in enumerate(solutions):
+                key = self.fitness_cache.get_key(solution)
+                list_fitness[idx] = self.fitness_cache.get(key)
+                if list_fitness[idx] is None:
+                    missing.setdefault(key, []).append(idx)
+        keys = list(missing.keys())
+        if len(keys) > 0:
+            new_solutions = solutions[[missing[key][0] for key in keys]]
+            if self._backend is not None:
+                indices = self._subsample_indices if self._subsampler is not None else None
+                new_fitness = self._backend.evaluate(self, new_solutions, batch_size, indices)
+            else:
+                size = len(keys) if batch_size is None else batch_size
+                list_chunks = []
+                for idx in range(0, len(keys), size):
+                    with record("fitness"):
+                        list_chunks.append(self.batch_fitness_function(new_solutions[idx:idx + size]))
+                new_fitness = np.concatenate(list_chunks)
+            for key, fit in zip(keys, new_fitness):
+                if self.fitness_cache is not None:
+                    self.fitness_cache.put(key, fit)
+                for idx in missing[key]:
+                    list_fitness[idx] = fit
+        return list_fitness
+
+    def _evaluate_population(self, optimizer, pop, batched=False, batch_size=None):
+        """
+        Evaluate the agents with the fitness function, by the batched fitness function (in "batch" mode) or by the Mealpy optimizer.
+        """
+        solutions = np.array([agent.solution for agent in pop])
+        if batched:
+            list_fitness = self._get_batch_fitness(solutions, batch_size)
+            for agent, fit in zip(pop, list_fitness):
+                agent.target = Target(objectives=fit, weights=optimizer.problem.obj_weights)
+            optimizer.nfe_counter += len(pop)
+        else:
+            optimizer._update_target_by_mode(pop)
+        if self._surrogate is not None:
+            self._surrogate.update(solutions, [agent.target.objectives for agent in pop])
+        return pop
+
+    def _update_target_for_population(self, optimizer, pop):
+        """
+        Evaluate a population, by the batched fitness function in "batch" mode. With a surrogate, only the candidates it
+        ranks as the most promising are evaluated by the fitness function, the others keep the predicted target, but never
+        better than the worst evaluated candidate.
+        """
+        batched, batch_size = self._batched, self._batch_size
+        if self._surrogate is None or not self._surrogate.is_ready() or len(pop) < 2:
+            return self._evaluate_population(optimizer, pop, batched, batch_size)
+        minmax, weights = optimizer.problem.minmax, optimizer.problem.obj_weights
+        solutions = np.array([agent.solution for agent in pop])
+        predicted = [SurrogateTarget(objectives=obj, weights=weights) for obj in self._surrogate.predict(solutions)]
+        order = sorted(range(len(pop)), key=lambda idx: predicted[idx].fitness, reverse=(minmax == "max"))
+        n_true = max(1, int(np.ceil(self._surrogate_ratio * len(pop))))
+        self._evaluate_population(optimizer, [pop[idx] for idx in order[:n_true]], batched, batch_size)
+        worst = optimizer.get_worst_agent([pop[idx] for idx in order[:n_true]], minmax).target
+        objectives = np.asarray(worst.objectives, dtype=float)
+        step = np.maximum(np.abs(objectives) * 1e-9, 1e-12)
+        pessimistic = SurrogateTarget(objectives=objectives + step if minmax == "min" else objectives - step, weights=weights)
+        for idx in order[n_true:]:
+            pop[idx].target = predicted[idx] if optimizer.compare_target(pessimistic, predicted[idx], minmax) else pessimistic.copy()
+        self.surrogate_stats["true"] += n_true
+        self.surrogate_stats["surrogate"] += len(pop) - n_true
+        return pop
+
+    def _after_epoch(self, optimizer, epoch):
+        lap("optimizer", exclude="fitness")
+        if isinstance(optimizer.g_best.target, SurrogateTarget):
+            self._evaluate_global_best(optimizer)
+        if isinstance(optimizer.history, CompactHistory):
+            save = self._history_every is not None and epoch % self._history_every == 0
+            optimizer.history.save_epoch(epoch, optimizer.g_best.target, optimizer.g_best.solution if save else None)
+        if self._subsampler is not None:
+            self._update_elite(optimizer)
+            # Rotate the subsample used by the next epoch, the cached fitness values are not valid anymore
+            self._subsample_indices = self._subsampler.sample()
+            self.fitness_context = self._full_fitness_context.subset(self._subsample_indices)
+            if self.fitness_cache is not None:
+                self.fitness_cache.clear()
+            self._rescore_population(optimizer)
+        if self._patience is not None:
+            self._check_patience(optimizer, epoch)
+        if self._callbacks is not None and self._callbacks.on_epoch_end(epoch, self._get_epoch_logs(optimizer)):
+            if self.stopped_epoch is None:
+                self.stopped_epoch, self._stop_reason = epoch, "A callback requested the end of the training."
+        if self._checkpoint is not None:
+            path, every, interval = self._checkpoint
+            if (every is not None and epoch % every == 0) or (interval is not None and time.perf_counter() - self._checkpoint_time >= interval):
+                self.save_checkpoint(optimizer, epoch, path)
+                self._checkpoint_time = time.perf_counter()
+
+    def _check_patience(self, optimizer, epoch):
+        """
+        Count the epochs since the best fitness (the validation score with validation data) last improved, and set
+        `stopped_epoch` when it reaches the patience.
+        """
+        target = self._elite[1] if self._subsampler is not None else optimizer.g_best.target
+        if self._best_fitness is None or (target.fitness < self._best_fitness if optimizer.problem.minmax == "min"
+                                          else target.fitness > self._best_fitness):
+            self._best_fitness, self._n_stale_epochs = target.fitness, 0
+        else:
+            self._n_stale_epochs += 1
+            if self._n_stale_epochs >= self._patience:
+                self.stopped_epoch = epoch
+                self._stop_reason = f"Stopping criterion with early stopping (patience = {self._patience} epochs) occurred."
+
+    def _get_epoch_logs(self, optimizer):
+        """
+        The statistics of the population after an epoch, passed to the callbacks (see `intelelm.utils.callbacks`).
+        """
+        best = self._elite[1] if self._subsampler is not None else optimizer.g_best.target
+        solutions = np.array([agent.solution for agent in optimizer.pop])
+        width = np.maximum(optimizer.problem.ub - optimizer.problem.lb, 1e-12)
+        return {"best_fitness": float(best.fitness),
+                "mean_fitness": float(np.mean([agent.target.fitness for agent in optimizer.pop])),
+                "n_evals": int(optimizer.nfe_counter),
+                "diversity": float(np.mean(np.std(solutions, axis=0) / width))}
+
+    def _get_training_state(self):
+        # The state of the training loop of the model, besides the state of the optimizer
+        state = {}
+        if self._subsampler is not None:
+            state.update(_subsampler=self._subsampler, _subsample_indices=self._subsample_indices, _elite=self._elite,
+                         _elite_candidate=self._elite_candidate, _elite_losses=self._elite_losses)
+        if self._surrogate is not None:
+            state.update(_surrogate=self._surrogate, surrogate_stats=self.surrogate_stats)
+        if self._patience is not None:
+            state.update(_best_fitness=self._best_fitness, _n_stale_epochs=self._n_stale_epochs)
+        return state
+
+    def save_checkpoint(self, optimizer, epoch, path):
+        """
+        Save the state of the training after an epoch: the agents of the population, the global best, the history, the
+        number of evaluations and the random generators of the optimizer, and the state of the training loop of the model.
+        The training data is not saved. The other attributes of the optimizer are not saved, the state an optimizer keeps
+        besides its agents (e.g. an archive of solutions) is initialized again when the training is resumed.
+
+        Parameters
+        ----------
+        optimizer : The Mealpy optimizer during `fit()`
+        epoch : The last finished epoch
+        path : The path of the checkpoint file, it is replaced atomically
+        """
+        checkpoint = {**OptimizerHooks.get_state(optimizer, epoch), "base_weights": self.network.base_weights,
+                      "training_state": self._get_training_state()}
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{path}.tmp", "wb") as file:
+            pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{path}.tmp", path)
+
+    def _check_checkpoint(self, checkpoint):
+        # The checkpoint is resumed with the same optimizer, network and options
+        if checkpoint["optimizer"] != self.optimizer.__class__.__name__ or checkpoint["n_dims"] != self.network.get_ndim():
+            raise ValueError("resume_from is a checkpoint of another optimizer or network.")
+        if set(checkpoint["training_state"].keys()) != set(self._get_training_state().keys()):
+            raise ValueError("resume_from is a checkpoint with other subsample, surrogate or patience options.")
+        if isinstance(checkpoint["history"], CompactHistory) != (self._history_mode == "compact"):
+            raise ValueError("resume_from is a checkpoint with another history mode.")
+        if len(checkpoint["pop"]) != self.optimizer.pop_size:
+            raise ValueError("resume_from is a checkpoint with another population size.")
+
+    def _evaluate_global_best(self, optimizer):
+        """
+        The global best was scored by the surrogate, evaluate it by the fitness function so the history stays honest.
+        """
+        target = Target(objectives=self._get_fitness(optimizer.g_best.solution), weights=optimizer.problem.obj_weights)
+        optimizer.nfe_counter += 1
+        self._surrogate.update(optimizer.g_best.solution[None, :], [target.objectives])
+        optimizer.g_best.target = target
+        optimizer.history.list_global_best[-1].target = target.copy()
+        optimizer.history.list_global_best_fit[-1] = target.fitness
+        self.surrogate_stats["true"] += 1
+
+    def _rescore_population(self, optimizer):
+        """
+        Re-score the population and the global best on the new subsample, so the next epoch compares its candidates with
+        targets of the same subsample. The fitness already recorded for the finished epoch is kept.
+        """
+        agents = optimizer.pop + [optimizer.g_best]
+        # The "single" mode evaluates its agents one by one in the epoch, they are re-scored like the "swarm" mode
+        batched = self._batched or optimizer.mode not in ("thread", "process")
+        self._evaluate_population(optimizer, agents, batched, self._batch_size if self._batched else 1)
+        c_best = optimizer.get_best_agent(optimizer.pop, optimizer.problem.minmax)
+        optimizer.g_best = optimizer.get_better_agent(c_best, optimizer.g_best, optimizer.problem.minmax)
+        optimizer.history.list_current_best[-1] = c_best
+        optimizer.history.list_global_best[-1] = optimizer.g_best.copy()
+
+    def _get_full_target(self, optimizer, solution):
+        # Score a solution on the whole training data, the fitness function always reads the current context
+        context, self.fitness_context = self.fitness_context, self._full_fitness_context
+        try:
+            objectives = self._get_fitness(solution)
+        finally:
+            self.fitness_context = context
+        return Target(objectives=objectives, weights=optimizer.problem.obj_weights)
+
+    def _update_elite(self, optimizer):
+        """
+        Re-score the global best of the subsampled fitness on the whole training data, and keep the best one (the elite).
+        """
+        g_best = optimizer.history.list_global_best[-1]
+        if self._elite_candidate is None or not np.array_equal(g_best.solution, self._elite_candidate):
+            self._elite_candidate = g_best.solution.copy()
+            target = self._get_full_target(optimizer, self._elite_candidate)
+            if self._elite is None or optimizer.compare_target(target, self._elite[1], optimizer.problem.minmax):
+                self._elite = (self._elite_candidate, target)
+        self._elite_losses.append(self._elite[1].objectives[0])
+
+    def _get_fitness_payload(self):
+        """
+        A copy of the model with only what its batched fitness function needs, sent to the workers of a backend. With
+        a subsample, it keeps the whole training data, the workers select the subsample of each task.
+        """
+        payload = copy.copy(self)
+        for name in ("optimizer", "population", "fitness_cache", "cache_stats", "loss_train", "X_temp", "y_temp",
+                     "_callbacks", "_surrogate", "_subsampler", "_full_fitness_context", "_elite", "_elite_losses"):
+            if name in payload.__dict__:
+                setattr(payload, name, None)
+        payload._backend = None
+        if self._subsampler is not None:
+            payload.fitness_context = self._full_fitness_context
+        return payload
+
+    def _share_fitness_data(self, dataset):
+        """
+        Replace the training data of the fitness function by its shared copy during the "process" mode.
+
+        Returns
+        -------
+        result : tuple
+            The original fitness contexts and training data, restored by `_unshare_fitness_data()`.
+        """
+        originals = (self.fitness_context, self.__dict__.get("_full_fitness_context"), self.X_temp, self.y_temp)
+        if self._subsampler is not None:
+            # The subsamples are drawn from the shared data, but they are small and sent by value
+            self._full_fitness_context = self._full_fitness_context.share(dataset)
+            context = self._full_fitness_context
+        else:
+            self.fitness_context = context = self.fitness_context.share(dataset)
+        self.X_temp, self.y_temp = context.X, context.y
+        return originals
+
+    def _unshare_fitness_data(self, originals):
+        self.fitness_context, full_context, self.X_temp, self.y_temp = originals
+        if full_context is not None:
+            self._full_fitness_context = full_context
+
+    def _get_fitness_strata(self, n_bins=10):
+        # The quantile bins of the (first) target, so each subsample covers the whole range of the targets
+        y_true = self.fitness_context.y_true
+        y_true = np.reshape(y_true, (len(y_true), -1))[:, 0]
+        ranks = np.argsort(np.argsort(y_true, kind="stable"), kind="stable")
+        return ranks * n_bins // len(y_true)
+
+    @staticmethod
+    def _get_subsample_size(subsample, n_samples):
+        if type(subsample) is float:
+            subsample = validator.check_float("subsample", subsample, [0., 1.])
+            return max(1, int(round(subsample * n_samples)))
+        return validator.check_int("subsample", subsample, [1, float("inf")])
+
+    def _get_lb_ub(self, lb=None, ub=None, problem_size=None, X=None):
+        if type(lb) is str or type(ub) is str:
+            if lb != "auto" or ub != "auto":
+                raise ValueError("Invalid lb and ub. The data-driven bounds need lb='auto' and ub='auto'.")
+            if X is None:
+                raise ValueError("The data-driven bounds (lb='auto' and ub='auto') need the training features X.")
+            return self.network.get_auto_bounds(X)
         if type(lb) in (list, tuple, np.ndarray) and type(ub) in (list, tuple, np.ndarray):
             if len(lb) == len(ub):
                 if len(lb) == 1:
@@ -708,6 +1684,8 @@ class BaseMhaElm(BaseElm):
                     ub = np.array(ub * problem_size, dtype=float)
                 elif len(lb) != problem_size:
                     raise ValueError(f"Invalid lb and ub. Their length should be equal to 1 or problem_size.")
+                else:
+                    return lb, ub
             else:
                 raise ValueError(f"Invalid lb and ub. They should have the same length.")
         elif type(lb) in (int, float) and type(ub) in (int, float):
@@ -715,8 +1693,136 @@ class BaseMhaElm(BaseElm):
             ub = (float(ub), ) * problem_size
         else:
             raise ValueError(f"Invalid lb and ub. They should be a number of list/tuple/np.ndarray with size equal to problem_size")
+        lb_structure, ub_structure = self.network.get_structure_bounds()
+        if len(lb_structure) > 0:
+            # The bounds of the weights and biases are broadcast, the width and mask genes have their own bounds
+            lb = np.concatenate([np.asarray(lb, dtype=float)[:-len(lb_structure)], lb_structure])
+            ub = np.concatenate([np.asarray(ub, dtype=float)[:-len(ub_structure)], ub_structure])
         return lb, ub
 
+    def _get_starting_solutions(self, init_population=None, init_ratio=1.0, warm_start=False, lb=None, ub=None, pop_size=None,
+                                generator=None):
+        """
+        Create the initial population of the optimizer: the last population (warm_start), then the seeds of init_population.
+        The "elm" seeds are standard normal draws (within 3 standard deviations) mapped affinely onto the bounds, so they
+        cover the box whatever its width. The other seeds are actual networks, they are only clipped to the bounds. The rest
+        of the population is drawn uniformly in the bounds.
+
+        Returns
+        -------
+        result : np.ndarray or None
+            The starting solutions with shape (pop_size, n_dims), None without seeds (the optimizer creates the population).
+        """
+        n_dims = len(lb)
+        generator = np.random.default_rng(self.seed) if generator is None else generator
+        list_seeds = []
+        if warm_start:
+            if self.population is None:
+                raise ValueError("warm_start needs the population of a previous fit().")
+            list_seeds.append(self.population)
+        if init_population is not None:
+            if type(init_population) is str:
+                validator.check_str("init_population", init_population, ["elm"])
+                init_ratio = validator.check_float("init_ratio", init_ratio, [0., 1.])
+                # The weights and biases of the closed-form ELM are drawn from the standard normal distribution, the
+                # draws beyond 3 standard deviations are drawn again, then [-3, 3] is mapped onto [lb, ub]
+                draws = generator.standard_normal((int(np.ceil(init_ratio * pop_size)), n_dims))
+                outside = np.abs(draws) > 3
+                while np.any(outside):
+                    draws[outside] = generator.standard_normal(np.count_nonzero(outside))
+                    outside = np.abs(draws) > 3
+                lb_array, ub_array = np.asarray(lb, dtype=float), np.asarray(ub, dtype=float)
+                seeds = (lb_array + ub_array) / 2 + draws * (ub_array - lb_array) / 6
+                _, ub_structure = self.network.get_structure_bounds()
+                if len(ub_structure) > 0:
+                    # The closed-form ELM has all the hidden units and reads all the features
+                    seeds[:, n_dims - len(ub_structure):] = ub_structure
+                list_seeds.append(seeds)
+            elif isinstance(init_population, BaseElm):
+                if init_population.network is None:
+                    raise ValueError("init_population model needs to be fitted first.")
+                network = init_population.network
+                list_seeds.append(self.network.encode(network.weights, network.biases, network.feature_mask)[None, :])
+            elif type(init_population) in (list, tuple, np.ndarray):
+                list_seeds.append(np.atleast_2d(np.asarray(init_population, dtype=float)))
+            else:
+                raise TypeError("init_population should be 'elm', a fitted model or an array of solutions.")
+        if len(list_seeds) == 0:
+            return None
+        for seeds in list_seeds:
+            if seeds.ndim != 2 or seeds.shape[1] != n_dims:
+                raise ValueError(f"The starting solutions should have {n_dims} values (the weights and biases of the network).")
+        seeds = np.clip(np.concatenate(list_seeds)[:pop_size], lb, ub)
+        return np.concatenate([seeds, generator.uniform(lb, ub, (pop_size - len(seeds), n_dims))])
+
+    def _get_island_optimizers(self, islands=None):
+        """
+        Create the Mealpy optimizers of the islands: `islands` copies of the optimizer of the model, or one per item of
+        `islands` (the name of an optimizer, with the epoch and pop_size of `optim_paras`, or an Optimizer instance).
+        """
+        if type(islands) is int:
+            islands = validator.check_int("islands", islands, [1, float("inf")])
+            return [copy.deepcopy(self.optimizer) for _ in range(islands)]
+        if type(islands) not in (list, tuple) or len(islands) == 0:
+            raise TypeError("islands should be the number of islands or a list of optimizers.")
+        list_optimizers = []
+        for optim in islands:
+            if type(optim) is str:
+                optim = validator.check_str("islands", optim, self.SUPPORTED_OPTIMIZERS)
+                paras = self.optim_paras if optim == self.optim else \
+                    {key: value for key, value in self.optim_paras.items() if key in ("epoch", "pop_size")}
+                list_optimizers.append(get_optimizer_by_name(optim)(**paras))
+            elif isinstance(optim, Optimizer):
+                list_optimizers.append(copy.deepcopy(optim))
+            else:
+                raise TypeError("islands should be a list of the names of optimizers or of Optimizer instances.")
+        return list_optimizers
+
+    def _solve_islands(self, problem, islands, mode="single", init_population=None, init_ratio=1.0, warm_start=False):
+        """
+        Run the island model (see `intelelm.utils.islands`), and set the best solution of all islands, the loss of the
+        best island of each epoch and the population of the best island.
+        """
+        list_optimizers = self._get_island_optimizers(islands.optimizers)
+        migration_interval = validator.check_int("migration_interval", islands.migration_interval, [1, float("inf")])
+        migration_size = validator.check_int("migration_size", islands.migration_size, [0, float("inf")])
+        minmax, n_epochs = problem["minmax"], self.optimizer.epoch
+        lb, ub = problem["bounds"].lb, problem["bounds"].ub
+        payload = pickle.dumps(self._get_fitness_payload(), protocol=pickle.HIGHEST_PROTOCOL)
+        # The islands rebuild the fitness function from the payload, the model is not sent with the problem
+        problem = {key: value for key, value in problem.items() if key != "obj_func"}
+        list_islands = []
+        try:
+            for idx, optimizer in enumerate(list_optimizers):
+                seed = None if self.seed is None else self.seed + idx
+                starting_solutions = self._get_starting_solutions(init_population, init_ratio, warm_start, lb, ub,
+                                                                  optimizer.pop_size, np.random.default_rng(seed))
+                list_islands.append(IslandProcess(payload, optimizer, problem, seed, mode, starting_solutions))
+            list_best = [[] for _ in list_islands]
+            migrants = [None] * len(list_islands)
+            epoch = 0
+            while epoch < n_epochs:
+                size = min(migration_interval, n_epochs - epoch)
+                for island, island_migrants in zip(list_islands, migrants):
+                    island.run(size, island_migrants, migration_size)
+                results = [island.get_result() for island in list_islands]
+                for island_best, result in zip(list_best, results):
+                    island_best += result["list_best"]
+                # The ring topology, each island receives the best agents of the previous one (not its own)
+                if len(results) > 1:
+                    migrants = [results[idx - 1]["emigrants"] for idx in range(len(results))]
+                epoch += size
+        finally:
+            for island in list_islands:
+                island.close()
+        select = np.argmin if minmax == "min" else np.argmax
+        best = int(select([result["best_fit"] for result in results]))
+        self.solution, self.best_fit = results[best]["best_solution"], results[best]["best_fit"]
+        self.population = results[best]["population"]
+        self.loss_train = np.array([bests[select([fit for fit, _ in bests])][1][0] for bests in zip(*list_best)])
+        self.island_stats = [{"optimizer": island.name, "best_fit": result["best_fit"], "nfe": result["nfe"]}
+                             for island, result in zip(list_islands, results)]
+
     def _get_minmax(self, obj_name=None):
         if obj_name is None:
             raise ValueError("obj_name can't be None")
@@ -729,43 +1835,302 @@ class BaseMhaElm(BaseElm):
                 raise ValueError("obj_name is not supported. Please check the library: permetrics to see the supported objective function.")
         return minmax
 
-    def fit(self, X, y, lb=(-10.0, ), ub=(10.0, ), mode="single", n_workers=None, termination=None, save_population=False):
+    def _prepare_training_data(self, X, y, validation_data=None, validation_fraction=None, resume_from=None):
+        """
+        Create the network and the fitness context of the training data (and of the validation set).
+
+        Returns
+        -------
+        result : dict or None
+            The checkpoint loaded from resume_from, None without it.
+        """
+        X, y, X_valid, y_valid = self._split_validation_data(X, y, validation_data, validation_fraction)
+        validator.check_float("sparsity_penalty", self.sparsity_penalty, [0., float("inf")])
+        validator.check_float("width_penalty", self.width_penalty, [0., float("inf")])
+        self.network = self.create_network(X, y)
+        checkpoint = None
+        if resume_from is not None:
+            with open(resume_from, "rb") as file:
+                checkpoint = pickle.load(file)
+            self.network.base_weights = checkpoint["base_weights"]
+        y_scaled = self.network.obj_scaler.transform(y)
+        y_valid = None if y_valid is None else self.network.obj_scaler.transform(y_valid)
+        # Cast the training data and decode the targets once, so the fitness function doesn't redo it in every evaluation
+        self.fitness_context = self._create_fitness_context(X, y_scaled, X_valid, y_valid)
+        self.X_temp, self.y_temp = self.fitness_context.X, self.fitness_context.y
+        return checkpoint
+
+    def _configure_cache(self, cache=None):
+        self.fitness_cache, self.cache_stats = None, None
+        if cache is not None:
+            cache_size = validator.check_int("cache size", cache.size, [1, float("inf")])
+            cache_step = validator.check_float("cache step", cache.step, [0., float("inf")])
+            if cache_step <= 0:
+                raise ValueError("cache step should be a positive float.")
+            self.fitness_cache = FitnessCache(cache_size, cache_step)
+
+    def _prepare_problem(self, lb, ub, save_population=False):
+        return {
+            "obj_func": FitnessFunction(self),
+            "bounds": FloatVar(lb=lb, ub=ub),
+            "minmax": self._get_minmax(self.obj_name),
+            "log_to": "console" if self.verbose else "None",
+            "save_population": save_population,
+            "obj_weights": self.obj_weights
+        }
+
+    @staticmethod
+    def _check_island_options(mode="single", **options):
+        # The options hooked into the loop of a single optimizer can't be used with the islands
+        if mode not in ("single", "swarm", "batch"):
+            raise ValueError("The islands can run in 'single', 'swarm' or 'batch' mode.")
+        used = [name for name, value in options.items() if value is not None]
+        if len(used) > 0:
+            raise ValueError(f"islands can't be used with {', '.join(used)}.")
+
+    def _configure_history(self, history, save_population=False):
+        self._history_mode = validator.check_str("history", history.mode, SUPPORTED_HISTORY_MODES)
+        self._history_every = None
+        if self._history_mode == "compact":
+            if save_population:
+                raise ValueError("save_population keeps the whole populations, it can't be used with history='compact'.")
+            if history.every is not None:
+                self._history_every = validator.check_int("history every", history.every, [1, float("inf")])
+
+    def _configure_checkpoint(self, checkpoint=None):
+        self._checkpoint = None
+        if checkpoint is not None:
+            every, interval = checkpoint.every, checkpoint.interval
+            if every is not None:
+                every = validator.check_int("checkpoint every", every, [1, float("inf")])
+            if interval is not None:
+                interval = validator.check_float("checkpoint interval", interval, [0., float("inf")])
+            elif every is None:
+                every = 1
+            self._checkpoint, self._checkpoint_time = (checkpoint.path, every, interval), time.perf_counter()
+
+    def _configure_early_stopping(self, patience=None, callbacks=None):
+        self._patience, self.stopped_epoch, self._stop_reason = None, None, None
+        if patience is not None:
+            self._patience = validator.check_int("patience", patience, [1, float("inf")])
+            self._best_fitness, self._n_stale_epochs = None, 0
+        self._callbacks = None
+        if callbacks is not None and len(callbacks) > 0:
+            self._callbacks = CallbackList(callbacks)
+
+    def _configure_surrogate(self, surrogate=None, mode="single", lb=None, ub=None):
+        self._surrogate, self.surrogate_stats = None, None
+        if surrogate is not None:
+            if mode == "single":
+                raise ValueError("surrogate needs a population mode: 'swarm', 'thread', 'process' or 'batch'.")
+            self._surrogate_ratio = validator.check_float("surrogate ratio", surrogate.ratio, [0., 1.])
+            if type(surrogate.model) is str:
+                validator.check_str("surrogate", surrogate.model, SUPPORTED_SURROGATES)
+                self._surrogate = RandomFeatureSurrogate(lb, ub, min_samples=2 * self.optimizer.pop_size, seed=self.seed)
+            else:
+                self._surrogate = surrogate.model
+            self.surrogate_stats = {"true": 0, "surrogate": 0}
+
+    def _configure_subsample(self, subsample=None):
+        self._subsampler = None
+        if subsample is not None:
+            size = self._get_subsample_size(subsample.size, self.X_temp.shape[0])
+            growth = validator.check_float("subsample growth", subsample.growth, [1., float("inf")])
+            if size < self.X_temp.shape[0]:
+                self._full_fitness_context = self.fitness_context
+                self._subsampler = StratifiedSubsampler(self._get_fitness_strata(), size, growth, self.seed)
+                self._subsample_indices = self._subsampler.sample()
+                self.fitness_context = self._full_fitness_context.subset(self._subsample_indices)
+                self._elite, self._elite_candidate, self._elite_losses = None, None, []
+
+    def _configure_evaluation(self, mode="single", batch_size=None, backend=None):
+        """
+        Set the backend and the population evaluation of the optimizer (see `_update_target_for_population()`).
+
+        Returns
+        -------
+        result : str
+            The mode of the optimizer, the "batch" mode is run as the "swarm" mode with the batched evaluation.
+        """
+        self._backend, self._batched, self._batch_size = None, False, None
+        if backend is not None:
+            if mode not in ("swarm", "batch"):
+                raise ValueError("backend needs a population mode: 'swarm' or 'batch'.")
+            self._backend, mode = backend, "batch"
+        if mode == "batch":
+            if batch_size is not None:
+                batch_size = validator.check_int("batch_size", batch_size, [1, float("inf")])
+            self._batched, self._batch_size = True, batch_size
+            mode = "swarm"
+        return mode
+
+    def _run_optimizer(self, problem, mode="single", n_workers=None, termination=None, starting_solutions=None, checkpoint=None):
+        """
+        Run (or resume) the optimizer with the configured hooks, backend and shared data, and release them after.
+
+        Returns
+        -------
+        result : Agent
+            The global best agent of the optimizer.
+        """
+        if checkpoint is not None:
+            self._check_checkpoint(checkpoint)
+        shared_dataset, originals = None, None
+        if mode == "process":
+            # The workers attach to the memory-mapped training data by name, instead of receiving a copy with every task
+            shared_dataset = SharedDataset()
+        try:
+            OptimizerHooks.attach(self.optimizer, self, checkpoint)
+            if shared_dataset is not None:
+                originals = self._share_fitness_data(shared_dataset)
+            if self._backend is not None:
+                self._backend.start_job(self)
+            if checkpoint is not None:
+                # The resumed run starts from the agents of the checkpoint, the hooks restore the rest of its state
+                self.__dict__.update(checkpoint["training_state"])
+                if self._subsampler is not None:
+                    self.fitness_context = self._full_fitness_context.subset(self._subsample_indices)
+                starting_solutions = np.array([agent.solution for agent in checkpoint["pop"]])
+            if self._callbacks is not None:
+                self._callbacks.on_train_begin(self, 0 if checkpoint is None else checkpoint["nfe_counter"])
+            lap("optimizer", exclude="fitness", start=True)
+            return self.optimizer.solve(problem, mode=mode, n_workers=n_workers, termination=termination,
+                                        starting_solutions=starting_solutions, seed=self.seed)
+        finally:
+            OptimizerHooks.detach(self.optimizer)
+            if self._callbacks is not None:
+                self._callbacks.on_train_end()
+                self._callbacks = None
+            if self._backend is not None:
+                self._backend.end_job()
+                self._backend = None
+            if originals is not None:
+                self._unshare_fitness_data(originals)
+            if shared_dataset is not None:
+                shared_dataset.close()
+
+    def _set_fitted_network(self):
+        # Decode the best solution into the network and solve its output weights on the training data
+        self.network.decode(self.solution, self.X_temp, self.y_temp)
+        self.feature_mask, self.active_sizes = self.network.feature_mask, self.network.active_sizes
+        return self
+
+    @profiled("fit")
+    def fit(self, X, y, lb=(-10.0, ), ub=(10.0, ), mode="single", n_workers=None, termination=None, save_population=False,
+            batch_size=None, subsample=None, cache=None, surrogate=None, validation_data=None, validation_fraction=None,
+            patience=None, init_population=None, init_ratio=1.0, warm_start=False, checkpoint=None, resume_from=None,
+            callbacks=None, backend=None, history="full", islands=None):
         """
         Parameters
         ----------
         X : The features data, np.ndarray
         y : The ground truth data
-        lb : The lower bound for decision variables in optimization problem (The weights and biases of network)
+        lb : The lower bound for decision variables in optimization problem (The weights and biases of network).
+            It can be "auto" (with ub="auto") for data-driven bounds of each weight and bias, derived from the fan-in, the
+            scale of the inputs and the activation function (see `MultiLayerELM.get_auto_bounds()`)
         ub : The upper bound for decision variables in optimization problem (The weights and biases of network)
-        mode: Parallel: 'process', 'thread'; Sequential: 'swarm', 'single'.
+        mode: Parallel: 'process', 'thread'; Sequential: 'swarm', 'single'; Vectorized: 'batch'.
 
                 * 'process': The parallel mode with multiple cores run the tasks
                 * 'thread': The parallel mode with multiple threads run the tasks
                 * 'swarm': The sequential mode that no effect on updating phase of other agents
                 * 'single': The sequential mode that effect on updating phase of other agents, this is default mode
+                * 'batch': The 'swarm' mode where the whole population is evaluated together (batched matmul and solve)
+
+            In the 'process' mode, the training data is kept in temporary memory-mapped files during the training, so the
+            workers attach to it by name instead of receiving a copy of it with every task.
 
         n_workers: The number of workers (cores or threads) to do the tasks (effect only on parallel mode)
         termination: The termination dictionary or an instance of Termination class in Mealpy library
         save_population : Save the population of search agents (Don't set it to True when you don't know how to use it)
+        batch_size : The maximum number of agents evaluated together in 'batch' mode, default is None (the whole population)
+        subsample : Score the agents on a rotating stratified subsample that changes every epoch, a `Subsample(size, growth)`
+            of `intelelm.utils.options` or its size alone: the number (int) or the fraction (float) of samples. Default
+            is None (all samples). The global best of each epoch is re-scored on the whole data, and the best of them is
+            kept as the final solution (and in loss_train). After each rotation, the population and the global best are
+            re-scored on the new subsample.
+        cache : The LRU cache of the fitness values, a `Cache(size, step)` or its capacity alone, default is None (no cache).
+            The hits and misses are saved in `cache_stats` after training. The cache only works in the same process,
+            so it has no effect in the 'process' mode.
+        surrogate : The surrogate used to pre-screen the candidates, a `Surrogate(model, ratio)` or its model alone, default
+            is None (no surrogate). The model can be "rff" (RandomFeatureSurrogate, trained online on the evaluated
+            solutions) or an object with the same `update()`, `predict()` and `is_ready()` methods. It needs a population
+            mode: 'swarm', 'thread', 'process' or 'batch'. The number of evaluations by the fitness function and by the
+            surrogate are saved in `surrogate_stats`.
+        validation_data : The validation set (X_valid, y_valid), default is None (the fitness is computed on the training data).
+            The output weights are still solved on the training data, but the fitness (and loss_train) is the metric of the
+            validation set, so the optimizer selects the hidden weights that generalize.
+        validation_fraction : The fraction of (X, y) held out as the validation set instead of validation_data (stratified
+            by the labels for the classifier), default is None.
+        patience : Stop the optimizer when the best fitness (the validation score with validation data) has not improved
+            for this number of epochs, default is None (no early stopping). The last epoch is saved in `stopped_epoch`
+            (also when a callback stops the training).
+        init_population : The seeds of the initial population, default is None (drawn uniformly in the bounds).
+            It can be "elm" (the standard normal draws of the closed-form ELM, scaled to the bounds: [-3, 3] standard
+            deviations are mapped onto [lb, ub]), a fitted model with the same layer sizes (e.g. the `network` of an
+            ElmRegressor or a MhaElmRegressor), or an array of solutions with shape (n, n_dims). The fitted model and the
+            array are clipped to the bounds. The rest of the population is drawn uniformly in the bounds.
+        init_ratio : The fraction of the population seeded by "elm", default is 1.0 (the whole population)
+        warm_start : Start from the last population of the previous fit (saved in `population`), e.g. to continue the
+            training on fresh data, default is False
+        checkpoint : Save the state of the training (see `save_checkpoint()`), a `Checkpoint(path, every, interval)` or
+            its file alone (saved every epoch), default is None (no checkpoint)
+        resume_from : The checkpoint file of an interrupted fit() to continue from its last saved epoch, with the same data,
+            network and options. The number of epochs in `optim_paras` can be raised to train longer. Default is None.
+        callbacks : The list of callbacks called after each epoch with the epoch index, the best and mean fitness, the number
+            of evaluations and their rate, the epoch and elapsed time, and the diversity of the population, default is None.
+            See `intelelm.utils.callbacks`: CSVLogger, JSONLinesLogger and TerminateOnStall, or any `Callback` subclass or
+            function `func(epoch, logs)`. A callback that returns True stops the training after the epoch.
+        backend : The backend evaluating the populations, e.g. a `WorkQueueBackend` of `intelelm.utils.distributed` whose
+            worker processes can run on other hosts, default is None (evaluated by this process). It needs a population
+            mode ('swarm' or 'batch'), batch_size is then the maximum number of solutions evaluated together by a worker.
+        history : The history kept by the optimizer, a `History(mode, every)` or its mode alone: "full" (the Mealpy History
+            of the agents of every epoch) or "compact" (a `CompactHistory` of the fitness values of every epoch, without
+            the agents, so its memory doesn't grow with the number of epochs times the size of the solutions). Default is
+            "full". The compact history can't save the population, its `every` saves the global best solution every this
+            number of epochs (in `optimizer.history.get_best_solutions()`).
+        islands : Run the island model, an `Islands(optimizers, migration_interval, migration_size)` or its optimizers
+            alone, default is None (a single population). The optimizers can be the number of islands (copies of the
+            optimizer) or a list of optimizers (names of `SUPPORTED_OPTIMIZERS`, with the epoch and pop_size of
+            `optim_paras`, or Optimizer instances). Each island runs in its own process (in mode 'single', 'swarm' or
+            'batch') for the epochs of the optimizer of the model, and the best solution of all islands is kept. The
+            final best fitness of each island is saved in `island_stats`. The islands can't be used with subsample,
+            surrogate, patience, callbacks, checkpoint, backend, termination, cache, the compact history or
+            save_population.
         """
-        self.network = self.create_network(X, y)
-        y_scaled = self.network.obj_scaler.transform(y)
-        self.X_temp, self.y_temp = X, y_scaled
-        problem_size = self.network.get_ndim()
-        lb, ub = self._get_lb_ub(lb, ub, problem_size)
-        minmax = self._get_minmax(self.obj_name)
-        log_to = "console" if self.verbose else "None"
-        problem = {
-            "obj_func": self.fitness_function,
-            "bounds": FloatVar(lb=lb, ub=ub),
-            "minmax": minmax,
-            "log_to": log_to,
-            "save_population": save_population,
-            "obj_weights": self.obj_weights
-        }
+        resumed = self._prepare_training_data(X, y, validation_data, validation_fraction, resume_from)
+        lb, ub = self._get_lb_ub(lb, ub, self.network.get_ndim(), self.X_temp)
+        subsample, cache, surrogate = get_options(subsample, Subsample), get_options(cache, Cache), get_options(surrogate, Surrogate)
+        checkpoint, history, islands = get_options(checkpoint, Checkpoint), get_options(history, History), get_options(islands, Islands)
+        self._configure_cache(cache)
+        problem = self._prepare_problem(lb, ub, save_population)
         self.set_optimizer_object(self.optim, self.optim_paras)
-        g_best = self.optimizer.solve(problem, mode=mode, n_workers=n_workers, termination=termination, seed=self.seed)
-        self.solution, self.best_fit = g_best.solution, g_best.target.fitness
-        self.network.decode(self.solution, self.X_temp, self.y_temp)
-        self.loss_train = self._get_history_loss(optimizer=self.optimizer)
-        return self
+        self.island_stats = None
+        if islands is not None:
+            self._check_island_options(mode, subsample=subsample, surrogate=surrogate, patience=patience,
+                                       callbacks=callbacks, checkpoint=checkpoint, resume_from=resume_from,
+                                       backend=backend, termination=termination, cache=cache,
+                                       history=None if history.mode == "full" else history.mode,
+                                       save_population=save_population or None)
+        self._configure_history(history, save_population)
+        self._configure_checkpoint(checkpoint)
+        self._configure_early_stopping(patience, callbacks)
+        self._configure_surrogate(surrogate, mode, lb, ub)
+        self._configure_subsample(subsample)
+        mode = self._configure_evaluation(mode, batch_size, backend)
+        if islands is not None:
+            self._solve_islands(problem, islands, mode, init_population, init_ratio, warm_start)
+            return self._set_fitted_network()
+        starting_solutions = self._get_starting_solutions(init_population, init_ratio, warm_start, lb, ub, self.optimizer.pop_size)
+        g_best = self._run_optimizer(problem, mode, n_workers, termination, starting_solutions, resumed)
+        self.population = np.array([agent.solution for agent in self.optimizer.pop])
+        if self.fitness_cache is not None:
+            self.cache_stats = self.fitness_cache.get_stats()
+        if self._subsampler is not None:
+            self.fitness_context = self._full_fitness_context
+            self.solution, self.best_fit = self._elite[0], self._elite[1].fitness
+            self.loss_train = np.array(self._elite_losses)
+        else:
+            self.solution, self.best_fit = g_best.solution, g_best.target.fitness
+            self.loss_train = self._get_history_loss(optimizer=self.optimizer)
+        return self._set_fitted_network()
@@ -5,19 +5,22 @@
 # --------------------------------------------------%
 
 import numpy as np
-from permetrics import RegressionMetric, ClassificationMetric
 from sklearn.base import ClassifierMixin, RegressorMixin
 from sklearn.preprocessing import OneHotEncoder
 from intelelm.model.base_elm import BaseMhaElm, MultiLayerELM
 from intelelm.utils.encoder import ObjectiveScaler
+from intelelm.utils.fitness import FitnessContext
+from intelelm.utils.metric import FitnessMetric
 
 
 class MhaElmRegressor(BaseMhaElm, RegressorMixin):
     """
     class MhaElmRegressor(BaseMhaElm, RegressorMixin)
 
-    def __init__(self, layer_sizes, act_name="elu",
-                 obj_name=None, optim="BaseGA", optim_paras=None, seed=None, verbose=False, obj_weights=None):
+    def __init__(self, layer_sizes, act_name="elu", obj_name=None, optim="BaseGA", optim_paras=None,
+                 seed=None, verbose=False, obj_weights=None, solver="pinv", alpha=0.0,
+                 dtype="float64", solver_dtype=None, search_space="full", rank=10,
+                 feature_selection=False, sparsity_penalty=0.0, width_selection=False, width_penalty=0.0):
 
         Parameters
         ----------
@@ -44,11 +47,51 @@ class MhaElmRegressor(BaseMhaElm, RegressorMixin):
 
         obj_weights : list or tuple or np.ndarray, optional
             Weights for the objective function.
+
+        solver : str, default="pinv"
+            The solver used to compute the output weights ("pinv", "cholesky", "qr", "svd", "auto").
+
+        alpha : float, default=0.0
+            The ridge (L2) regularization of the output weights.
+
+        dtype : str, default="float64"
+            The floating point type of the weights, the hidden activations and the predictions ("float32" or "float64").
+
+        solver_dtype : str or None, default=None
+            The floating point type used to solve the output weights, None means the same as dtype.
+
+        search_space : str, default="full"
+            How the weights and biases are encoded in the solutions ("full", "scale", "low_rank"), see `MultiLayerELM`.
+            The compact search spaces optimize hundreds of values instead of input_size * size + size per layer.
+
+        rank : int, default=10
+            The rank of the weights in the "low_rank" search space.
+
+        feature_selection : bool, default=False
+            Optimize a mask of the input features with the weights: a gene per feature in [0, 1], the feature is selected
+            when its gene is at least 0.5. The selected features are saved in `feature_mask` and only these columns of X
+            are read by the prediction.
+
+        sparsity_penalty : float, default=0.0
+            The penalty of the fraction of selected features, added to the fitness (subtracted for a maximized objective).
+
+        width_selection : bool, default=False
+            Optimize the number of active hidden units of each layer with the weights, layer_sizes are then the maximum
+            widths: a gene per layer in [1, size], rounded. The output weights are solved on the active units only, and
+            the widths of the fitted network are saved in `active_sizes`.
+
+        width_penalty : float, default=0.0
+            The penalty of the fraction of active hidden units, added to the fitness (subtracted for a maximized objective).
     """
-    def __init__(self, layer_sizes=(10, ), act_name="elu",
-                 obj_name=None, optim="BaseGA", optim_paras=None, seed=None, verbose=False, obj_weights=None):
+    def __init__(self, layer_sizes=(10, ), act_name="elu", obj_name=None, optim="BaseGA", optim_paras=None,
+                 seed=None, verbose=False, obj_weights=None, solver="pinv", alpha=0.0,
+                 dtype="float64", solver_dtype=None, search_space="full", rank=10,
+                 feature_selection=False, sparsity_penalty=0.0, width_selection=False, width_penalty=0.0):
         super().__init__(layer_sizes=layer_sizes, act_name=act_name, obj_name=obj_name,
-                         optim=optim, optim_paras=optim_paras, seed=seed, verbose=verbose)
+                         optim=optim, optim_paras=optim_paras, seed=seed, verbose=verbose, solver=solver, alpha=alpha,
+                         dtype=dtype, solver_dtype=solver_dtype, search_space=search_space, rank=rank,
+                         feature_selection=feature_selection, sparsity_penalty=sparsity_penalty,
+                         width_selection=width_selection, width_penalty=width_penalty)
         self.obj_weights = obj_weights
 
     def create_network(self, X, y) -> MultiLayerELM:
@@ -89,12 +132,15 @@ class MhaElmRegressor(BaseMhaElm, RegressorMixin):
         if size_output > 1:
             if self.obj_weights is None:
                 self.obj_weights = 1./size_output * np.ones(size_output)
-            elif self.obj_weights in (list, tuple, np.ndarray):
+            elif type(self.obj_weights) in (list, tuple, np.ndarray):
                 if not (len(self.obj_weights) == size_output):
                     raise ValueError(f"There is {size_output} objectives, but obj_weights has size of {len(self.obj_weights)}")
             else:
                 raise TypeError("Invalid obj_weights array type, it should be list, tuple or np.ndarray")
-        network = MultiLayerELM(layer_sizes=self.layer_sizes, act_name=self.act_name, seed=self.seed)
+        network = MultiLayerELM(layer_sizes=self.layer_sizes, act_name=self.act_name, seed=self.seed,
+                                solver=self.solver, alpha=self.alpha, dtype=self.dtype, solver_dtype=self.solver_dtype,
+                                search_space=self.search_space, rank=self.rank, feature_selection=self.feature_selection,
+                                width_selection=self.width_selection)
         network.obj_scaler = ObjectiveScaler(obj_name="self", ohe_scaler=None)
         network.input_size = X.shape[1]
         return network
@@ -112,12 +158,26 @@ class MhaElmRegressor(BaseMhaElm, RegressorMixin):
         result: float
             The fitness value
         """
-        self.network.decode(solution, self.X_temp, self.y_temp)
-        y_pred = self.network.predict(self.X_temp)
-        loss_train = RegressionMetric(self.y_temp, y_pred).get_metric_by_name(self.obj_name)[self.obj_name]
-        return loss_train
+        y_pred = self.fitness_context.predict(solution)
+        return self._add_sparsity_penalty(self.fitness_context.metric(y_pred), solution)
 
-    def score(self, X, y, method="RMSE"):
+    def batch_fitness_function(self, solutions=None):
+        """
+        Evaluates the fitness function for regression metric of a whole population at once
+
+        Parameters
+        ----------
+        solutions : np.ndarray with shape (n_agents, n_dims), default=None
+
+        Returns
+        -------
+        result: np.ndarray
+            The fitness value of each solution
+        """
+        y_preds = self.fitness_context.predict_population(solutions)
+        return self._add_sparsity_penalty(self.fitness_context.metric.batch(y_preds), solutions)
+
+    def score(self, X, y, method="RMSE", batch_size=None, max_memory=None):
         """Return the metric of the prediction.
 
         Parameters
@@ -132,14 +192,20 @@ class MhaElmRegressor(BaseMhaElm, RegressorMixin):
         method : str, default="RMSE"
             You can get all of the metrics from Permetrics library: https://github.com/thieu1995/permetrics
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         result : float
             The result of selected metric
         """
-        return self._BaseElm__score_reg(X, y, method)
+        return self._BaseElm__score_reg(X, y, method, batch_size, max_memory)
 
-    def scores(self, X, y, list_methods=("MSE", "MAE")):
+    def scores(self, X, y, list_methods=("MSE", "MAE"), batch_size=None, max_memory=None):
         """Return the list of metrics of the prediction.
 
         Parameters
@@ -154,12 +220,18 @@ class MhaElmRegressor(BaseMhaElm, RegressorMixin):
         list_methods : list, default=("MSE", "MAE")
             You can get all of the metrics from Permetrics library: https://github.com/thieu1995/permetrics
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         results : dict
             The results of the list metrics
         """
-        return self._BaseElm__scores_reg(X, y, list_methods)
+        return self._BaseElm__scores_reg(X, y, list_methods, batch_size, max_memory)
 
     def evaluate(self, y_true, y_pred, list_metrics=("MSE", "MAE")):
         """Return the list of performance metrics of the prediction.
@@ -194,7 +266,9 @@ class MhaElmClassifier(BaseMhaElm, ClassifierMixin):
 
     Methods
     -------
-    __init__(self, layer_sizes=None, act_name="elu", obj_name=None, optim="BaseGA", optim_paras=None, seed=None, verbose=False)
+    __init__(self, layer_sizes=None, act_name="elu", obj_name=None, optim="BaseGA", optim_paras=None, seed=None, verbose=False, solver="pinv",
+             alpha=0.0, dtype="float64", solver_dtype=None, search_space="full", rank=10, feature_selection=False, sparsity_penalty=0.0,
+             width_selection=False, width_penalty=0.0)
         Initializes the MhaElmClassifier with the given parameters.
 
     _check_y(self, y)
@@ -217,10 +291,15 @@ class MhaElmClassifier(BaseMhaElm, ClassifierMixin):
     """
     CLS_OBJ_LOSSES = ["CEL", "HL", "KLDL", "BSL"]
 
-    def __init__(self, layer_sizes=(10, ), act_name="elu",
-                 obj_name=None, optim="BaseGA", optim_paras=None, seed=None, verbose=False):
+    def __init__(self, layer_sizes=(10, ), act_name="elu", obj_name=None, optim="BaseGA", optim_paras=None,
+                 seed=None, verbose=False, solver="pinv", alpha=0.0,
+                 dtype="float64", solver_dtype=None, search_space="full", rank=10,
+                 feature_selection=False, sparsity_penalty=0.0, width_selection=False, width_penalty=0.0):
         super().__init__(layer_sizes=layer_sizes, act_name=act_name, obj_name=obj_name,
-                         optim=optim, optim_paras=optim_paras, seed=seed, verbose=verbose)
+                         optim=optim, optim_paras=optim_paras, seed=seed, verbose=verbose, solver=solver, alpha=alpha,
+                         dtype=dtype, solver_dtype=solver_dtype, search_space=search_space, rank=rank,
+                         feature_selection=feature_selection, sparsity_penalty=sparsity_penalty,
+                         width_selection=width_selection, width_penalty=width_penalty)
         self.return_prob = False
 
     def _check_y(self, y):
@@ -255,13 +334,31 @@ class MhaElmClassifier(BaseMhaElm, ClassifierMixin):
             if self.obj_name in self.CLS_OBJ_LOSSES:
                 self.return_prob = True
 
-        network = MultiLayerELM(layer_sizes=self.layer_sizes, act_name=self.act_name, seed=self.seed)
+        network = MultiLayerELM(layer_sizes=self.layer_sizes, act_name=self.act_name, seed=self.seed,
+                                solver=self.solver, alpha=self.alpha, dtype=self.dtype, solver_dtype=self.solver_dtype,
+                                search_space=self.search_space, rank=self.rank, feature_selection=self.feature_selection,
+                                width_selection=self.width_selection)
         ohe_scaler = OneHotEncoder(sparse_output=False)
         ohe_scaler.fit(np.reshape(y, (-1, 1)))
         network.obj_scaler = ObjectiveScaler(obj_name="softmax", ohe_scaler=ohe_scaler)
         network.input_size = X.shape[1]
         return network
 
+    def _get_fitness_strata(self, n_bins=10):
+        # The subsamples of the stochastic fitness are stratified by the labels
+        return self.fitness_context.y_true
+
+    def _get_validation_strata(self, y):
+        # The validation split keeps the proportion of each label
+        return np.ravel(y)
+
+    def _create_fitness_context(self, X, y, X_valid=None, y_valid=None):
+        # The labels are compared with the predictions, decode them once instead of in every evaluation
+        y_true = self.network.obj_scaler.inverse_transform(y)
+        y_eval = None if y_valid is None else self.network.obj_scaler.inverse_transform(y_valid)
+        metric = FitnessMetric(self.obj_name, y_true if y_eval is None else y_eval, task="classification")
+        return FitnessContext(self.network, X, y, y_true=y_true, metric=metric, X_eval=X_valid, y_eval=y_eval)
+
     def fitness_function(self, solution=None):
         """
         Evaluates the fitness function for classification metric
@@ -275,13 +372,31 @@ class MhaElmClassifier(BaseMhaElm, ClassifierMixin):
         result: float
             The fitness value
         """
-        self.network.decode(solution, self.X_temp, self.y_temp)
-        y_pred = self.predict(self.X_temp, return_prob=self.return_prob)
-        y1 = self.network.obj_scaler.inverse_transform(self.y_temp)
-        loss_train = ClassificationMetric(y1, y_pred).get_metric_by_name(self.obj_name)[self.obj_name]
-        return loss_train
+        y_pred = self.fitness_context.predict(solution)
+        if not self.return_prob:
+            y_pred = self.network.obj_scaler.inverse_transform(y_pred)
+        return self._add_sparsity_penalty(self.fitness_context.metric(y_pred), solution)
 
-    def score(self, X, y, method="AS"):
+    def batch_fitness_function(self, solutions=None):
+        """
+        Evaluates the fitness function for classification metric of a whole population at once
+
+        Parameters
+        ----------
+        solutions : np.ndarray with shape (n_agents, n_dims), default=None
+
+        Returns
+        -------
+        result: np.ndarray
+            The fitness value of each solution
+        """
+        y_preds = self.fitness_context.predict_population(solutions)
+        if not self.return_prob:
+            # Same as the inverse_transform of the softmax objective scaler, for the whole stack
+            y_preds = np.argmax(y_preds, axis=-1)
+        return self._add_sparsity_penalty(self.fitness_context.metric.batch(y_preds), solutions)
+
+    def score(self, X, y, method="AS", batch_size=None, max_memory=None):
         """
         Return the metric on the given test data and labels.
 
@@ -299,14 +414,20 @@ class MhaElmClassifier(BaseMhaElm, ClassifierMixin):
         method : str, default="AS"
             You can get all of the metrics from Permetrics library: https://github.com/thieu1995/permetrics
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         result : float
             The result of selected metric
         """
-        return self._BaseElm__score_cls(X, y, method)
+        return self._BaseElm__score_cls(X, y, method, batch_size, max_memory)
 
-    def scores(self, X, y, list_methods=("AS", "RS")):
+    def scores(self, X, y, list_methods=("AS", "RS"), batch_size=None, max_memory=None):
         """
         Return the list of metrics on the given test data and labels.
 
@@ -324,12 +445,18 @@ class MhaElmClassifier(BaseMhaElm, ClassifierMixin):
         list_methods : list, default=("AS", "RS")
             You can get all of the metrics from Permetrics library: https://github.com/thieu1995/permetrics
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         results : dict
             The results of the list metrics
         """
-        return self._BaseElm__scores_cls(X, y, list_methods)
+        return self._BaseElm__scores_cls(X, y, list_methods, batch_size, max_memory)
 
     def evaluate(self, y_true, y_pred, list_metrics=("AS", "RS")):
         """
@@ -8,6 +8,7 @@ import numpy as np
 from sklearn.base import ClassifierMixin, RegressorMixin
 from sklearn.preprocessing import OneHotEncoder
 from intelelm.model.base_elm import BaseElm, MultiLayerELM
+from intelelm.utils.data_loader import load_array
 from intelelm.utils.encoder import ObjectiveScaler
 
 
@@ -17,7 +18,8 @@ class ElmRegressor(BaseElm, RegressorMixin):
     It uses Moore–Penrose inverse matrix to calculate the output.
     """
 
-    def __init__(self, layer_sizes=(10, ), act_name="elu", seed=None):
+    def __init__(self, layer_sizes=(10, ), act_name="elu", seed=None, solver="pinv", alpha=0.0,
+                 dtype="float64", solver_dtype=None):
         """
         Initializes the ElmRegressor with specified parameters.
 
@@ -31,8 +33,21 @@ class ElmRegressor(BaseElm, RegressorMixin):
 
         seed : int or None, default=None
             The seed for random number generation.
+
+        solver : {"pinv", "cholesky", "qr", "svd", "auto"}, default="pinv"
+            The solver used to compute the output weights.
+
+        alpha : float, default=0.0
+            The ridge (L2) regularization of the output weights.
+
+        dtype : {"float32", "float64"}, default="float64"
+            The floating point type of the weights, the hidden activations and the predictions.
+
+        solver_dtype : {"float32", "float64"} or None, default=None
+            The floating point type used to solve the output weights, None means the same as dtype.
         """
-        super().__init__(layer_sizes=layer_sizes, act_name=act_name)
+        super().__init__(layer_sizes=layer_sizes, act_name=act_name, solver=solver, alpha=alpha,
+                         dtype=dtype, solver_dtype=solver_dtype)
         self.seed = seed
 
     def create_network(self, X, y) -> MultiLayerELM:
@@ -60,12 +75,65 @@ class ElmRegressor(BaseElm, RegressorMixin):
         else:
             raise TypeError("Invalid y array type, it should be list, tuple or np.ndarray")
         obj_scaler = ObjectiveScaler(obj_name="self", ohe_scaler=None)
-        network = MultiLayerELM(layer_sizes=self.layer_sizes, act_name=self.act_name, seed=self.seed)
+        network = MultiLayerELM(layer_sizes=self.layer_sizes, act_name=self.act_name, seed=self.seed,
+                                solver=self.solver, alpha=self.alpha, dtype=self.dtype, solver_dtype=self.solver_dtype)
         network.obj_scaler = obj_scaler
         network.input_size = X.shape[1]
         return network
 
-    def score(self, X, y, method="RMSE"):
+    def fit_stream(self, X, y=None, chunk_size=10000):
+        """
+        Fit the model chunk by chunk from memory-mapped arrays, ".npy" files or an iterator of chunks.
+
+        The peak memory is O(chunk_size * n_hidden + n_hidden^2) instead of O(n_samples * n_hidden).
+
+        Parameters
+        ----------
+        X : np.ndarray, np.memmap, str, Path or iterable
+            The training data, the path of a ".npy" file, or an iterable of (X_chunk, y_chunk) pairs.
+
+        y : np.ndarray, np.memmap, str, Path or None, default=None
+            Target values or the path of a ".npy" file. Must be None if X is an iterable of pairs.
+
+        chunk_size : int, default=10000
+            The number of samples in each chunk when X and y are arrays.
+
+        Returns
+        -------
+        self : object
+            Returns a trained model.
+        """
+        return self._BaseElm__fit_stream(X, y, chunk_size)
+
+    def partial_fit(self, X, y):
+        """
+        Update the model with a single batch of data (Online Sequential ELM with recursive least squares).
+
+        The first call creates the network. The model has to be trained by `partial_fit` from the first batch,
+        a model trained by `fit` can't be updated because its inverse Gram matrix is not kept.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_samples, n_features)
+            The input samples of the batch.
+
+        y : array-like of shape (n_samples,) or (n_samples, n_outputs)
+            Target values of the batch.
+
+        Returns
+        -------
+        self : object
+            Returns an updated model.
+        """
+        if self.network is None:
+            self.network = self.create_network(X, y)
+        elif self.network.P is None:
+            raise ValueError(f"{self.__class__.__name__} was trained by fit(), use partial_fit() from the first batch.")
+        y_scaled = self.network.obj_scaler.transform(y)
+        self.network.partial_fit(X, y_scaled)
+        return self
+
+    def score(self, X, y, method="RMSE", batch_size=None, max_memory=None):
         """Return the metric of the prediction.
 
         Parameters
@@ -80,14 +148,20 @@ class ElmRegressor(BaseElm, RegressorMixin):
         method : str, default="RMSE"
             You can get all of the metrics from Permetrics library: https://github.com/thieu1995/permetrics
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         result : float
             The result of selected metric
         """
-        return self._BaseElm__score_reg(X, y, method)
+        return self._BaseElm__score_reg(X, y, method, batch_size, max_memory)
 
-    def scores(self, X, y, list_methods=("MSE", "MAE")):
+    def scores(self, X, y, list_methods=("MSE", "MAE"), batch_size=None, max_memory=None):
         """Return the list of metrics of the prediction.
 
         Parameters
@@ -102,12 +176,18 @@ class ElmRegressor(BaseElm, RegressorMixin):
         list_methods : list, default=("MSE", "MAE")
             You can get all of the metrics from Permetrics library: https://github.com/thieu1995/permetrics
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         results : dict
             The results of the list metrics
         """
-        return self._BaseElm__scores_reg(X, y, list_methods)
+        return self._BaseElm__scores_reg(X, y, list_methods, batch_size, max_memory)
 
     def evaluate(self, y_true, y_pred, list_metrics=("MSE", "MAE")):
         """Return the list of performance metrics of the prediction.
@@ -149,6 +229,19 @@ class ElmClassifier(BaseElm, ClassifierMixin):
         Determines random number generation for weights and bias initialization.
         Pass an int for reproducible results across multiple function calls.
 
+    solver : {"pinv", "cholesky", "qr", "svd", "auto"}, default="pinv"
+        The solver used to compute the output weights. The "auto" solver picks the cheapest stable path
+        from the shape and the conditioning of the hidden matrix.
+
+    alpha : float, default=0.0
+        The ridge (L2) regularization of the output weights.
+
+    dtype : {"float32", "float64"}, default="float64"
+        The floating point type of the weights, the hidden activations and the predictions.
+
+    solver_dtype : {"float32", "float64"} or None, default=None
+        The floating point type used to solve the output weights, None means the same as dtype.
+
     Examples
     --------
     >>> from intelelm import Data, ElmClassifier
@@ -165,8 +258,10 @@ class ElmClassifier(BaseElm, ClassifierMixin):
 
     CLS_OBJ_LOSSES = ["CEL", "HL", "KLDL", "BSL"]
 
-    def __init__(self, layer_sizes=(10, ), act_name="elu", seed=None):
-        super().__init__(layer_sizes=layer_sizes, act_name=act_name)
+    def __init__(self, layer_sizes=(10, ), act_name="elu", seed=None, solver="pinv", alpha=0.0,
+                 dtype="float64", solver_dtype=None):
+        super().__init__(layer_sizes=layer_sizes, act_name=act_name, solver=solver, alpha=alpha,
+                         dtype=dtype, solver_dtype=solver_dtype)
         self.return_prob = False
         self.n_labels = None
         self.seed = seed
@@ -183,12 +278,76 @@ class ElmClassifier(BaseElm, ClassifierMixin):
         ohe_scaler = OneHotEncoder(sparse_output=False)
         ohe_scaler.fit(np.reshape(y, (-1, 1)))
         obj_scaler = ObjectiveScaler(obj_name="softmax", ohe_scaler=ohe_scaler)
-        network = MultiLayerELM(layer_sizes=self.layer_sizes, act_name=self.act_name, seed=self.seed)
+        network = MultiLayerELM(layer_sizes=self.layer_sizes, act_name=self.act_name, seed=self.seed,
+                                solver=self.solver, alpha=self.alpha, dtype=self.dtype, solver_dtype=self.solver_dtype)
         network.obj_scaler = obj_scaler
         network.input_size = X.shape[1]
         return network
 
-    def score(self, X, y, method="AS"):
+    def fit_stream(self, X, y=None, chunk_size=10000, classes=None):
+        """
+        Fit the model chunk by chunk from memory-mapped arrays, ".npy" files or an iterator of chunks.
+
+        The peak memory is O(chunk_size * n_hidden + n_hidden^2) instead of O(n_samples * n_hidden).
+
+        Parameters
+        ----------
+        X : np.ndarray, np.memmap, str, Path or iterable
+            The training data, the path of a ".npy" file, or an iterable of (X_chunk, y_chunk) pairs.
+
+        y : np.ndarray, np.memmap, str, Path or None, default=None
+            Target labels or the path of a ".npy" file. Must be None if X is an iterable of pairs.
+
+        chunk_size : int, default=10000
+            The number of samples in each chunk when X and y are arrays.
+
+        classes : array-like of shape (n_classes,), default=None
+            All the labels of the dataset. Required when X is an iterable of pairs, otherwise it is taken from y.
+
+        Returns
+        -------
+        self : object
+            Returns a trained model.
+        """
+        if classes is None:
+            if y is None:
+                raise ValueError("classes is required when X is an iterable of (X_chunk, y_chunk) pairs.")
+            classes = np.unique(load_array(y))
+        return self._BaseElm__fit_stream(X, y, chunk_size, classes)
+
+    def partial_fit(self, X, y, classes=None):
+        """
+        Update the model with a single batch of data (Online Sequential ELM with recursive least squares).
+
+        The first call creates the network. The model has to be trained by `partial_fit` from the first batch,
+        a model trained by `fit` can't be updated because its inverse Gram matrix is not kept.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_samples, n_features)
+            The input samples of the batch.
+
+        y : array-like of shape (n_samples,)
+            Target labels of the batch.
+
+        classes : array-like of shape (n_classes,), default=None
+            All the labels that can appear in the batches. Required in the first call if the first batch
+            doesn't contain all labels, ignored in the next calls.
+
+        Returns
+        -------
+        self : object
+            Returns an updated model.
+        """
+        if self.network is None:
+            self.network = self.create_network(X, y if classes is None else np.asarray(classes))
+        elif self.network.P is None:
+            raise ValueError(f"{self.__class__.__name__} was trained by fit(), use partial_fit() from the first batch.")
+        y_scaled = self.network.obj_scaler.transform(y)
+        self.network.partial_fit(X, y_scaled)
+        return self
+
+    def score(self, X, y, method="AS", batch_size=None, max_memory=None):
         """
         Return the metric on the given test data and labels.
 
@@ -206,14 +365,20 @@ class ElmClassifier(BaseElm, ClassifierMixin):
         method : str, default="AS"
             You can get all of the metrics from Permetrics library: https://github.com/thieu1995/permetrics
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         result : float
             The result of selected metric
         """
-        return self._BaseElm__score_cls(X, y, method)
+        return self._BaseElm__score_cls(X, y, method, batch_size, max_memory)
 
-    def scores(self, X, y, list_methods=("AS", "RS")):
+    def scores(self, X, y, list_methods=("AS", "RS"), batch_size=None, max_memory=None):
         """
         Return the list of metrics on the given test data and labels.
 
@@ -231,12 +396,18 @@ class ElmClassifier(BaseElm, ClassifierMixin):
         list_methods : list, default=("AS", "RS")
             You can get all of the metrics from Permetrics library: https://github.com/thieu1995/permetrics
 
+        batch_size : int, default=None
+            The maximum number of samples predicted at once, None means all samples.
+
+        max_memory : int, default=None
+            The memory budget (in bytes) of the prediction. None means no budget.
+
         Returns
         -------
         results : dict
             The results of the list metrics
         """
-        return self._BaseElm__scores_cls(X, y, list_methods)
+        return self._BaseElm__scores_cls(X, y, list_methods, batch_size, max_memory)
 
     def evaluate(self, y_true, y_pred, list_metrics=("AS", "RS")):
         """
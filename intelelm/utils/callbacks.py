@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+"""
+The per-epoch callbacks of the metaheuristic-based ELM models, e.g. `MhaElmRegressor().fit(X, y, callbacks=[...])`.
+
+After each epoch, the model calls `on_epoch_end(epoch, logs)` of each callback with the logs:
+    - "epoch": the index of the epoch (from 1)
+    - "best_fitness": the fitness of the global best (the elite with a subsample, the validation score with validation data)
+    - "mean_fitness": the mean fitness of the population
+    - "n_evals": the total number of evaluations of the fitness function since the start of the training
+    - "evals_per_second": the number of evaluations of the epoch per second of the epoch
+    - "epoch_time": the wall time of the epoch (seconds)
+    - "elapsed": the wall time since the start of the training (seconds)
+    - "diversity": the mean standard deviation of the solutions of the population, relative to the width of the bounds
+
+A callback requests the end of the training by returning True, the optimizer then stops after the epoch. A plain
+function `func(epoch, logs)` can be used as a callback too.
+"""
+
+import csv
+import json
+import time
+from pathlib import Path
+
+LOG_KEYS = ("epoch", "best_fitness", "mean_fitness", "n_evals", "evals_per_second", "epoch_time", "elapsed", "diversity")
+
+
+class Callback:
+    """
+    The base class of the callbacks, the methods do nothing by default.
+    """
+
+    def on_train_begin(self, model):
+        """
+        Args:
+            model (BaseMhaElm): The model being trained.
+        """
+        pass
+
+    def on_epoch_end(self, epoch, logs):
+        """
+        Args:
+            epoch (int): The index of the epoch.
+            logs (dict): The statistics of the epoch, see `LOG_KEYS`.
+
+        Returns:
+            bool: True to stop the training after this epoch.
+        """
+        return False
+
+    def on_train_end(self, logs):
+        """
+        Args:
+            logs (dict): The statistics of the last epoch, None if no epoch has finished.
+        """
+        pass
+
+
+class CSVLogger(Callback):
+    """
+    Write the logs of each epoch as a row of a CSV file, flushed after each epoch so the file can be watched live.
+
+    Args:
+        path (str): The path of the CSV file.
+        append (bool): Append to the file (e.g. when resuming from a checkpoint) instead of overwriting it.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.append = append
+        self._file, self._writer = None, None
+
+    def on_train_begin(self, model):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        write_header = not (self.append and Path(self.path).exists() and Path(self.path).stat().st_size > 0)
+        self._file = open(self.path, "a" if self.append else "w", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=LOG_KEYS, extrasaction="ignore")
+        if write_header:
+            self._writer.writeheader()
+
+    def on_epoch_end(self, epoch, logs):
+        self._writer.writerow(logs)
+        self._file.flush()
+        return False
+
+    def on_train_end(self, logs):
+        if self._file is not None:
+            self._file.close()
+            self._file, self._writer = None, None
+
+
+class JSONLinesLogger(Callback):
+    """
+    Write the logs of each epoch as a JSON object per line, flushed after each epoch so the file can be streamed.
+
+    Args:
+        path (str): The path of the JSON-lines file.
+        append (bool): Append to the file (e.g. when resuming from a checkpoint) instead of overwriting it.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.append = append
+        self._file = None
+
+    def on_train_begin(self, model):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a" if self.append else "w")
+
+    def on_epoch_end(self, epoch, logs):
+        self._file.write(json.dumps(logs) + "\n")
+        self._file.flush()
+        return False
+
+    def on_train_end(self, logs):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TerminateOnStall(Callback):
+    """
+    Stop the training when it stalls: the best fitness has not improved for some epochs, the throughput is too low, or
+    the training takes too long.
+
+    Args:
+        stall_epochs (int): Stop when the best fitness has not improved by more than min_delta for this number of epochs,
+            default is None (not checked).
+        min_delta (float): The smallest change of the best fitness counted as an improvement.
+        min_evals_per_second (float): Stop when an epoch evaluates fewer solutions per second, default is None (not checked).
+        max_time (float): Stop when the training has run for this number of seconds, default is None (not checked).
+    """
+
+    def __init__(self, stall_epochs=None, min_delta=0.0, min_evals_per_second=None, max_time=None):
+        self.stall_epochs = stall_epochs
+        self.min_delta = min_delta
+        self.min_evals_per_second = min_evals_per_second
+        self.max_time = max_time
+        self.stop_reason = None
+
+    def on_train_begin(self, model):
+        self._best, self._n_stale_epochs, self.stop_reason = None, 0, None
+        self._sign = 1.0 if model._get_minmax(model.obj_name) == "min" else -1.0
+
+    def on_epoch_end(self, epoch, logs):
+        fitness = self._sign * logs["best_fitness"]
+        if self._best is None or fitness < self._best - self.min_delta:
+            self._best, self._n_stale_epochs = fitness, 0
+        else:
+            self._n_stale_epochs += 1
+        if self.stall_epochs is not None and self._n_stale_epochs >= self.stall_epochs:
+            self.stop_reason = f"The best fitness has not improved for {self._n_stale_epochs} epochs."
+        elif self.min_evals_per_second is not None and logs["evals_per_second"] < self.min_evals_per_second:
+            self.stop_reason = f"The throughput fell to {logs['evals_per_second']:.2f} evaluations per second."
+        elif self.max_time is not None and logs["elapsed"] >= self.max_time:
+            self.stop_reason = f"The training has run for {logs['elapsed']:.2f} seconds."
+        return self.stop_reason is not None
+
+
+class CallbackList:
+    """
+    Call a list of callbacks (or plain functions `func(epoch, logs)`) and keep the timing of the epochs.
+
+    Args:
+        callbacks (list): The callbacks.
+    """
+
+    def __init__(self, callbacks):
+        self.callbacks = list(callbacks)
+        for callback in self.callbacks:
+            if not (isinstance(callback, Callback) or callable(callback)):
+                raise TypeError("callbacks should be a list of Callback instances or functions func(epoch, logs).")
+        self.logs = None
+        self._start, self._last_time, self._last_evals = None, None, 0
+
+    def on_train_begin(self, model, n_evals=0):
+        self._start = self._last_time = time.perf_counter()
+        self._last_evals = max(n_evals, 0)
+        for callback in self.callbacks:
+            if isinstance(callback, Callback):
+                callback.on_train_begin(model)
+
+    def on_epoch_end(self, epoch, logs):
+        """
+        Args:
+            epoch (int): The index of the epoch.
+            logs (dict): The statistics of the epoch without the timing, i.e. "best_fitness", "mean_fitness", "n_evals"
+                and "diversity".
+
+        Returns:
+            bool: True if a callback requested the end of the training.
+        """
+        now = time.perf_counter()
+        epoch_time, n_evals = now - self._last_time, max(logs["n_evals"], 0)
+        self.logs = {"epoch": epoch, "best_fitness": logs["best_fitness"], "mean_fitness": logs["mean_fitness"],
+                     "n_evals": n_evals, "evals_per_second": (n_evals - self._last_evals) / max(epoch_time, 1e-12),
+                     "epoch_time": epoch_time, "elapsed": now - self._start, "diversity": logs["diversity"]}
+        self._last_time, self._last_evals = now, n_evals
+        stop = False
+        for callback in self.callbacks:
+            if isinstance(callback, Callback):
+                stop = bool(callback.on_epoch_end(epoch, dict(self.logs))) or stop
+            else:
+                stop = bool(callback(epoch, dict(self.logs))) or stop
+        # Don't count the time of the callbacks (e.g. writing the logs) in the next epoch
+        self._last_time = time.perf_counter()
+        return stop
+
+    def on_train_end(self):
+        for callback in self.callbacks:
+            if isinstance(callback, Callback):
+                callback.on_train_end(self.logs)
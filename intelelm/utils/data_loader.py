@@ -83,7 +83,22 @@ class Data:
         return self
 
 
-def get_dataset(dataset_name):
+def list_datasets():
+    """
+    Helper function to list the bundled datasets
+
+    Returns
+    -------
+    datasets: dict
+        The names of the regression ("reg") and classification ("cls") datasets.
+    """
+    dir_root = f"{Path(__file__).parent.parent.__str__()}/data"
+    reg_list = sorted(pf.name[:-4] for pf in Path(f"{dir_root}/reg").glob("*.csv"))
+    cls_list = sorted(pf.name[:-4] for pf in Path(f"{dir_root}/cls").glob("*.csv"))
+    return {"reg": reg_list, "cls": cls_list}
+
+
+def get_dataset(dataset_name, verbose=True):
     """
     Helper function to retrieve the data
 
@@ -92,19 +107,22 @@ def get_dataset(dataset_name):
     dataset_name : str
         Name of the dataset
 
+    verbose : bool, default=True
+        Print the name of the loaded dataset, and ask to list the available datasets when it is not found.
+
     Returns
     -------
     data: Data
         The instance of Data class, that hold X and y variables.
     """
     dir_root = f"{Path(__file__).parent.parent.__str__()}/data"
-    list_path_reg = Path(f"{dir_root}/reg").glob("*.csv")
-    list_path_cls = Path(f"{dir_root}/cls").glob("*.csv")
-    reg_list = [pf.name[:-4] for pf in list_path_reg]
-    cls_list = [pf.name[:-4] for pf in list_path_cls]
-    list_datasets = reg_list + cls_list
+    datasets = list_datasets()
+    reg_list, cls_list = datasets["reg"], datasets["cls"]
+    all_datasets = reg_list + cls_list
 
-    if dataset_name not in list_datasets:
+    if dataset_name not in all_datasets:
+        if not verbose:
+            raise ValueError(f"IntelELM currently does not have '{dataset_name}' data in its database.")
         print(f"IntelELM currently does not have '{dataset_name}' data in its database....")
         display = input("Enter 1 to see the available datasets: ") or 0
         if display:
@@ -122,5 +140,58 @@ def get_dataset(dataset_name):
             df = pd.read_csv(f"{dir_root}/cls/{dataset_name}.csv", header=None)
             data_type = "CLASSIFICATION"
         data = Data(np.array(df.iloc[:, 0:-1]), np.array(df.iloc[:, -1]))
-        print(f"Requested {data_type} dataset: {dataset_name} found and loaded!")
+        if verbose:
+            print(f"Requested {data_type} dataset: {dataset_name} found and loaded!")
         return data
+
+
+def load_array(data):
+    """
+    Helper function to open a ".npy" file as a memory-mapped array, other inputs are returned unchanged.
+
+    Parameters
+    ----------
+    data : str, Path, np.ndarray or np.memmap
+        The path of a ".npy" file or an array-like object
+
+    Returns
+    -------
+    data: np.memmap or the input object
+    """
+    if isinstance(data, (str, Path)):
+        return np.load(data, mmap_mode="r")
+    return data
+
+
+def iter_chunks(X, y=None, chunk_size=10000):
+    """
+    Helper function to iterate over a dataset chunk by chunk, so it doesn't need to fit in memory.
+
+    Parameters
+    ----------
+    X : np.ndarray, np.memmap, str, Path or iterable
+        The features data as an (memory-mapped) array, the path of a ".npy" file, or an iterable of (X_chunk, y_chunk) pairs
+
+    y : np.ndarray, np.memmap, str, Path or None
+        The ground truth data as an (memory-mapped) array or the path of a ".npy" file. Must be None if X is an iterable of pairs
+
+    chunk_size : int
+        The number of samples in each chunk when X and y are arrays
+
+    Yields
+    ------
+    (X_chunk, y_chunk): tuple of np.ndarray
+    """
+    X, y = load_array(X), load_array(y)
+    if hasattr(X, "shape"):
+        if y is None:
+            raise ValueError("y is required when X is an array or a .npy file.")
+        if X.shape[0] != len(y):
+            raise ValueError(f"X and y should have the same number of samples. Got {X.shape[0]} and {len(y)}.")
+        for idx in range(0, X.shape[0], chunk_size):
+            yield np.asarray(X[idx:idx + chunk_size]), np.asarray(y[idx:idx + chunk_size])
+    else:
+        if y is not None:
+            raise ValueError("y should be None when X is an iterable of (X_chunk, y_chunk) pairs.")
+        for X_chunk, y_chunk in X:
+            yield np.asarray(X_chunk), np.asarray(y_chunk)
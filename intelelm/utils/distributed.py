@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+
+"""
+A distributed fitness evaluation for the metaheuristic-based ELM models, through a work queue served by
+`multiprocessing.managers`.
+
+The model publishes its fitness function and training data once per `fit()` (a "job"), then each population is split
+into tasks put in the queue. The workers, on this machine or on other hosts, load the job once, evaluate the tasks with
+the batched fitness function and send back the fitness values:
+
+    with WorkQueueBackend(address=("0.0.0.0", 50000), authkey=secret_key, n_local_workers=2) as backend:
+        model.fit(X, y, mode="swarm", backend=backend)
+
+A remote worker is started with:
+
+    python -m intelelm.utils.distributed --address HOST:50000 --authkey SECRET_KEY
+
+The jobs and the tasks are sent with pickle: anyone holding the authkey can run code on the server and the workers. A
+server listening on another address than loopback needs an explicit authkey (a long random secret), on loopback a random
+key is generated by default. Only connect workers to a server you trust, and keep the authkey secret.
+"""
+
+import os
+import sys
+import time
+import uuid
+import socket
+import ipaddress
+import queue
+import pickle
+import hashlib
+import argparse
+import threading
+import multiprocessing
+from multiprocessing.managers import BaseManager
+import numpy as np
+
+# The objects of the server process, created by `_init_server()`
+_TASKS, _RESULTS, _JOBS = None, None, None
+
+
+class JobStore:
+    """
+    The pickled fitness payload of the current job, fetched once by each worker, and the number of connected workers.
+    It lives in the server process.
+    """
+
+    def __init__(self):
+        self._payloads = {}
+        self._closed = False
+        self._n_workers = 0
+        self._lock = threading.Lock()
+
+    def connect_worker(self):
+        with self._lock:
+            self._n_workers += 1
+
+    def disconnect_worker(self):
+        with self._lock:
+            self._n_workers -= 1
+
+    def get_n_workers(self):
+        return self._n_workers
+
+    def set_payload(self, job_id, payload):
+        with self._lock:
+            self._payloads = {job_id: payload}
+
+    def get_payload(self, job_id):
+        with self._lock:
+            return self._payloads.get(job_id)
+
+    def end_job(self, job_id):
+        with self._lock:
+            self._payloads.pop(job_id, None)
+
+    def close(self):
+        self._closed = True
+
+    def is_closed(self):
+        return self._closed
+
+
+def _init_server():
+    global _TASKS, _RESULTS, _JOBS
+    _TASKS, _RESULTS, _JOBS = queue.Queue(), queue.Queue(), JobStore()
+
+
+def _get_tasks():
+    return _TASKS
+
+
+def _get_results():
+    return _RESULTS
+
+
+def _get_jobs():
+    return _JOBS
+
+
+class _QueueManager(BaseManager):
+    pass
+
+
+_QueueManager.register("get_tasks", callable=_get_tasks)
+_QueueManager.register("get_results", callable=_get_results)
+_QueueManager.register("get_jobs", callable=_get_jobs,
+                       exposed=("set_payload", "get_payload", "end_job", "close", "is_closed", "connect_worker",
+                                "disconnect_worker", "get_n_workers"))
+
+
+def _get_indices_key(indices):
+    return None if indices is None else hashlib.blake2b(np.asarray(indices).tobytes(), digest_size=16).digest()
+
+
+def _is_loopback(host):
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def _check_authkey(authkey):
+    authkey = authkey.encode() if isinstance(authkey, str) else authkey
+    if not isinstance(authkey, bytes) or len(authkey) == 0:
+        raise TypeError("authkey should be a non-empty bytes or str.")
+    return authkey
+
+
+def run_worker(address, authkey, poll_interval=1.0, reconnect_delay=1.0, max_reconnects=None):
+    """
+    Evaluate the tasks of a work queue until the server is closed.
+
+    The worker keeps the payload (fitness function and training data) of the current job, and the subsets of its
+    training data used by the subsampled fitness, so they are loaded once. When the connection is lost, it reconnects
+    after `reconnect_delay` seconds, and the tasks it was evaluating are published again by the server after a timeout.
+
+    Args:
+        address (tuple): The (host, port) of the server.
+        authkey (bytes): The authentication key of the server (its `authkey` attribute).
+        poll_interval (float): The time (seconds) waiting for a task before checking if the server is closed.
+        reconnect_delay (float): The time (seconds) before reconnecting to the server.
+        max_reconnects (int): The number of failed connections in a row before giving up, default is None (no limit).
+    """
+    authkey = _check_authkey(authkey)
+    job_id, payload, context, subsets = None, None, None, {}
+    n_failures = 0
+    while True:
+        try:
+            manager = _QueueManager(address=tuple(address), authkey=authkey)
+            manager.connect()
+            tasks, results, jobs = manager.get_tasks(), manager.get_results(), manager.get_jobs()
+            jobs.connect_worker()
+            n_failures = 0
+            while True:
+                try:
+                    task_job_id, batch_id, task_id, indices, solutions, batch_size = tasks.get(timeout=poll_interval)
+                except queue.Empty:
+                    if jobs.is_closed():
+                        jobs.disconnect_worker()
+                        return
+                    continue
+                if task_job_id != job_id:
+                    data = jobs.get_payload(task_job_id)
+                    if data is None:
+                        # The task of a finished job, left in the queue
+                        continue
+                    job_id, payload, subsets = task_job_id, pickle.loads(data), {}
+                    context = payload.fitness_context
+                fitness, error = None, None
+                try:
+                    key = _get_indices_key(indices)
+                    if key is not None and key not in subsets:
+                        subsets = {key: context.subset(indices)}
+                    payload.fitness_context = context if key is None else subsets[key]
+                    fitness = np.asarray(payload._get_batch_fitness(solutions, batch_size))
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                results.put((batch_id, task_id, fitness, error))
+        except (EOFError, OSError) as e:
+            # The connection is lost (ConnectionError is an OSError) or the server is not reachable yet
+            n_failures += 1
+            if max_reconnects is not None and n_failures > max_reconnects:
+                raise ConnectionError(f"The worker can't reach the server at {address}.") from e
+            time.sleep(reconnect_delay)
+
+
+class WorkQueueBackend:
+    """
+    A fitness evaluation backend of the metaheuristic-based ELM models, that publishes the populations as tasks in a
+    work queue evaluated by worker processes (see `run_worker()`), e.g. `model.fit(X, y, mode="swarm", backend=backend)`.
+
+    The tasks that are not evaluated within `task_timeout` seconds (e.g. their worker was dropped) are published again,
+    and after `max_retries` times they are evaluated by the model itself, so the training goes on without workers.
+
+    Args:
+        address (tuple): The (host, port) of the server, default is a free port of localhost.
+        authkey (bytes): The authentication key of the server, required when the host is not a loopback address. Default
+            is None: a random key on loopback, read it from the `authkey` attribute to start the workers.
+        n_local_workers (int): The number of worker processes started on this machine with the server.
+        task_size (int): The number of solutions of each task.
+        task_timeout (float): The time (seconds) to wait for the results before publishing the tasks again.
+        max_retries (int): The number of times the tasks are published again before they are evaluated locally.
+        close_timeout (float): The time (seconds) `close()` waits for the connected workers to leave before the server stops.
+    """
+
+    def __init__(self, address=("127.0.0.1", 0), authkey=None, n_local_workers=0, task_size=4,
+                 task_timeout=60.0, max_retries=2, close_timeout=5.0):
+        self.address = tuple(address)
+        if authkey is None:
+            # The tasks are unpickled by the server and the workers, a reachable server needs a secret chosen by the user
+            if not _is_loopback(self.address[0]):
+                raise ValueError(f"authkey is required when the server listens on {self.address[0]} (not a loopback address).")
+            authkey = os.urandom(32)
+        self.authkey = _check_authkey(authkey)
+        self.n_local_workers = n_local_workers
+        self.task_size = task_size
+        self.task_timeout = task_timeout
+        self.max_retries = max_retries
+        self.close_timeout = close_timeout
+        self.stats = {"tasks": 0, "retries": 0, "local": 0}
+        self._manager, self._workers = None, []
+        self._job_id, self._batch_id = None, 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        raise TypeError("WorkQueueBackend can't be pickled, it holds the connection to its server.")
+
+    def is_running(self):
+        """
+        Returns:
+            bool: True if the server is started.
+        """
+        return self._manager is not None
+
+    def start(self):
+        """
+        Start the server and the local workers. The address is updated with the port chosen by the system.
+        """
+        if self._manager is not None:
+            return
+        self._manager = _QueueManager(address=self.address, authkey=self.authkey)
+        self._manager.start(initializer=_init_server)
+        self.address = self._manager.address
+        self._tasks, self._results, self._jobs = self._manager.get_tasks(), self._manager.get_results(), self._manager.get_jobs()
+        for _ in range(self.n_local_workers):
+            worker = multiprocessing.Process(target=run_worker, args=(self.address, self.authkey), kwargs={"max_reconnects": 5},
+                                             daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def close(self):
+        """
+        Stop the workers and the server.
+        """
+        if self._manager is None:
+            return
+        self._jobs.close()
+        # The workers leave when they find the server closed, a dropped worker is not waited for longer than close_timeout
+        deadline = time.perf_counter() + self.close_timeout
+        while self._jobs.get_n_workers() > 0 and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        for worker in self._workers:
+            worker.join(timeout=max(deadline - time.perf_counter(), 0.1))
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+        self._manager.shutdown()
+        self._manager = None
+
+    def start_job(self, model):
+        """
+        Publish the fitness function and the training data of a model, before its training.
+
+        Args:
+            model (BaseMhaElm): The model, only its fitness function and data are sent to the workers.
+        """
+        self.start()
+        self._job_id = uuid.uuid4().hex
+        self._jobs.set_payload(self._job_id, pickle.dumps(model._get_fitness_payload(), protocol=pickle.HIGHEST_PROTOCOL))
+
+    def end_job(self):
+        """
+        Remove the job after the training, the tasks left in the queue are then skipped by the workers.
+        """
+        if self._manager is not None and self._job_id is not None:
+            self._jobs.end_job(self._job_id)
+        self._job_id = None
+
+    def evaluate(self, model, solutions, batch_size=None, indices=None):
+        """
+        Evaluate solutions by the workers.
+
+        Args:
+            model (BaseMhaElm): The model of the current job, it evaluates the tasks the workers fail to return.
+            solutions (np.ndarray): The solutions with shape (n_solutions, n_dims).
+            batch_size (int): The maximum number of solutions evaluated together by a worker, default is None (a whole task).
+            indices (np.ndarray): The indices of the training samples of the subsampled fitness, default is None (all samples).
+
+        Returns:
+            list: The fitness value of each solution.
+        """
+        self._batch_id += 1
+        bounds = {task_id: (start, min(start + self.task_size, len(solutions)))
+                  for task_id, start in enumerate(range(0, len(solutions), self.task_size))}
+
+        def publish(task_ids):
+            for task_id in task_ids:
+                start, end = bounds[task_id]
+                self._tasks.put((self._job_id, self._batch_id, task_id, indices, solutions[start:end], batch_size))
+
+        list_fitness = [None] * len(solutions)
+        pending = set(bounds.keys())
+        publish(pending)
+        self.stats["tasks"] += len(pending)
+        n_retries, deadline = 0, time.perf_counter() + self.task_timeout
+        while pending:
+            try:
+                batch_id, task_id, fitness, error = self._results.get(timeout=max(deadline - time.perf_counter(), 1e-3))
+            except queue.Empty:
+                if n_retries >= self.max_retries:
+                    break
+                n_retries += 1
+                self.stats["retries"] += len(pending)
+                publish(pending)
+                deadline = time.perf_counter() + self.task_timeout
+                continue
+            if batch_id != self._batch_id or task_id not in pending:
+                # A late or duplicated result of a task published again
+                continue
+            if error is not None:
+                raise RuntimeError(f"A worker failed to evaluate the fitness function: {error}")
+            start, end = bounds[task_id]
+            list_fitness[start:end] = list(fitness)
+            pending.discard(task_id)
+        for task_id in pending:
+            start, end = bounds[task_id]
+            list_fitness[start:end] = list(model.batch_fitness_function(solutions[start:end]))
+            self.stats["local"] += 1
+        return list_fitness
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m intelelm.utils.distributed",
+                                     description="Start a worker of a WorkQueueBackend.")
+    parser.add_argument("--address", required=True, help="The HOST:PORT of the server.")
+    parser.add_argument("--authkey", required=True, help="The authentication key of the server.")
+    parser.add_argument("--reconnect-delay", type=float, default=1.0)
+    parser.add_argument("--max-reconnects", type=int, default=None)
+    args = parser.parse_args(argv)
+    host, port = args.address.rsplit(":", 1)
+    run_worker((host, int(port)), args.authkey.encode(), reconnect_delay=args.reconnect_delay,
+               max_reconnects=args.max_reconnects)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from intelelm.utils.metric import FitnessMetric
+from intelelm.utils.profiler import record
+
+
+class FitnessContext:
+    """
+    The precomputed data of the fitness function, created once per `fit()` of the metaheuristic-based ELM models.
+
+    It keeps the training data in the network dtypes, the decoded targets (e.g. the labels of a classifier) and the
+    preallocated buffers of the forward pass. A solution is evaluated with a single forward pass: the hidden matrix used
+    to solve the output weights is reused for the prediction. The network itself is not modified, so the buffers are
+    kept per thread for the "thread" mode. The objective is resolved once as a `FitnessMetric`.
+
+    With a validation set (X_eval), the output weights are still solved on the training data, but the validation set is
+    predicted and compared with the metric instead.
+
+    Args:
+        network (MultiLayerELM): The network whose weights and biases are encoded in the solutions.
+        X (np.ndarray): The training features.
+        y (np.ndarray): The (scaled) targets used to solve the output weights.
+        y_true (np.ndarray): The decoded targets of the training data, default is y.
+        metric (FitnessMetric): The objective computed from the predictions, on y_true or y_eval.
+        X_eval (np.ndarray): The validation features, default is None (the training data is predicted).
+        y_eval (np.ndarray): The decoded targets of the validation set.
+    """
+
+    def __init__(self, network, X, y, y_true=None, metric=None, X_eval=None, y_eval=None):
+        self.network = network
+        self.X = np.asarray(X, dtype=network.dtype)
+        self.y = np.asarray(y, dtype=network.solver_dtype)
+        self.y_true = self.y if y_true is None else np.asarray(y_true)
+        self.metric = metric
+        self.X_eval = None if X_eval is None else np.asarray(X_eval, dtype=network.dtype)
+        self.y_eval = None if y_eval is None else np.asarray(y_eval)
+        self._buffers = {}
+
+    def __getstate__(self):
+        # The buffers are recreated lazily, there is no need to send them to other processes
+        state = self.__dict__.copy()
+        state["_buffers"] = {}
+        return state
+
+    def _get_buffers(self):
+        key = threading.get_ident()
+        if key not in self._buffers:
+            n_samples = self.X.shape[0]
+            hidden = [np.empty((n_samples, size), dtype=self.network.dtype) for size in self.network.layer_sizes]
+            if self.X_eval is not None:
+                n_samples = self.X_eval.shape[0]
+            output = np.empty((n_samples,) + self.y.shape[1:], dtype=self.network.dtype)
+            self._buffers[key] = (hidden, output)
+        return self._buffers[key]
+
+    def _get_population_buffers(self, n_agents):
+        # The flat hidden matrices of the batched forward pass of n_agents networks, one per layer, grown when needed
+        key = (threading.get_ident(), "population")
+        n_samples = self.X.shape[0] if self.X_eval is None else max(self.X.shape[0], self.X_eval.shape[0])
+        buffers = self._buffers.get(key)
+        if buffers is None or len(buffers[0]) < n_agents * n_samples * self.network.layer_sizes[0]:
+            buffers = [np.empty(n_agents * n_samples * size, dtype=self.network.dtype) for size in self.network.layer_sizes]
+            self._buffers[key] = buffers
+        return buffers
+
+    def predict(self, solution):
+        """
+        Decode a solution, solve its output weights and predict the training data.
+
+        Args:
+            solution (np.ndarray): The solution vector (weights and biases of the network).
+
+        Returns:
+            np.ndarray: The predictions. It is a buffer overwritten by the next call in the same thread.
+        """
+        weights, biases = self.network._decode_weights(solution)
+        hidden, output = self._get_buffers()
+        H = self.X
+        masks = self.network.get_feature_masks(solution)
+        if masks is not None:
+            # Only the selected features are multiplied, the weights of the dropped features are zeros
+            H, weights = self.X[:, masks[0]], [weights[0][masks[0]]] + list(weights[1:])
+        with record("forward"):
+            for weight, bias, buffer in zip(weights, biases, hidden):
+                if weight.shape[1] < buffer.shape[1]:
+                    # The active hidden units of width_selection, in the contiguous prefix of the buffer
+                    buffer = buffer.ravel()[:buffer.shape[0] * weight.shape[1]].reshape((buffer.shape[0], -1))
+                np.dot(H, weight, out=buffer)
+                buffer += bias
+                H = self.network.act_func(buffer)
+        beta = self.network._solve(H, self.y)
+        if self.X_eval is not None:
+            H = self.network._forward(self.X_eval if masks is None else self.X_eval[:, masks[0]], weights, biases)
+        return np.dot(H, beta, out=output)
+
+    def predict_population(self, solutions):
+        """
+        Decode a population of solutions and predict the training data with every network at once.
+
+        Args:
+            solutions (np.ndarray): The solution vectors with shape (n_agents, n_dims).
+
+        Returns:
+            np.ndarray: The predictions with shape (n_agents, n_samples) or (n_agents, n_samples, n_outputs).
+        """
+        buffers = self._get_population_buffers(len(solutions))
+        return self.network.evaluate_population(solutions, self.X, self.y, self.X_eval, buffers)
+
+    def share(self, dataset):
+        """
+        Create a copy of the context whose arrays are pickled by reference, so the "process" mode sends the names of
+        the memory-mapped files to the workers instead of the training data.
+
+        Args:
+            dataset (SharedDataset): The shared data of the worker processes.
+
+        Returns:
+            FitnessContext: The shared context.
+        """
+        context = copy.copy(self)
+        context._buffers = {}
+        context.X, context.y, context.y_true = dataset.share(self.X), dataset.share(self.y), dataset.share(self.y_true)
+        context.X_eval, context.y_eval = dataset.share(self.X_eval), dataset.share(self.y_eval)
+        context.metric = None if self.metric is None else self.metric.share(dataset)
+        return context
+
+    def subset(self, indices):
+        """
+        Create the context of a subsample of the training data, with its own buffers and metric. With a validation set,
+        only the data used to solve the output weights is subsampled, the validation set and its metric are kept.
+
+        Args:
+            indices (np.ndarray): The indices of the samples.
+
+        Returns:
+            FitnessContext: The context of the subsample.
+        """
+        metric = self.metric
+        if self.metric is not None and self.X_eval is None:
+            metric = FitnessMetric(self.metric.name, self.metric.y_true_raw[indices], self.metric.task)
+        return FitnessContext(self.network, self.X[indices], self.y[indices], self.y_true[indices], metric, self.X_eval, self.y_eval)
+
+
+class StratifiedSubsampler:
+    """
+    Draw rotating stratified subsamples of the training data for the stochastic (mini-batch) fitness.
+
+    Each stratum is shuffled once and read cyclically, so the consecutive subsamples cover all samples before any of
+    them is reused. Every stratum keeps at least one sample in each subsample.
+
+    Args:
+        strata (np.ndarray): The stratum of each sample, e.g. the labels or the quantile bins of the targets.
+        size (int): The number of samples of the first subsample.
+        growth (float): The subsample size is multiplied by growth after each draw, until it reaches all samples.
+        seed (int): The seed of the shuffling.
+    """
+
+    def __init__(self, strata, size, growth=1.0, seed=None):
+        generator = np.random.default_rng(seed)
+        _, inverse = np.unique(strata, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(np.bincount(inverse))[:-1]
+        self.groups = [generator.permutation(group) for group in np.split(order, bounds)]
+        self.cursors = [0] * len(self.groups)
+        self.n_samples = len(inverse)
+        self.size = float(size)
+        self.growth = growth
+
+    def sample(self):
+        """
+        Draw the next subsample.
+
+        Returns:
+            np.ndarray: The sorted indices of the samples.
+        """
+        size = min(int(self.size), self.n_samples)
+        self.size *= self.growth
+        if size >= self.n_samples:
+            return np.arange(self.n_samples)
+        list_indices = []
+        for idx, group in enumerate(self.groups):
+            quota = min(len(group), max(1, int(round(size * len(group) / self.n_samples))))
+            list_indices.append(group[(self.cursors[idx] + np.arange(quota)) % len(group)])
+            self.cursors[idx] = (self.cursors[idx] + quota) % len(group)
+        return np.sort(np.concatenate(list_indices))
+
+
+class FitnessCache:
+    """
+    A bounded LRU cache of the fitness values, keyed on a hash of the quantized solution vector.
+
+    Solutions whose values round to the same multiple of `step` share the same entry, so the identical or near-identical
+    solutions re-submitted by the optimizer are not decoded and solved again. The least recently used entry is evicted
+    when the cache is full.
+
+    Args:
+        capacity (int): The maximum number of cached solutions.
+        step (float): The quantization step of the solution values.
+    """
+
+    def __init__(self, capacity=1000, step=1e-8):
+        self.capacity = capacity
+        self.step = step
+        self.hits, self.misses = 0, 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get_key(self, solution):
+        """
+        Args:
+            solution (np.ndarray): The solution vector.
+
+        Returns:
+            bytes: The hash of the quantized solution (adding 0.0 turns -0.0 into 0.0).
+        """
+        quantized = np.rint(np.asarray(solution, dtype=np.float64) / self.step) + 0.0
+        return hashlib.blake2b(quantized.tobytes(), digest_size=16).digest()
+
+    def get(self, key):
+        """
+        Args:
+            key (bytes): The key of the solution.
+
+        Returns:
+            The cached fitness value, None if the solution is not cached.
+        """
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """
+        Args:
+            key (bytes): The key of the solution.
+            value (float or np.ndarray): The fitness value of the solution.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all entries (e.g. when the training data of the fitness changes), the statistics are kept.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: The number of hits and misses, the hit rate, the current size and the capacity of the cache.
+        """
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._data), "capacity": self.capacity}
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+import numpy as np
+from mealpy.utils.history import History
+
+SUPPORTED_HISTORY_MODES = ("full", "compact")
+
+
+class _RecentList(list):
+    """
+    A list that only keeps its last `size` items, so the agents appended by the optimizer every epoch are released.
+    """
+    size = 2
+
+    def append(self, item):
+        super().append(item)
+        if len(self) > self.size:
+            del self[0]
+
+
+class CompactHistory(History):
+    """
+    The history of a Mealpy optimizer that keeps the numbers of each epoch but not the agents, so its memory does not
+    grow with the size of the solutions: only the last global/current best and worst agents are kept.
+
+    Per epoch, it keeps the fitness of the global and current best (list_global_best_fit, list_current_best_fit), the
+    objectives of the global best (list_global_best_objectives), the runtime and the diversity. The best solution can be
+    saved every k epochs (best_solutions, best_solution_epochs). The charts of the agents (e.g. the trajectory or the
+    global objectives charts) are not available, the population is never saved.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.list_global_best_objectives = []
+        self.best_solutions, self.best_solution_epochs = [], []
+        self.initial_best_fit = None
+
+    def store_initial_best_worst(self, best_agent, worst_agent):
+        self.list_global_best = _RecentList([best_agent.copy()])
+        self.list_current_best = _RecentList([best_agent.copy()])
+        self.list_global_worst = _RecentList([worst_agent.copy()])
+        self.list_current_worst = _RecentList([worst_agent.copy()])
+        self.initial_best_fit = best_agent.target.fitness
+
+    def get_global_repeated_times(self, epsilon):
+        count = 0
+        list_fit = [self.initial_best_fit] + list(self.list_global_best_fit)
+        for idx in range(0, len(list_fit) - 1):
+            if np.abs(list_fit[idx] - list_fit[idx + 1]) <= epsilon:
+                count += 1
+            else:
+                count = 0
+        return count
+
+    def save_epoch(self, epoch, target, solution=None):
+        """
+        Args:
+            epoch (int): The index of the epoch.
+            target (Target): The target of the global best.
+            solution (np.ndarray): The global best solution to save, default is None (not saved this epoch).
+        """
+        self.list_global_best_objectives.append(np.array(target.objectives, dtype=float))
+        if solution is not None:
+            self.best_solutions.append(np.array(solution, copy=True))
+            self.best_solution_epochs.append(epoch)
+
+    def get_best_fitness(self):
+        """
+        Returns:
+            np.ndarray: The fitness of the global best of each epoch.
+        """
+        return np.array(self.list_global_best_fit, dtype=float)
+
+    def get_best_solutions(self):
+        """
+        Returns:
+            tuple: The epochs where the best solution was saved, and the solutions with shape (n_saved, n_dims).
+        """
+        return np.array(self.best_solution_epochs, dtype=int), np.array(self.best_solutions)
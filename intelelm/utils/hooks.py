@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+"""
+The hooks of the metaheuristic-based ELM models in the loop of their Mealpy optimizer during `fit()`.
+
+The optimizer is not patched attribute by attribute: `OptimizerHooks.attach()` replaces its class by a subclass of
+`OptimizerHooks` and of its own class, and `OptimizerHooks.detach()` restores the class after the training, so an
+optimizer given by the user is left as it was.
+"""
+
+import copyreg
+from intelelm.utils.history import CompactHistory
+
+
+class OptimizerHooks:
+    """
+    The mixin of a Mealpy optimizer trained by a model, it overrides the steps of `Optimizer.solve()`:
+
+        - `check_problem()`: the History is replaced by a CompactHistory with history="compact"
+        - `update_target_for_population()`: the population is evaluated by the model (batched, or pre-screened by its
+          surrogate), `_update_target_by_mode()` is the evaluation of the optimizer itself
+        - `track_optimize_step()`: `_after_epoch()` of the model is called at the end of each epoch, after the history
+        - `check_termination()`: the optimizer also stops when the model stops early (by the patience or a callback)
+
+    When a checkpoint is resumed (see `BaseMhaElm.save_checkpoint()`), `solve()` starts from the solutions of its agents:
+    `before_initialization()` restores the agents, the number of evaluations and the random generators instead of
+    evaluating the solutions again, `after_initialization()` restores the global best and the history, and the epochs
+    are counted from the last epoch of the checkpoint.
+
+    A hooked optimizer is pickled (e.g. by the "process" mode) and copied as the plain optimizer, without the model.
+    """
+    _hooked_classes = {}
+
+    @classmethod
+    def attach(cls, optimizer, model, checkpoint=None):
+        """
+        Args:
+            optimizer (Optimizer): The Mealpy optimizer.
+            model (BaseMhaElm): The model trained by the optimizer.
+            checkpoint (dict): The checkpoint (or the state of `get_state()`) resumed by the optimizer, default is None
+                (a new training).
+        """
+        base = type(optimizer)
+        if base not in cls._hooked_classes:
+            cls._hooked_classes[base] = type(base.__name__, (cls, base), {"__module__": base.__module__,
+                                                                          "__qualname__": base.__qualname__})
+        optimizer.__class__ = cls._hooked_classes[base]
+        optimizer._hooked_model, optimizer._hooked_checkpoint = model, checkpoint
+
+    @staticmethod
+    def detach(optimizer):
+        """
+        Restore the class of a hooked optimizer, it does nothing if the optimizer is not hooked.
+        """
+        if isinstance(optimizer, OptimizerHooks):
+            optimizer.__class__ = type(optimizer).__bases__[1]
+            optimizer.__dict__.pop("_hooked_model", None)
+            optimizer.__dict__.pop("_hooked_checkpoint", None)
+
+    def __reduce_ex__(self, protocol):
+        state = {key: value for key, value in self.__dict__.items() if key not in ("_hooked_model", "_hooked_checkpoint")}
+        return copyreg._reconstructor, (type(self).__bases__[1], object, None), state
+
+    @staticmethod
+    def get_state(optimizer, epoch):
+        """
+        The state of an optimizer after an epoch, resumed by `solve()` of the hooked optimizer: the agents of the
+        population, the global best, the history, the number of evaluations and the states of the random generators.
+
+        Args:
+            optimizer (Optimizer): The Mealpy optimizer.
+            epoch (int): The last finished epoch.
+
+        Returns:
+            dict: The state of the optimizer.
+        """
+        return {
+            "optimizer": optimizer.__class__.__name__,
+            "n_dims": optimizer.problem.n_dims,
+            "epoch": epoch,
+            "pop": optimizer.pop,
+            "g_best": optimizer.g_best,
+            "history": optimizer.history,
+            "nfe_counter": optimizer.nfe_counter,
+            "generator": optimizer.generator.bit_generator.state,
+            "bound_generators": [bound.generator.bit_generator.state for bound in optimizer.problem.bounds],
+        }
+
+    def _get_epoch_offset(self):
+        return 0 if self._hooked_checkpoint is None else self._hooked_checkpoint["epoch"]
+
+    def check_problem(self, problem, seed):
+        super().check_problem(problem, seed)
+        if self._hooked_model._history_mode == "compact":
+            self.history = CompactHistory(log_to=self.problem.log_to, log_file=self.problem.log_file)
+
+    def before_initialization(self, starting_solutions=None):
+        checkpoint = self._hooked_checkpoint
+        if checkpoint is None:
+            return super().before_initialization(starting_solutions)
+        self.pop = [agent.copy() for agent in checkpoint["pop"]]
+        self.nfe_counter = checkpoint["nfe_counter"]
+        self.generator.bit_generator.state = checkpoint["generator"]
+        for bound, state in zip(self.problem.bounds, checkpoint["bound_generators"]):
+            bound.generator.bit_generator.state = state
+
+    def after_initialization(self):
+        super().after_initialization()
+        checkpoint = self._hooked_checkpoint
+        if checkpoint is not None:
+            self.g_best, self.history = checkpoint["g_best"].copy(), checkpoint["history"]
+
+    def evolve(self, epoch):
+        return super().evolve(epoch + self._get_epoch_offset())
+
+    def update_target_for_population(self, pop=None):
+        return self._hooked_model._update_target_for_population(self, pop)
+
+    def _update_target_by_mode(self, pop=None):
+        return super().update_target_for_population(pop)
+
+    def track_optimize_step(self, pop=None, epoch=None, runtime=None):
+        epoch += self._get_epoch_offset()
+        super().track_optimize_step(pop, epoch, runtime)
+        self._hooked_model._after_epoch(self, epoch)
+
+    def check_termination(self, mode="start", termination=None, epoch=None):
+        if mode == "start":
+            return super().check_termination(mode, termination, epoch)
+        # The loop of solve() runs the remaining epochs of a resumed checkpoint
+        epoch += self._get_epoch_offset()
+        finished = super().check_termination(mode, termination, epoch) or epoch >= self.epoch
+        model = self._hooked_model
+        if not finished and model.stopped_epoch is not None:
+            self.logger.warning(f"{model._stop_reason} End program!")
+            finished = True
+        return finished
+
+
+class FitnessFunction:
+    """
+    The objective function of the Mealpy problem of a model: the fitness of a solution, read from the fitness cache of
+    the model when it has one. It is pickled (e.g. by the "process" mode) as a copy of the model with only what its
+    fitness function needs (see `_get_fitness_payload()`), which scores the solutions on the current subsample.
+
+    Args:
+        model (BaseMhaElm): The model.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, solution):
+        if self.model.fitness_cache is None:
+            return self.model._get_fitness(solution)
+        return self.model._get_cached_fitness(solution)
+
+    def __getstate__(self):
+        payload = self.model._get_fitness_payload()
+        payload.fitness_context = self.model.fitness_context
+        return {"model": payload}
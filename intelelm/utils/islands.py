@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+"""
+The island model of the metaheuristic-based ELM models, e.g. `MhaElmRegressor().fit(X, y, islands=4)`.
+
+Each island is a Mealpy optimizer with its own population, run by its own process. The islands run the same number of
+epochs, and every `migration_interval` epochs the best agents of each island migrate to the next island of the ring,
+where they replace the worst agents.
+"""
+
+import pickle
+import traceback
+import multiprocessing
+import numpy as np
+from intelelm.utils.hooks import OptimizerHooks
+
+
+def _add_migrants(optimizer, migrants):
+    # Replace the worst agents by the migrants, they are evaluated again so the optimizers can attach their own attributes
+    fits = np.array([agent.target.fitness for agent in optimizer.pop])
+    order = np.argsort(fits)
+    worst = order[::-1] if optimizer.problem.minmax == "min" else order
+    for idx, solution in zip(worst, migrants):
+        optimizer.pop[idx] = optimizer.generate_agent(np.array(solution, copy=True))
+    _, optimizer.g_best = optimizer.update_global_best_agent(optimizer.pop, save=False)
+
+
+def run_island(conn, payload, optimizer, problem, seed=None, mode="single", starting_solutions=None):
+    """
+    Run an island in a worker process. Each message ("run", n_epochs, migrants, n_emigrants) of the connection runs
+    `Optimizer.solve()` for the next epochs, until the message ("stop", ). The first run starts from the starting
+    solutions, the next ones resume the population of the previous run (see `OptimizerHooks.get_state()`), where the
+    migrants replace the worst agents.
+
+    Args:
+        conn (Connection): The connection with the main process.
+        payload (bytes): The pickled model, with its fitness function, its population evaluation (batched in "batch"
+            mode) and training data (see `_get_fitness_payload()`).
+        optimizer (Optimizer): The Mealpy optimizer of the island.
+        problem (dict): The problem of the optimizer, without its objective function.
+        seed (int): The seed of the optimizer.
+        mode (str): The mode of the optimizer: "single" or "swarm".
+        starting_solutions (np.ndarray): The initial population, default is None (drawn by the optimizer).
+    """
+    try:
+        model = pickle.loads(payload)
+        problem = {**problem, "obj_func": model._get_fitness}
+        epoch = 0
+        while True:
+            message = conn.recv()
+            if message[0] == "stop":
+                break
+            _, n_epochs, migrants, n_emigrants = message
+            state = None
+            if epoch > 0:
+                if migrants is not None and len(migrants) > 0:
+                    _add_migrants(optimizer, migrants)
+                state = OptimizerHooks.get_state(optimizer, epoch)
+                starting_solutions = np.array([agent.solution for agent in optimizer.pop])
+            OptimizerHooks.attach(optimizer, model, state)
+            try:
+                optimizer.solve(problem, mode, termination={"max_epoch": epoch + n_epochs},
+                                starting_solutions=starting_solutions, seed=seed)
+            finally:
+                OptimizerHooks.detach(optimizer)
+            epoch += n_epochs
+            list_best = [(agent.target.fitness, np.array(agent.target.objectives, dtype=float))
+                         for agent in optimizer.history.list_global_best[-n_epochs:]]
+            emigrants = [agent.solution for agent in optimizer.get_sorted_population(optimizer.pop, optimizer.problem.minmax)[:n_emigrants]]
+            conn.send(("ok", {"list_best": list_best, "emigrants": emigrants, "best_solution": optimizer.g_best.solution,
+                              "best_fit": optimizer.g_best.target.fitness, "nfe": optimizer.nfe_counter,
+                              "population": np.array([agent.solution for agent in optimizer.pop])}))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+class IslandProcess:
+    """
+    The handle of an island run by a worker process (see `run_island()`).
+    """
+
+    def __init__(self, payload, optimizer, problem, seed=None, mode="single", starting_solutions=None):
+        self.name = optimizer.__class__.__name__
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=run_island, args=(child_conn, payload, optimizer, problem, seed, mode,
+                                                                        starting_solutions), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def run(self, n_epochs, migrants=None, n_emigrants=1):
+        """
+        Ask the island to run the next epochs, after adding the migrants to its population.
+        """
+        self.conn.send(("run", n_epochs, migrants, n_emigrants))
+
+    def get_result(self):
+        """
+        Returns:
+            dict: The best (fitness, objectives) of each epoch run, the emigrants, the best solution and fitness, the
+                number of evaluations and the population of the island.
+        """
+        try:
+            status, result = self.conn.recv()
+        except EOFError:
+            raise RuntimeError(f"The island {self.name} stopped unexpectedly (exit code {self.process.exitcode}).")
+        if status == "error":
+            raise RuntimeError(f"The island {self.name} failed:\n{result}")
+        return result
+
+    def close(self):
+        try:
+            self.conn.send(("stop", ))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+
+"""
+Vectorized kernels of the common objectives, used inside the fitness function instead of creating a RegressionMetric or
+ClassificationMetric object of permetrics in every evaluation. They follow the default arguments of permetrics
+(multi_output="raw_values", average="macro", force_finite=True) and evaluate a whole stack of predictions at once.
+"""
+
+import copy
+import numpy as np
+from permetrics import RegressionMetric, ClassificationMetric
+from intelelm.utils.profiler import record
+
+EPSILON = 1e-10
+
+
+def _mse(y_true, y_pred):
+    diff = y_pred - y_true
+    return np.add.reduce(diff * diff, axis=1) / y_true.shape[0]
+
+
+def _rmse(y_true, y_pred):
+    return np.sqrt(_mse(y_true, y_pred))
+
+
+def _mae(y_true, y_pred):
+    return np.add.reduce(np.abs(y_pred - y_true), axis=1) / y_true.shape[0]
+
+
+def _me(y_true, y_pred):
+    return np.max(np.abs(y_pred - y_true), axis=1)
+
+
+def _medae(y_true, y_pred):
+    return np.median(np.abs(y_pred - y_true), axis=1)
+
+
+def _mape(y_true, y_pred):
+    with np.errstate(all="ignore"):
+        return np.mean(np.abs(y_pred - y_true) / np.abs(y_true), axis=1)
+
+
+def _smape(y_true, y_pred):
+    with np.errstate(all="ignore"):
+        return np.mean(np.abs(y_pred - y_true) / (np.abs(y_true) + np.abs(y_pred)), axis=1)
+
+
+def _r2(y_true, y_pred):
+    with np.errstate(all="ignore"):
+        return 1 - np.sum((y_true - y_pred) ** 2, axis=1) / np.sum((y_true - np.mean(y_true, axis=0)) ** 2, axis=0)
+
+
+def _evs(y_true, y_pred):
+    with np.errstate(all="ignore"):
+        return 1 - np.var(y_true - y_pred, axis=1) / np.var(y_true, axis=0)
+
+
+def _pcc(y_true, y_pred):
+    y_true = y_true - np.mean(y_true, axis=0)
+    y_pred = y_pred - np.mean(y_pred, axis=1, keepdims=True)
+    with np.errstate(all="ignore"):
+        return np.sum(y_true * y_pred, axis=1) / (np.sqrt(np.sum(y_true ** 2, axis=0)) * np.sqrt(np.sum(y_pred ** 2, axis=1)))
+
+
+# name: (kernel, finite_value), a kernel takes y_true (n_samples, n_outputs) and y_pred (n_preds, n_samples, n_outputs)
+REGRESSION_KERNELS = {
+    "MSE": (_mse, 1.0), "RMSE": (_rmse, 1.0), "MAE": (_mae, 1.0), "ME": (_me, 1.0), "MedAE": (_medae, 1.0),
+    "MAPE": (_mape, 1.0), "SMAPE": (_smape, 1.0), "R2": (_r2, 0.0), "COD": (_r2, 0.0), "NSE": (_r2, 0.0),
+    "EVS": (_evs, 0.0), "R": (_pcc, -1.0), "PCC": (_pcc, -1.0),
+}
+
+
+def _nan_to_zero(x):
+    return np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def _precision(tp, fp, fn, tn):
+    with np.errstate(all="ignore"):
+        return _nan_to_zero(tp / (tp + fp))
+
+
+def _recall(tp, fp, fn, tn):
+    with np.errstate(all="ignore"):
+        return _nan_to_zero(tp / (tp + fn))
+
+
+def _specificity(tp, fp, fn, tn):
+    with np.errstate(all="ignore"):
+        return _nan_to_zero(tn / (tn + fp))
+
+
+def _npv(tp, fp, fn, tn):
+    with np.errstate(all="ignore"):
+        return _nan_to_zero(tn / (tn + fn))
+
+
+def _accuracy(tp, fp, fn, tn):
+    with np.errstate(all="ignore"):
+        return _nan_to_zero((tp + tn) / (tp + tn + fp + fn))
+
+
+def _fbeta(tp, fp, fn, tn, beta=1.0):
+    with np.errstate(all="ignore"):
+        precision, recall = tp / (tp + fp), tp / (tp + fn)
+        return _nan_to_zero((1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall))
+
+
+def _f2(tp, fp, fn, tn):
+    return _fbeta(tp, fp, fn, tn, beta=2.0)
+
+
+def _mcc(tp, fp, fn, tn):
+    tp, fp, fn, tn = (np.asarray(x, dtype=float) for x in (tp, fp, fn, tn))
+    with np.errstate(all="ignore"):
+        return _nan_to_zero((tp * tn - fp * fn) / np.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn)))
+
+
+def _jsi(tp, fp, fn, tn):
+    with np.errstate(all="ignore"):
+        return _nan_to_zero(tp / (tp + fp + fn))
+
+
+# A label kernel takes the per-class counts tp, fp, fn, tn with shape (n_preds, n_classes) and returns per-class values
+CLASSIFICATION_LABEL_KERNELS = {
+    "PS": _precision, "NPV": _npv, "RS": _recall, "AS": _accuracy, "F1S": _fbeta, "F2S": _f2, "SS": _specificity,
+    "MCC": _mcc, "JSI": _jsi,
+}
+CLASSIFICATION_SCORE_KERNELS = ("CEL", )
+
+
+class FitnessMetric:
+    """
+    A metric used as objective, resolved once per `fit()`. The ground truth is preprocessed once, and the metric is
+    computed by a vectorized kernel when there is one, otherwise by permetrics.
+
+    Args:
+        name (str): The name of the metric in permetrics, e.g. "MSE", "AS", "CEL".
+        y_true (np.ndarray): The ground truth values (regression) or labels (classification).
+        task (str): "regression" or "classification".
+    """
+
+    def __init__(self, name, y_true, task="regression"):
+        self.name = name
+        self.task = task
+        self.y_true_raw = y_true
+        self.native = False
+        if task == "regression":
+            if name in REGRESSION_KERNELS:
+                y_true = np.squeeze(np.asarray(y_true, dtype=np.float64))
+                self.y_true = y_true.reshape((y_true.shape[0], -1))
+                self.native = True
+        else:
+            if name in CLASSIFICATION_LABEL_KERNELS or name in CLASSIFICATION_SCORE_KERNELS:
+                y_true = np.squeeze(np.asarray(y_true))
+                if y_true.ndim == 1 and np.issubdtype(y_true.dtype, np.number):
+                    self.classes, self.y_true = np.unique(y_true, return_inverse=True)
+                    self.y_true = self.y_true.ravel()
+                    self.native = True
+
+    def share(self, dataset):
+        """
+        Args:
+            dataset (SharedDataset): The shared data of the worker processes.
+
+        Returns:
+            FitnessMetric: A copy of the metric whose ground truth is pickled by reference (see `SharedDataset`).
+        """
+        metric = copy.copy(self)
+        metric.y_true_raw = dataset.share(self.y_true_raw)
+        if self.native:
+            metric.y_true = dataset.share(self.y_true)
+        return metric
+
+    def _evaluate_regression(self, y_preds):
+        kernel, finite_value = REGRESSION_KERNELS[self.name]
+        n_samples, n_outputs = self.y_true.shape
+        y_preds = np.asarray(y_preds, dtype=np.float64).reshape((-1, n_samples, n_outputs))
+        result = np.asarray(kernel(self.y_true, y_preds), dtype=float)
+        result[~np.isfinite(result)] = finite_value
+        return result[:, 0] if n_outputs == 1 else result
+
+    def _encode_labels(self, y_preds):
+        # Map the predicted labels (or the argmax of the scores) into the indices of the classes of y_true
+        n_classes = len(self.classes)
+        if y_preds.ndim == 3:
+            return np.argmax(y_preds, axis=-1)
+        if np.issubdtype(y_preds.dtype, np.floating):
+            y_preds = np.rint(y_preds)
+        indices = np.searchsorted(self.classes, y_preds)
+        if np.any(indices >= n_classes) or np.any(self.classes[np.minimum(indices, n_classes - 1)] != y_preds):
+            return None
+        return indices
+
+    def _evaluate_labels(self, y_preds):
+        indices = self._encode_labels(y_preds)
+        if indices is None:
+            return None
+        n_preds, n_classes = indices.shape[0], len(self.classes)
+        keys = (np.arange(n_preds)[:, None] * n_classes + self.y_true) * n_classes + indices
+        matrix = np.bincount(keys.ravel(), minlength=n_preds * n_classes ** 2).reshape((n_preds, n_classes, n_classes))
+        tp = np.diagonal(matrix, axis1=1, axis2=2)
+        fp = np.sum(matrix, axis=1) - tp
+        fn = np.sum(matrix, axis=2) - tp
+        tn = len(self.y_true) - tp - fp - fn
+        return np.mean(CLASSIFICATION_LABEL_KERNELS[self.name](tp, fp, fn, tn), axis=1)
+
+    def _evaluate_scores(self, y_preds):
+        n_classes = len(self.classes)
+        if y_preds.ndim == 2:
+            indices = self._encode_labels(y_preds)
+            if indices is None:
+                return None
+            y_preds = np.eye(n_classes)[indices]
+        if y_preds.shape[-1] != n_classes:
+            return None
+        y_score = np.take_along_axis(y_preds, self.y_true[None, :, None], axis=-1)[..., 0]
+        return -np.mean(np.log(np.clip(y_score, EPSILON, 1 - EPSILON)), axis=1)
+
+    def _evaluate_permetrics(self, y_pred):
+        if self.task == "regression":
+            return RegressionMetric(self.y_true_raw, y_pred).get_metric_by_name(self.name)[self.name]
+        return ClassificationMetric(self.y_true_raw, y_pred).get_metric_by_name(self.name)[self.name]
+
+    def batch(self, y_preds):
+        """
+        Compute the metric of a stack of predictions.
+
+        Args:
+            y_preds (np.ndarray): The predictions with shape (n_preds, n_samples) or (n_preds, n_samples, n_outputs).
+
+        Returns:
+            np.ndarray: The metric of each prediction, with shape (n_preds,) or (n_preds, n_outputs) for multi-output regression.
+        """
+        result = None
+        with record("metric"):
+            if self.native:
+                y_preds = np.asarray(y_preds)
+                if self.task == "regression":
+                    result = self._evaluate_regression(y_preds)
+                elif self.name in CLASSIFICATION_LABEL_KERNELS:
+                    result = self._evaluate_labels(y_preds)
+                else:
+                    result = self._evaluate_scores(y_preds)
+            if result is None:
+                result = np.array([self._evaluate_permetrics(y_pred) for y_pred in y_preds])
+        return result
+
+    def __call__(self, y_pred):
+        """
+        Compute the metric of a single prediction.
+
+        Args:
+            y_pred (np.ndarray): The prediction with shape (n_samples,) or (n_samples, n_outputs).
+
+        Returns:
+            float or np.ndarray: The metric, an array with shape (n_outputs,) for multi-output regression.
+        """
+        if not self.native:
+            with record("metric"):
+                return self._evaluate_permetrics(y_pred)
+        return self.batch(np.asarray(y_pred)[None, ...])[0]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+"""
+The option objects of `fit()` of the metaheuristic-based ELM models, which group the parameters of a training option,
+e.g. `MhaElmRegressor().fit(X, y, checkpoint=Checkpoint("run.pkl", every=10), islands=Islands(4, migration_interval=5))`.
+
+Each option also takes its main parameter alone, with the defaults of the others: `subsample=0.2` is `Subsample(0.2)`,
+`cache=1000` is `Cache(1000)`, `surrogate="rff"` is `Surrogate("rff")`, `checkpoint="run.pkl"` is `Checkpoint("run.pkl")`,
+`history="compact"` is `History("compact")` and `islands=4` is `Islands(4)`.
+"""
+
+
+class Subsample:
+    """
+    The rotating stratified subsample of the training data that scores the agents, it changes every epoch.
+
+    Args:
+        size (int, float): The number (int) or the fraction (float) of samples.
+        growth (float): The subsample size is multiplied by this factor after each epoch, default is 1.0 (fixed size).
+    """
+
+    def __init__(self, size, growth=1.0):
+        self.size = size
+        self.growth = growth
+
+
+class Cache:
+    """
+    The LRU cache of the fitness values, the solutions rounded to the same values share their cached fitness.
+
+    Args:
+        size (int): The capacity of the cache.
+        step (float): The quantization step of the solutions, default is 1e-8.
+    """
+
+    def __init__(self, size, step=1e-8):
+        self.size = size
+        self.step = step
+
+
+class Surrogate:
+    """
+    The surrogate that pre-screens the candidates, only the most promising ones are scored by the fitness function.
+
+    Args:
+        model (str, object): "rff" (RandomFeatureSurrogate, trained online on the evaluated solutions) or an object with
+            the same `update()`, `predict()` and `is_ready()` methods.
+        ratio (float): The fraction of each population scored by the fitness function, default is 0.5.
+    """
+
+    def __init__(self, model="rff", ratio=0.5):
+        self.model = model
+        self.ratio = ratio
+
+
+class Checkpoint:
+    """
+    The checkpoints of the training, see `BaseMhaElm.save_checkpoint()`. An interrupted fit is continued by
+    `fit(..., resume_from=path)`.
+
+    Args:
+        path (str): The checkpoint file, it is replaced atomically.
+        every (int): Save the checkpoint every this number of epochs, default is None (every epoch without interval).
+        interval (float): Save the checkpoint when this number of seconds has passed since the last one, default is None.
+    """
+
+    def __init__(self, path, every=None, interval=None):
+        self.path = path
+        self.every = every
+        self.interval = interval
+
+
+class History:
+    """
+    The history kept by the optimizer.
+
+    Args:
+        mode (str): "full" (the Mealpy History of the agents of every epoch) or "compact" (a `CompactHistory` of the
+            fitness values of every epoch, without the agents), default is "full".
+        every (int): Save the global best solution every this number of epochs in the compact history (in
+            `optimizer.history.get_best_solutions()`), default is None (not saved).
+    """
+
+    def __init__(self, mode="full", every=None):
+        self.mode = mode
+        self.every = every
+
+
+class Islands:
+    """
+    The island model, see `intelelm.utils.islands`.
+
+    Args:
+        optimizers (int, list): The number of islands (copies of the optimizer of the model) or a list of optimizers
+            (names of `SUPPORTED_OPTIMIZERS`, with the epoch and pop_size of `optim_paras`, or Optimizer instances).
+        migration_interval (int): The number of epochs between two migrations, default is 10.
+        migration_size (int): The number of best agents of each island sent to the next island of the ring (replacing
+            its worst agents) at each migration, default is 1.
+    """
+
+    def __init__(self, optimizers, migration_interval=10, migration_size=1):
+        self.optimizers = optimizers
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+
+
+def get_options(value, options_class):
+    """
+    Args:
+        value: The option object, its main parameter alone, or None.
+        options_class (type): The class of the option object.
+
+    Returns:
+        object: The option object, None if value is None.
+    """
+    if value is None or isinstance(value, options_class):
+        return value
+    return options_class(value)
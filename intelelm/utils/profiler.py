@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+"""
+An opt-in profiler of the phases of the training and the prediction of the ELM models. The models call `record(phase)`
+around each phase, it does nothing unless a `Profiler` is active (e.g. inside `with model.profile():`).
+
+The phases are:
+    - "fit", "predict": the public methods of the models
+    - "fitness": a whole evaluation of the fitness function (or of a chunk of the population in the "batch" mode)
+    - "forward": the hidden matrices (and the predictions of the training data by the closed-form models)
+    - "solve": the output weights
+    - "metric": the objective computed from the predictions
+    - "optimizer": the time of each epoch of the Mealpy optimizer outside the fitness function (its own bookkeeping)
+"""
+
+import time
+import functools
+import threading
+import tracemalloc
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+
+PHASES = ("fit", "predict", "fitness", "forward", "solve", "metric", "optimizer")
+
+_ACTIVE = None
+_NULL_RECORD = nullcontext()
+
+
+class _Record:
+    """
+    Time (and trace the peak allocation of) a phase. The peak of the nested phases is also counted in the outer ones.
+    """
+    __slots__ = ("profiler", "name", "start", "frame")
+
+    def __init__(self, profiler, name):
+        self.profiler, self.name = profiler, name
+
+    def __enter__(self):
+        profiler = self.profiler
+        self.frame = None
+        if profiler.memory and threading.get_ident() == profiler.thread:
+            current, peak = tracemalloc.get_traced_memory()
+            for frame in profiler.stack:
+                frame[1] = max(frame[1], peak - frame[0])
+            tracemalloc.reset_peak()
+            self.frame = [current, 0]
+            profiler.stack.append(self.frame)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        profiler = self.profiler
+        peak_memory = None
+        if self.frame is not None:
+            _, peak = tracemalloc.get_traced_memory()
+            profiler.stack.pop()
+            for frame in profiler.stack + [self.frame]:
+                frame[1] = max(frame[1], peak - frame[0])
+            tracemalloc.reset_peak()
+            peak_memory = self.frame[1]
+        profiler.add(self.name, duration, peak_memory)
+        return False
+
+
+def record(name):
+    """
+    Args:
+        name (str): The name of the phase.
+
+    Returns:
+        A context manager that records the phase in the active profiler, or does nothing without an active profiler.
+    """
+    profiler = _ACTIVE
+    if profiler is None:
+        return _NULL_RECORD
+    return _Record(profiler, name)
+
+
+def profiled(name):
+    """
+    A decorator that records each call of the function as the phase `name` (see `record()`).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with record(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def lap(name, exclude="fitness", start=False):
+    """
+    Record the time since the previous lap of the same name, minus the time recorded in the phase `exclude` since then.
+    It does nothing without an active profiler.
+
+    Args:
+        name (str): The name of the phase, e.g. "optimizer".
+        exclude (str): The phase whose time is not counted, e.g. "fitness".
+        start (bool): Only start the lap (e.g. at the beginning of a training).
+    """
+    profiler = _ACTIVE
+    if profiler is not None:
+        profiler.lap(name, exclude, start)
+
+
+class ProfileReport:
+    """
+    The statistics of the phases recorded by a `Profiler`.
+
+    Args:
+        durations (dict): The list of durations (seconds) of each phase.
+        peak_memory (dict): The largest peak allocation (bytes) of each phase, traced by tracemalloc.
+    """
+
+    def __init__(self, durations, peak_memory):
+        self.durations = durations
+        self.peak_memory = peak_memory
+
+    def to_dataframe(self):
+        """
+        Returns:
+            pd.DataFrame: One row per phase with the count, the total, mean, median, 90th, 99th percentile and max
+                wall time (seconds), and the peak allocation (bytes, NaN if it was not traced).
+        """
+        names = [name for name in PHASES if name in self.durations]
+        names += sorted(set(self.durations) - set(PHASES))
+        rows = []
+        for name in names:
+            durations = np.asarray(self.durations[name])
+            p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+            rows.append({"phase": name, "count": len(durations), "total": durations.sum(), "mean": durations.mean(),
+                         "p50": p50, "p90": p90, "p99": p99, "max": durations.max(),
+                         "peak_memory": self.peak_memory.get(name, np.nan)})
+        columns = ["phase", "count", "total", "mean", "p50", "p90", "p99", "max", "peak_memory"]
+        return pd.DataFrame(rows, columns=columns).set_index("phase")
+
+    def __repr__(self):
+        return self.to_dataframe().to_string()
+
+
+class Profiler:
+    """
+    Record the wall time and the peak allocations of the phases of the models while it is active (`with Profiler():`).
+
+    The peak allocations are only traced in the thread that started the profiler, and the phases run by the workers of
+    the "process" mode are not recorded (their time is part of the "optimizer" phase).
+
+    Args:
+        memory (bool): Trace the peak allocations with tracemalloc, it slows down the allocations.
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.durations, self.peak_memory, self.totals = {}, {}, {}
+        self.stack, self.thread = [], None
+        self._laps = {}
+        self._lock = threading.Lock()
+        self._previous, self._tracing = None, False
+
+    def __enter__(self):
+        global _ACTIVE
+        self._previous, _ACTIVE = _ACTIVE, self
+        self.thread = threading.get_ident()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _ACTIVE
+        _ACTIVE = self._previous
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        return False
+
+    def add(self, name, duration, peak_memory=None):
+        """
+        Args:
+            name (str): The name of the phase.
+            duration (float): The wall time of the phase (seconds).
+            peak_memory (int): The peak allocation of the phase (bytes), None if it was not traced.
+        """
+        with self._lock:
+            self.durations.setdefault(name, []).append(duration)
+            self.totals[name] = self.totals.get(name, 0.0) + duration
+            if peak_memory is not None:
+                self.peak_memory[name] = max(self.peak_memory.get(name, 0), peak_memory)
+
+    def lap(self, name, exclude="fitness", start=False):
+        """
+        See the module function `lap()`.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            excluded = self.totals.get(exclude, 0.0)
+            previous = self._laps.get(name)
+            self._laps[name] = (now, excluded)
+        if not start and previous is not None:
+            # The excluded time of the "thread" mode is summed over the threads, so it can exceed the wall time
+            self.add(name, max(0.0, now - previous[0] - (excluded - previous[1])))
+
+    def get_report(self):
+        """
+        Returns:
+            ProfileReport: The statistics of the recorded phases.
+        """
+        with self._lock:
+            return ProfileReport({name: list(values) for name, values in self.durations.items()}, dict(self.peak_memory))
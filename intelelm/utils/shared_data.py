@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+import os
+import mmap
+import shutil
+import tempfile
+import weakref
+import numpy as np
+
+# The arrays attached by this process, so a worker maps each file once whatever the number of tasks it receives
+_ATTACHED = {}
+
+
+def _attach(filename, dtype, shape):
+    array = _ATTACHED.get(filename)
+    if array is None:
+        array = SharedArray(filename, dtype=dtype, mode="r", shape=shape)
+        _ATTACHED[filename] = array
+    return array
+
+
+class SharedArray(np.memmap):
+    """
+    A memory-mapped array that is pickled by the name of its file, instead of a copy of its data.
+
+    The process that unpickles it maps the same file (read-only). The views and the results of the computations with it
+    are not backed by the whole file, they are pickled by value as usual.
+    """
+
+    def __reduce_ex__(self, protocol):
+        if isinstance(self.base, mmap.mmap) and self.filename is not None and self.flags.c_contiguous:
+            return _attach, (self.filename, self.dtype.str, self.shape)
+        return self.view(np.ndarray).__reduce_ex__(protocol)
+
+    def __reduce__(self):
+        return self.__reduce_ex__(2)
+
+
+class SharedDataset:
+    """
+    The training data shared with the worker processes, kept in memory-mapped files of a temporary folder.
+
+    The folder is removed by `close()` (or at the end of a `with` block), and at the latest when the object is garbage
+    collected or the interpreter exits.
+
+    Args:
+        dir (str): The parent folder of the temporary folder, default is the temporary folder of the system.
+    """
+
+    def __init__(self, dir=None):
+        self.path = tempfile.mkdtemp(prefix="intelelm-", dir=dir)
+        self._shared = {}
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def share(self, array):
+        """
+        Args:
+            array (np.ndarray): The array to share, the same array is only written once.
+
+        Returns:
+            np.ndarray: A SharedArray with the same values, or the array itself if it can't be memory-mapped
+                (e.g. None, an empty array or an array of objects).
+        """
+        if not isinstance(array, np.ndarray) or isinstance(array, SharedArray) or array.size == 0 or array.dtype.kind not in "biufc":
+            return array
+        key = id(array)
+        if key not in self._shared:
+            filename = os.path.join(self.path, f"array_{len(self._shared)}.dat")
+            shared = SharedArray(filename, dtype=array.dtype, mode="w+", shape=array.shape)
+            shared[...] = array
+            shared.flush()
+            # Keep the original array, so its id is not reused by another array
+            self._shared[key] = (array, shared)
+        return self._shared[key][1]
+
+    def close(self):
+        """
+        Remove the files. The arrays shared by this object must not be pickled anymore.
+        """
+        for _, shared in self._shared.values():
+            _ATTACHED.pop(shared.filename, None)
+        self._shared.clear()
+        self._finalizer()
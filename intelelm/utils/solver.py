@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+
+import numpy as np
+from scipy.linalg import get_blas_funcs, cho_factor, cho_solve, qr, svd, eigh, solve_triangular, LinAlgError
+
+SUPPORTED_SOLVERS = ("pinv", "cholesky", "qr", "svd", "auto")
+
+
+def _as_float_array(H):
+    H = np.asarray(H)
+    if not np.issubdtype(H.dtype, np.floating):
+        H = H.astype(float)
+    return H
+
+
+def gram_matrix(H, kernel=False):
+    """
+    Build the Gram matrix of the hidden matrix with a symmetric rank-k update (BLAS syrk).
+
+    Only the upper triangle of the result is filled, which is all that the Cholesky factorization reads.
+
+    Args:
+        H (np.ndarray): The hidden matrix with shape (n_samples, n_hidden)
+        kernel (bool): If False, return H^T H with shape (n_hidden, n_hidden), else H H^T with shape (n_samples, n_samples)
+
+    Returns:
+        np.ndarray: The Gram (or kernel) matrix, upper triangle only
+    """
+    H = _as_float_array(H)
+    syrk = get_blas_funcs("syrk", (H,))
+    # H.T of a C-contiguous H is Fortran-contiguous, so BLAS can use it without copying.
+    return syrk(alpha=1.0, a=H.T, trans=1 if kernel else 0)
+
+
+def _factor_gram(G, alpha):
+    G.flat[::G.shape[0] + 1] += alpha
+    return cho_factor(G, lower=False, overwrite_a=True, check_finite=False)
+
+
+def _estimate_condition(factor):
+    # The ratio of the extreme diagonal entries of the Cholesky factor is a cheap lower bound of sqrt(cond(G)).
+    diag = np.abs(np.diag(factor[0]))
+    d_min = diag.min()
+    if d_min == 0:
+        return np.inf
+    return (diag.max() / d_min) ** 2
+
+
+def _is_rank_deficient(R):
+    diag = np.abs(np.diag(R))
+    return diag.size == 0 or diag.min() <= max(R.shape) * np.finfo(R.dtype).eps * diag.max()
+
+
+def _solve_normal_equations(H, y, alpha=0.0, check_condition=False):
+    H = _as_float_array(H)
+    n_samples, n_hidden = H.shape
+    kernel = n_hidden > n_samples
+    try:
+        factor = _factor_gram(gram_matrix(H, kernel=kernel), alpha)
+    except LinAlgError:
+        return solve_svd(H, y, alpha)
+    if check_condition and _estimate_condition(factor) > 1. / np.sqrt(np.finfo(H.dtype).eps):
+        return solve_svd(H, y, alpha)
+    if kernel:
+        return np.dot(H.T, cho_solve(factor, y, check_finite=False))
+    return cho_solve(factor, np.dot(H.T, y), overwrite_b=True, check_finite=False)
+
+
+def solve_pinv(H, y, alpha=0.0):
+    """
+    Solve the output weights with the Moore-Penrose pseudoinverse (the original behavior of the ELM).
+
+    Args:
+        H (np.ndarray): The hidden matrix with shape (n_samples, n_hidden)
+        y (np.ndarray): The target with shape (n_samples,) or (n_samples, n_outputs)
+        alpha (float): The ridge (L2) regularization, 0 means no regularization
+
+    Returns:
+        np.ndarray: The output weights beta
+    """
+    if alpha > 0:
+        return solve_svd(H, y, alpha)
+    return np.dot(np.linalg.pinv(H), y)
+
+
+def solve_svd(H, y, alpha=0.0):
+    """
+    Solve the output weights with a thin singular value decomposition of the hidden matrix.
+
+    Args:
+        H (np.ndarray): The hidden matrix with shape (n_samples, n_hidden)
+        y (np.ndarray): The target with shape (n_samples,) or (n_samples, n_outputs)
+        alpha (float): The ridge (L2) regularization, 0 means no regularization
+
+    Returns:
+        np.ndarray: The output weights beta
+    """
+    H = _as_float_array(H)
+    U, s, Vt = svd(H, full_matrices=False, check_finite=False, lapack_driver="gesdd")
+    if alpha > 0:
+        s_inv = s / (s ** 2 + alpha)
+    else:
+        cutoff = 1e-15 * s.max() if s.size else 0.
+        s_inv = np.zeros_like(s)
+        s_inv[s > cutoff] = 1. / s[s > cutoff]
+    Uy = np.dot(U.T, y)
+    Uy = s_inv * Uy if Uy.ndim == 1 else s_inv[:, None] * Uy
+    return np.dot(Vt.T, Uy)
+
+
+def solve_cholesky(H, y, alpha=0.0):
+    """
+    Solve the output weights with the Cholesky factorization of the (regularized) normal equations.
+
+    When n_samples >= n_hidden the h x h Gram matrix H^T H is factorized, otherwise the n x n kernel form
+    H H^T is used and beta = H^T (H H^T + alpha I)^-1 y. If the Gram matrix is not positive definite
+    (rank-deficient hidden matrix without regularization), it falls back to the SVD solver.
+
+    Args:
+        H (np.ndarray): The hidden matrix with shape (n_samples, n_hidden)
+        y (np.ndarray): The target with shape (n_samples,) or (n_samples, n_outputs)
+        alpha (float): The ridge (L2) regularization, 0 means no regularization
+
+    Returns:
+        np.ndarray: The output weights beta
+    """
+    return _solve_normal_equations(H, y, alpha, check_condition=False)
+
+
+def solve_qr(H, y, alpha=0.0):
+    """
+    Solve the output weights with a thin QR decomposition of the hidden matrix.
+
+    The ridge term is handled by augmenting the matrix with sqrt(alpha) * I, so the squared condition
+    number of the normal equations is avoided. For wide matrices the QR of H^T gives the minimum-norm solution.
+    A rank-deficient triangular factor falls back to the SVD solver.
+
+    Args:
+        H (np.ndarray): The hidden matrix with shape (n_samples, n_hidden)
+        y (np.ndarray): The target with shape (n_samples,) or (n_samples, n_outputs)
+        alpha (float): The ridge (L2) regularization, 0 means no regularization
+
+    Returns:
+        np.ndarray: The output weights beta
+    """
+    H = _as_float_array(H)
+    n_samples, n_hidden = H.shape
+    if n_hidden > n_samples:
+        A = H.T
+        if alpha > 0:
+            A = np.concatenate([A, np.sqrt(alpha) * np.eye(n_samples, dtype=H.dtype)], axis=0)
+        R = qr(A, mode="r", check_finite=False)[0][:n_samples]
+        if _is_rank_deficient(R):
+            return solve_svd(H, y, alpha)
+        z = solve_triangular(R, solve_triangular(R, y, trans="T", check_finite=False), check_finite=False)
+        return np.dot(H.T, z)
+    A = H
+    if alpha > 0:
+        A = np.concatenate([A, np.sqrt(alpha) * np.eye(n_hidden, dtype=H.dtype)], axis=0)
+    Q, R = qr(A, mode="economic", check_finite=False)
+    if _is_rank_deficient(R):
+        return solve_svd(H, y, alpha)
+    return solve_triangular(R, np.dot(Q[:n_samples].T, y), check_finite=False)
+
+
+def solve_auto(H, y, alpha=0.0):
+    """
+    Pick the cheapest stable solver from the shape and the conditioning of the hidden matrix.
+
+    The Gram (n >> h) or kernel (h >> n) matrix is factorized with Cholesky. If the factorization fails or the
+    estimated condition number is too large for the normal equations to be accurate, it falls back to the SVD solver.
+
+    Args:
+        H (np.ndarray): The hidden matrix with shape (n_samples, n_hidden)
+        y (np.ndarray): The target with shape (n_samples,) or (n_samples, n_outputs)
+        alpha (float): The ridge (L2) regularization, 0 means no regularization
+
+    Returns:
+        np.ndarray: The output weights beta
+    """
+    return _solve_normal_equations(H, y, alpha, check_condition=True)
+
+
+def accumulate_gram_matrix(G, H):
+    """
+    Add H^T H to the Gram matrix G in place with a symmetric rank-k update (BLAS syrk), upper triangle only.
+
+    Args:
+        G (np.ndarray): The Fortran-ordered Gram matrix with shape (n_hidden, n_hidden), None to start a new one
+        H (np.ndarray): The hidden matrix of the chunk with shape (n_samples, n_hidden)
+
+    Returns:
+        np.ndarray: The updated Gram matrix
+    """
+    H = _as_float_array(H)
+    if G is None:
+        return gram_matrix(H)
+    syrk = get_blas_funcs("syrk", (G, H))
+    return syrk(alpha=1.0, a=H.T, beta=1.0, c=G, trans=0, overwrite_c=True)
+
+
+def solve_gram(G, HtY, alpha=0.0):
+    """
+    Solve the normal equations (G + alpha I) beta = H^T y from an accumulated Gram matrix (upper triangle is used).
+
+    Cholesky is used when the matrix is well-conditioned, otherwise the pseudoinverse from the eigen-decomposition.
+
+    Args:
+        G (np.ndarray): The Gram matrix H^T H with shape (n_hidden, n_hidden)
+        HtY (np.ndarray): The matrix H^T y with shape (n_hidden,) or (n_hidden, n_outputs)
+        alpha (float): The ridge (L2) regularization, 0 means no regularization
+
+    Returns:
+        np.ndarray: The output weights beta
+    """
+    try:
+        factor = _factor_gram(np.array(G, order="F"), alpha)
+        if _estimate_condition(factor) <= 1. / np.sqrt(np.finfo(G.dtype).eps):
+            return cho_solve(factor, HtY, check_finite=False)
+    except LinAlgError:
+        pass
+    G = np.triu(G) + np.triu(G, 1).T
+    G.flat[::G.shape[0] + 1] += alpha
+    w, V = eigh(G, check_finite=False)
+    cutoff = G.shape[0] * np.finfo(G.dtype).eps * max(w.max(), 0.)
+    w_inv = np.zeros_like(w)
+    w_inv[w > cutoff] = 1. / w[w > cutoff]
+    VtY = np.dot(V.T, HtY)
+    VtY = w_inv * VtY if VtY.ndim == 1 else w_inv[:, None] * VtY
+    return np.dot(V, VtY)
+
+
+def inverse_gram_matrix(H, alpha=0.0):
+    """
+    Compute P = (H^T H + alpha I)^-1, the starting state of the recursive least squares (OS-ELM) update.
+
+    Args:
+        H (np.ndarray): The hidden matrix of the first batch with shape (n_samples, n_hidden)
+        alpha (float): The ridge (L2) regularization, 0 means no regularization
+
+    Returns:
+        np.ndarray: The inverse Gram matrix with shape (n_hidden, n_hidden)
+
+    Raises:
+        ValueError: If the Gram matrix is singular (less samples than hidden nodes without regularization)
+    """
+    H = _as_float_array(H)
+    try:
+        factor = _factor_gram(gram_matrix(H), alpha)
+    except LinAlgError:
+        raise ValueError(f"The Gram matrix of the first batch is singular. The first batch needs at least {H.shape[1]} "
+                         f"(n_hidden) linearly independent samples, or set alpha > 0.")
+    return cho_solve(factor, np.eye(H.shape[1], dtype=H.dtype), overwrite_b=True, check_finite=False)
+
+
+def update_output_weights(P, beta, H, y):
+    """
+    Update the inverse Gram matrix P and the output weights beta with a new batch using the block Woodbury identity.
+
+    The cost depends only on the batch size b and the number of hidden nodes h: O(b*h^2 + b^2*h + b^3).
+
+    Args:
+        P (np.ndarray): The current inverse Gram matrix with shape (n_hidden, n_hidden)
+        beta (np.ndarray): The current output weights with shape (n_hidden,) or (n_hidden, n_outputs)
+        H (np.ndarray): The hidden matrix of the new batch with shape (n_samples, n_hidden)
+        y (np.ndarray): The target of the new batch with shape (n_samples,) or (n_samples, n_outputs)
+
+    Returns:
+        tuple: The updated (P, beta)
+    """
+    PHt = np.dot(P, H.T)
+    K = np.dot(H, PHt)
+    K.flat[::K.shape[0] + 1] += 1.
+    gain = cho_solve(cho_factor(K, lower=False, overwrite_a=True, check_finite=False), PHt.T, check_finite=False).T
+    P = P - np.dot(gain, PHt.T)
+    P = (P + P.T) / 2
+    beta = beta + np.dot(gain, y - np.dot(H, beta))
+    return P, beta
+
+
+SOLVERS = {
+    "pinv": solve_pinv,
+    "cholesky": solve_cholesky,
+    "qr": solve_qr,
+    "svd": solve_svd,
+    "auto": solve_auto,
+}
+
+
+def solve_output_weights(H, y, solver="pinv", alpha=0.0):
+    """
+    Compute the output weights (beta) of the ELM network from the hidden matrix H and the target y.
+
+    Args:
+        H (np.ndarray): The hidden matrix with shape (n_samples, n_hidden)
+        y (np.ndarray): The target with shape (n_samples,) or (n_samples, n_outputs)
+        solver (str): The solver name, one of ("pinv", "cholesky", "qr", "svd", "auto")
+        alpha (float): The ridge (L2) regularization, 0 means no regularization
+
+    Returns:
+        np.ndarray: The output weights beta with shape (n_hidden,) or (n_hidden, n_outputs)
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"solver should be one of {SUPPORTED_SOLVERS}. Got {solver}")
+    return SOLVERS[solver](H, y, alpha)
+
+
+def gram_matrix_batch(H, kernel=False):
+    """
+    Build the stack of Gram matrices of a stack of hidden matrices, with one symmetric rank-k update (BLAS syrk) per
+    matrix like `gram_matrix()`. Both triangles are filled, so the stack can be solved by `np.linalg.solve`.
+
+    Args:
+        H (np.ndarray): The stack of hidden matrices with shape (n_networks, n_samples, n_hidden)
+        kernel (bool): If False, return the stack of H^T H, else the stack of H H^T
+
+    Returns:
+        np.ndarray: The Gram (or kernel) matrices with shape (n_networks, n_hidden, n_hidden) or (n_networks, n_samples, n_samples)
+    """
+    H = _as_float_array(H)
+    size = H.shape[1] if kernel else H.shape[2]
+    G = np.empty((H.shape[0], size, size), dtype=H.dtype)
+    for idx in range(H.shape[0]):
+        G[idx] = gram_matrix(H[idx], kernel=kernel)
+    # syrk fills the upper triangle (the lower one is zero), mirror it
+    G += np.swapaxes(np.triu(G, 1), 1, 2)
+    return G
+
+
+def _is_ill_conditioned_batch(G, rhs, beta, eps):
+    # Two lower bounds of cond(G) that need no extra factorization: the ratio of the extreme diagonal entries, and
+    # the amplification ||G|| ||beta|| / ||rhs|| of the solution. The threshold is the one of the single-matrix solver.
+    diag = np.abs(np.diagonal(G, axis1=1, axis2=2))
+    g_norm = np.max(np.sum(np.abs(G), axis=1), axis=1)
+    rhs_norm = np.max(np.sum(np.abs(rhs), axis=1), axis=1)
+    beta_norm = np.max(np.sum(np.abs(beta), axis=1), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cond = np.maximum(diag.max(axis=1) / diag.min(axis=1), g_norm * beta_norm / rhs_norm)
+    return ~(cond <= 1. / np.sqrt(eps))
+
+
+def solve_output_weights_batch(H, y, solver="pinv", alpha=0.0):
+    """
+    Compute the output weights of a stack of hidden matrices that share the same target y.
+
+    The "cholesky" and "auto" solvers build the stack of Gram (or kernel) matrices with
+    `gram_matrix_batch()` and solve them together with a single `np.linalg.solve`. The "auto" solver screens the
+    conditioning of each matrix with cheap lower bounds of its condition number. The other solvers, and the matrices
+    that are singular (or ill-conditioned for "auto"), are solved matrix by matrix with the single-matrix solver: the
+    LAPACK calls dominate their cost, and e.g. the stacked `np.linalg.pinv` is slower than a loop of it (its products
+    of transposed stacks don't use BLAS). So "pinv" gives exactly the output weights of the single-matrix solver.
+
+    Args:
+        H (np.ndarray): The stack of hidden matrices with shape (n_networks, n_samples, n_hidden)
+        y (np.ndarray): The target with shape (n_samples,) or (n_samples, n_outputs)
+        solver (str): The solver name, one of ("pinv", "cholesky", "qr", "svd", "auto")
+        alpha (float): The ridge (L2) regularization, 0 means no regularization
+
+    Returns:
+        np.ndarray: The output weights with shape (n_networks, n_hidden) or (n_networks, n_hidden, n_outputs)
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"solver should be one of {SUPPORTED_SOLVERS}. Got {solver}")
+    H = _as_float_array(H)
+    if solver in ("cholesky", "auto"):
+        n_networks, n_samples, n_hidden = H.shape
+        kernel = n_hidden > n_samples
+        G = gram_matrix_batch(H, kernel=kernel)
+        diag_idx = np.arange(G.shape[1])
+        G[:, diag_idx, diag_idx] += alpha
+        y2d = np.reshape(y, (n_samples, -1)).astype(H.dtype, copy=False)
+        rhs = np.broadcast_to(y2d, (n_networks, ) + y2d.shape) if kernel else np.matmul(np.swapaxes(H, 1, 2), y2d)
+        try:
+            beta = np.linalg.solve(G, rhs)
+            failed = _is_ill_conditioned_batch(G, rhs, beta, np.finfo(H.dtype).eps) if solver == "auto" \
+                else ~np.all(np.isfinite(beta), axis=(1, 2))
+        except np.linalg.LinAlgError:
+            # One of the matrices is singular, np.linalg.solve doesn't tell which one
+            return np.stack([solve_output_weights(H[idx], y, solver, alpha) for idx in range(n_networks)])
+        if kernel:
+            beta = np.matmul(np.swapaxes(H, 1, 2), beta)
+        beta = np.reshape(beta, (n_networks, n_hidden) + np.shape(y)[1:])
+        for idx in np.flatnonzero(failed):
+            beta[idx] = solve_output_weights(H[idx], y, solver, alpha)
+        return beta
+    return np.stack([solve_output_weights(H[idx], y, solver, alpha) for idx in range(H.shape[0])])
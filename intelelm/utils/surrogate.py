@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import numpy as np
+from mealpy.utils.target import Target
+from intelelm.utils.solver import accumulate_gram_matrix, solve_gram
+
+SUPPORTED_SURROGATES = ("rff", )
+
+
+class SurrogateTarget(Target):
+    """
+    The target of an agent scored by the surrogate instead of the fitness function, it stays marked when it is copied.
+    """
+
+    def copy(self) -> "SurrogateTarget":
+        return SurrogateTarget(self.objectives, self.weights)
+
+
+class RandomFeatureSurrogate:
+    """
+    An online random Fourier feature (RBF kernel approximation) ridge regressor of the objectives of the solutions.
+
+    It is used to pre-screen the candidate solutions, so only its ranking matters. The Gram matrix of the features is
+    accumulated with each update, so training it costs O(n_features^2) per solution whatever the number of updates.
+
+    A custom surrogate can be used instead, it only needs the same `update()`, `predict()` and `is_ready()` methods.
+
+    Args:
+        lb (np.ndarray): The lower bound of the solutions.
+        ub (np.ndarray): The upper bound of the solutions.
+        n_features (int): The number of random features.
+        alpha (float): The ridge regularization.
+        min_samples (int): The number of (solution, objectives) pairs needed before the surrogate is used.
+        seed (int): The seed of the random features.
+    """
+
+    def __init__(self, lb, ub, n_features=200, alpha=1e-3, min_samples=50, seed=None):
+        self.lb = np.asarray(lb, dtype=float)
+        self.scale = 2.0 / np.maximum(np.asarray(ub, dtype=float) - self.lb, 1e-12)
+        self.n_features = n_features
+        self.alpha = alpha
+        self.min_samples = min_samples
+        generator = np.random.default_rng(seed)
+        # The bandwidth grows with sqrt(n_dims), the squared distances between solutions in [-1, 1]^d grow with d
+        self.weights = generator.standard_normal((len(self.lb), n_features)) / np.sqrt(len(self.lb))
+        self.biases = generator.uniform(0, 2 * np.pi, n_features)
+        self.G, self.HtY, self.beta = None, None, None
+        self.n_samples = 0
+
+    def _transform(self, solutions):
+        Z = (np.atleast_2d(solutions) - self.lb) * self.scale - 1.0
+        H = np.sqrt(2.0 / self.n_features) * np.cos(np.dot(Z, self.weights) + self.biases)
+        return np.hstack([H, np.ones((H.shape[0], 1))])
+
+    def update(self, solutions, objectives):
+        """
+        Args:
+            solutions (np.ndarray): The solutions with shape (n_solutions, n_dims).
+            objectives (np.ndarray): Their true objectives with shape (n_solutions,) or (n_solutions, n_objectives).
+        """
+        H = self._transform(solutions)
+        y = np.reshape(np.asarray(objectives, dtype=float), (H.shape[0], -1))
+        self.G = accumulate_gram_matrix(self.G, H)
+        self.HtY = np.dot(H.T, y) if self.HtY is None else self.HtY + np.dot(H.T, y)
+        self.n_samples += H.shape[0]
+        self.beta = None
+
+    def is_ready(self):
+        """
+        Returns:
+            bool: True if the surrogate has seen enough solutions to be used.
+        """
+        return self.n_samples >= self.min_samples
+
+    def predict(self, solutions):
+        """
+        Args:
+            solutions (np.ndarray): The solutions with shape (n_solutions, n_dims).
+
+        Returns:
+            np.ndarray: The predicted objectives with shape (n_solutions, n_objectives).
+        """
+        if self.beta is None:
+            self.beta = solve_gram(self.G, self.HtY, self.alpha)
+        return np.dot(self._transform(solutions), self.beta)
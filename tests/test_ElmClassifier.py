@@ -5,6 +5,8 @@
 # --------------------------------------------------%
 
 import numpy as np
+import pytest
+
 from intelelm import ElmClassifier
 
 
@@ -17,3 +19,31 @@ def test_ElmClassifier_class():
     pred = model.predict(X)
     assert ElmClassifier.SUPPORTED_CLS_METRICS == model.SUPPORTED_CLS_METRICS
     assert pred[0] in (0, 1)
+
+
+def test_ElmClassifier_partial_fit():
+    X = np.random.rand(300, 6)
+    y = np.random.randint(0, 3, size=300)
+
+    model = ElmClassifier(layer_sizes=(10, ), act_name="elu", seed=42)
+    for idx in range(0, 300, 50):
+        model.partial_fit(X[idx:idx + 50], y[idx:idx + 50], classes=[0, 1, 2])
+    pred = model.predict(X)
+    assert pred[0] in (0, 1, 2)
+    full = ElmClassifier(layer_sizes=(10, ), act_name="elu", seed=42).fit(X, y)
+    assert np.allclose(model.predict(X, return_prob=True), full.predict(X, return_prob=True), atol=1e-6)
+    assert np.array_equal(pred, full.predict(X))
+    with pytest.raises(ValueError):
+        full.partial_fit(X[:50], y[:50])
+
+
+def test_ElmClassifier_fit_stream(tmp_path):
+    X = np.random.rand(300, 6)
+    y = np.random.randint(0, 3, size=300)
+    np.save(tmp_path / "X.npy", X)
+    np.save(tmp_path / "y.npy", y)
+
+    model = ElmClassifier(layer_sizes=(10, ), act_name="elu", seed=42)
+    model.fit_stream(tmp_path / "X.npy", tmp_path / "y.npy", chunk_size=64)
+    pred = ElmClassifier(layer_sizes=(10, ), act_name="elu", seed=42).fit(X, y).predict(X)
+    assert np.mean(model.predict(X) == pred) > 0.95
@@ -5,6 +5,8 @@
 # --------------------------------------------------%
 
 import numpy as np
+import pytest
+
 from intelelm import ElmRegressor
 
 
@@ -19,3 +21,57 @@ def test_ElmRegressor_class():
     pred = model.predict(X)
     assert ElmRegressor.SUPPORTED_REG_METRICS == model.SUPPORTED_REG_METRICS
     assert len(pred) == X.shape[0]
+
+
+def test_ElmRegressor_partial_fit():
+    X = np.random.uniform(low=0.0, high=1.0, size=(300, 5))
+    y = 2 * X + 1
+
+    model = ElmRegressor(layer_sizes=(10, ), act_name="elu", seed=42)
+    for idx in range(0, 300, 50):
+        model.partial_fit(X[idx:idx + 50], y[idx:idx + 50])
+    pred = ElmRegressor(layer_sizes=(10, ), act_name="elu", seed=42).fit(X, y).predict(X)
+    assert np.allclose(model.predict(X), pred, atol=1e-6)
+
+
+def test_ElmRegressor_fit_stream():
+    X = np.random.uniform(low=0.0, high=1.0, size=(300, 5))
+    y = 2 * X + 1
+
+    pred = ElmRegressor(layer_sizes=(10, ), act_name="elu", seed=42).fit(X, y).predict(X)
+    chunks = ((X[idx:idx + 70], y[idx:idx + 70]) for idx in range(0, 300, 70))
+    model = ElmRegressor(layer_sizes=(10, ), act_name="elu", seed=42).fit_stream(chunks)
+    assert np.allclose(model.predict(X), pred, atol=1e-6)
+
+    with pytest.raises(ValueError):
+        ElmRegressor(layer_sizes=(10, ), act_name="elu", seed=42).fit_stream(iter([]))
+    with pytest.raises(ValueError):
+        ElmRegressor(layer_sizes=(10, ), act_name="elu", seed=42).fit_stream(X[:0], y[:0])
+
+
+def test_ElmRegressor_float32():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X + 1
+
+    model = ElmRegressor(layer_sizes=(10, ), act_name="elu", seed=42, dtype="float32", solver_dtype="float64")
+    model.fit(X, y)
+    assert model.network.weights[0].dtype == np.float32
+    assert model.network.beta.dtype == np.float32
+    assert model.predict(X).dtype == np.float32
+
+    # The same seed draws the same network in float32 and float64
+    model64 = ElmRegressor(layer_sizes=(10, ), act_name="elu", seed=42).fit(X, y)
+    for w32, w64 in zip(model.network.weights + model.network.biases, model64.network.weights + model64.network.biases):
+        assert np.allclose(w32, w64, rtol=1e-6, atol=1e-6)
+    assert np.allclose(model.predict(X), model64.predict(X), rtol=1e-3, atol=1e-3)
+
+
+def test_ElmRegressor_predict_max_memory():
+    X = np.random.uniform(low=0.0, high=1.0, size=(500, 5))
+    y = 2 * X + 1
+
+    model = ElmRegressor(layer_sizes=(300, ), act_name="elu", seed=42).fit(X, y)
+    pred = model.predict(X)
+    assert np.allclose(model.predict(X, batch_size=64), pred)
+    assert np.allclose(model.predict(X, max_memory=100000), pred)
+    assert np.allclose(model.score(X, y, max_memory=100000), model.score(X, y))
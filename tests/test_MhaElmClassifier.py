@@ -5,7 +5,10 @@
 # --------------------------------------------------%
 
 import numpy as np
+import pytest
 from intelelm import MhaElmClassifier
+from intelelm.utils.callbacks import Callback
+from intelelm.utils.options import Subsample
 
 
 def test_MhaElmClassifier_class():
@@ -19,3 +22,45 @@ def test_MhaElmClassifier_class():
     pred = model.predict(X)
     assert MhaElmClassifier.SUPPORTED_CLS_OBJECTIVES == model.SUPPORTED_CLS_OBJECTIVES
     assert pred[0] in (0, 1)
+
+
+def test_MhaElmClassifier_subsample():
+    X = np.random.rand(300, 6)
+    y = np.random.randint(0, 3, size=300)
+
+    opt_paras = {"name": "GA", "epoch": 5, "pop_size": 10}
+    model = MhaElmClassifier(layer_sizes=(10, ), act_name="elu", obj_name="AS", optim="BaseGA",
+                             optim_paras=opt_paras, verbose=False, seed=42)
+    model.fit(X, y, subsample=Subsample(0.2, growth=1.5))
+    assert len(model.loss_train) == 5
+    assert np.all(np.diff(model.loss_train) >= 0)
+    assert np.isclose(model.loss_train[-1], model.score(X, y, method="AS"))
+
+
+class _SubsampleTargetsCheck(Callback):
+    # After each epoch, the population and the global best are scored on the subsample of the next epoch
+    def on_train_begin(self, model):
+        self.model, self.n_checked = model, 0
+
+    def on_epoch_end(self, epoch, logs):
+        optimizer = self.model.optimizer
+        for agent in optimizer.pop + [optimizer.g_best, optimizer.history.list_global_best[-1]]:
+            assert np.isclose(agent.target.fitness, self.model.fitness_function(agent.solution))
+        self.n_checked += 1
+
+
+@pytest.mark.parametrize("mode", ["single", "batch"])
+def test_MhaElmClassifier_subsample_rescore(mode):
+    X = np.random.rand(300, 6)
+    y = np.random.randint(0, 3, size=300)
+
+    opt_paras = {"name": "GA", "epoch": 4, "pop_size": 10}
+    model = MhaElmClassifier(layer_sizes=(10, ), act_name="elu", obj_name="AS", optim="BaseGA",
+                             optim_paras=opt_paras, verbose=False, seed=42)
+    check = _SubsampleTargetsCheck()
+    model.fit(X, y, mode=mode, subsample=0.2, callbacks=[check])
+    assert check.n_checked == 4
+    n_evals = model.optimizer.nfe_counter
+    # Each rotation re-scores the population and the global best
+    model.fit(X, y, mode=mode)
+    assert n_evals == model.optimizer.nfe_counter + 4 * (10 + 1)
@@ -4,8 +4,14 @@
 #       Github: https://github.com/thieu1995        %                         
 # --------------------------------------------------%
 
+import json
+import pickle
 import numpy as np
+import pytest
+from mealpy import GA
 from intelelm import MhaElmRegressor
+from intelelm.utils.callbacks import CSVLogger, JSONLinesLogger, TerminateOnStall
+from intelelm.utils.options import Surrogate, Checkpoint, History, Islands
 
 
 def test_MhaElmRegressor_class():
@@ -21,3 +27,318 @@ def test_MhaElmRegressor_class():
     pred = model.predict(X)
     assert MhaElmRegressor.SUPPORTED_REG_OBJECTIVES == model.SUPPORTED_REG_OBJECTIVES
     assert len(pred) == X.shape[0]
+
+
+def test_MhaElmRegressor_batch_mode():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"name": "GA", "epoch": 5, "pop_size": 20}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    loss_swarm = model.fit(X, y, mode="swarm").loss_train
+    loss_batch = model.fit(X, y, mode="batch", batch_size=8).loss_train
+    assert np.array_equal(loss_swarm, loss_batch)
+
+
+def test_MhaElmRegressor_fitness_context():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"name": "GA", "epoch": 2, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, 5), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    model.fit(X, y)
+    pred = model.fitness_context.predict(model.solution)
+    assert np.allclose(pred, model.predict(X))
+    assert np.isclose(model.fitness_function(model.solution), model.score(X, y, method="RMSE"))
+
+
+def test_MhaElmRegressor_fitness_cache():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 5, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="EliteSingleGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    loss = model.fit(X, y, mode="swarm").loss_train
+    loss_cached = model.fit(X, y, mode="swarm", cache=100).loss_train
+    assert np.array_equal(loss, loss_cached)
+    assert model.cache_stats["hits"] > 0
+    assert model.cache_stats["size"] == model.cache_stats["misses"]
+
+
+def test_MhaElmRegressor_surrogate():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 10, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    model.fit(X, y, mode="swarm", surrogate=Surrogate("rff", ratio=0.5))
+    assert np.all(np.isfinite(model.loss_train))
+    assert model.surrogate_stats["surrogate"] > 0
+    assert np.isclose(model.score(X, y, method="RMSE"), model.loss_train[-1])
+    with pytest.raises(ValueError):
+        model.fit(X, y, mode="single", surrogate="rff")
+
+
+def test_MhaElmRegressor_validation_patience():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 100, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    # The smallest population of BaseGA and a patience of 1 epoch, so the validation score plateaus early
+    model.fit(X[:70], y[:70], validation_data=(X[70:], y[70:]), patience=1)
+    assert np.isclose(model.score(X[70:], y[70:], method="RMSE"), model.loss_train[-1])
+    assert model.stopped_epoch is not None
+    assert len(model.loss_train) == model.stopped_epoch < 100
+    model.fit(X, y, validation_fraction=0.3)
+    assert model.X_temp.shape[0] == 70
+    with pytest.raises(ValueError):
+        model.fit(X, y, validation_data=(X, y), validation_fraction=0.3)
+
+
+def test_MhaElmRegressor_init_population():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 5, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    model.fit(X, y, init_population="elm", init_ratio=0.5)
+    assert model.population.shape == (10, model.network.get_ndim())
+    seeded = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                             optim_paras=opt_paras, verbose=False, seed=1)
+    seeded.fit(X, y, init_population=model.solution)
+    assert seeded.loss_train[0] <= model.best_fit
+    seeded.fit(X[:50], y[:50], warm_start=True)
+    assert np.all(np.isfinite(seeded.loss_train))
+    with pytest.raises(ValueError):
+        seeded.fit(X, y, init_population=np.zeros((2, 3)))
+
+
+def test_MhaElmRegressor_init_population_bounds():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 2, "pop_size": 50}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    model.fit(X, y)
+    # The bounds are narrower than the standard normal draws of the ELM, the seeds are scaled to them, not clipped
+    n_dims = model.network.get_ndim()
+    lb, ub = np.full(n_dims, -0.2), np.full(n_dims, 0.4)
+    seeds = model._get_starting_solutions("elm", 1.0, False, lb, ub, 50)
+    assert np.all(seeds > lb) and np.all(seeds < ub)
+    assert np.isclose(np.mean(seeds), 0.1, atol=0.01) and np.isclose(np.std(seeds), 0.1, atol=0.01)
+
+
+@pytest.mark.parametrize("search_space", ["scale", "low_rank"])
+def test_MhaElmRegressor_search_space(search_space):
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 5, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA", optim_paras=opt_paras,
+                            verbose=False, seed=42, search_space=search_space, rank=2)
+    model.fit(X, y, mode="batch")
+    assert model.network.get_ndim() == (20 if search_space == "scale" else 2 * (5 + 10) + 10)
+    assert np.isclose(model.score(X, y, method="RMSE"), model.best_fit)
+    # The decoded network is encoded back to the same solution
+    assert np.allclose(model.network._decode_weights(model.network.encode())[0][0], model.network.weights[0])
+
+
+def test_MhaElmRegressor_checkpoint_resume(tmp_path):
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+    path = str(tmp_path / "checkpoint.pkl")
+
+    opt_paras = {"epoch": 6, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="OriginalPSO",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    loss = model.fit(X, y).loss_train
+    # The interrupted run stops after 3 epochs, the resumed run finishes the same 6 epochs
+    model.fit(X, y, termination={"max_epoch": 3}, checkpoint=Checkpoint(path, every=3))
+    with open(path, "rb") as file:
+        checkpoint = pickle.load(file)
+    # Only the agents, the history, the counter and the random states of the optimizer are saved, not its attributes
+    assert checkpoint["epoch"] == 3 and len(checkpoint["pop"]) == 10 and "optimizer_state" not in checkpoint
+    model.fit(X, y, resume_from=path)
+    assert np.allclose(loss, model.loss_train)
+    assert type(model.optimizer).__name__ == "OriginalPSO" and "_hooked_checkpoint" not in model.optimizer.__dict__
+    model.set_params(optim_paras={"epoch": 6, "pop_size": 20})
+    with pytest.raises(ValueError):
+        model.fit(X, y, resume_from=path)
+
+
+@pytest.mark.parametrize("optim, stop_epoch", [("OriginalPSO", 1), ("BaseGA", 3), ("OriginalGWO", 5)])
+def test_MhaElmRegressor_resume_matches_solve(tmp_path, optim, stop_epoch):
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+    path = str(tmp_path / "checkpoint.pkl")
+
+    opt_paras = {"epoch": 6, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim=optim,
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    # Mealpy counts the evaluations from 0 with a termination (from -1 without), as in the interrupted run
+    model.fit(X, y, termination={"max_epoch": 6})
+    history, population, nfe = model.optimizer.history, model.population, model.optimizer.nfe_counter
+    model.fit(X, y, termination={"max_epoch": stop_epoch}, checkpoint=Checkpoint(path, every=1))
+    model.fit(X, y, resume_from=path)
+    # Every epoch of the resumed run matches the uninterrupted solve()
+    resumed = model.optimizer.history
+    assert len(resumed.list_global_best_fit) == len(history.list_global_best_fit) == 6
+    assert np.allclose(resumed.list_global_best_fit, history.list_global_best_fit)
+    assert np.allclose(resumed.list_current_best_fit, history.list_current_best_fit)
+    assert np.allclose([agent.solution for agent in resumed.list_current_best],
+                       [agent.solution for agent in history.list_current_best])
+    assert np.allclose(model.population, population) and model.optimizer.nfe_counter == nfe
+
+
+def test_MhaElmRegressor_callbacks(tmp_path):
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 10, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    list_logs = []
+    model.fit(X, y, callbacks=[CSVLogger(tmp_path / "log.csv"), JSONLinesLogger(tmp_path / "log.jsonl"),
+                               lambda epoch, logs: list_logs.append(logs)])
+    assert [logs["epoch"] for logs in list_logs] == list(range(1, 11))
+    assert np.allclose([logs["best_fitness"] for logs in list_logs], model.loss_train)
+    assert all(logs["evals_per_second"] > 0 and logs["diversity"] >= 0 for logs in list_logs)
+    assert len((tmp_path / "log.csv").read_text().splitlines()) == 11
+    lines = (tmp_path / "log.jsonl").read_text().splitlines()
+    assert json.loads(lines[-1])["n_evals"] == list_logs[-1]["n_evals"]
+    # A callback stops the training
+    model.fit(X, y, callbacks=[lambda epoch, logs: epoch >= 3])
+    assert model.stopped_epoch == 3 and len(model.loss_train) == 3
+    model.fit(X, y, callbacks=[TerminateOnStall(max_time=0.0)])
+    assert model.stopped_epoch == 1
+
+
+def test_MhaElmRegressor_compact_history():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 10, "pop_size": 10}
+    full = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                           optim_paras=opt_paras, verbose=False, seed=42).fit(X, y)
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    model.fit(X, y, history=History("compact", every=5))
+    assert np.allclose(model.loss_train, full.loss_train)
+    history = model.optimizer.history
+    assert len(history.list_global_best) == 1 and len(history.list_population) == 0
+    assert np.allclose(history.get_best_fitness(), full.optimizer.history.list_global_best_fit)
+    epochs, solutions = history.get_best_solutions()
+    assert list(epochs) == [5, 10] and solutions.shape == (2, model.network.get_ndim())
+    with pytest.raises(ValueError):
+        model.fit(X, y, history="compact", save_population=True)
+
+
+def test_MhaElmRegressor_optimizer_hooks():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    optimizer = GA.BaseGA(epoch=3, pop_size=10)
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim=optimizer, verbose=False, seed=42)
+    list_copies = []
+    model.fit(X, y, mode="batch", patience=5, history="compact",
+              callbacks=[lambda epoch, logs: list_copies.append(pickle.loads(pickle.dumps(model.optimizer)))])
+    # The hooked optimizer is pickled without the model, and the optimizer of the user is restored after fit()
+    assert all(type(copy) is GA.BaseGA and "_hooked_model" not in copy.__dict__ for copy in list_copies)
+    assert list_copies[-1].problem.obj_func.model.optimizer is None
+    assert type(optimizer) is GA.BaseGA and "_hooked_model" not in optimizer.__dict__
+
+    def failing_callback(epoch, logs):
+        raise RuntimeError("The training failed.")
+    with pytest.raises(RuntimeError):
+        model.fit(X, y, callbacks=[failing_callback])
+    assert type(optimizer) is GA.BaseGA and "_hooked_model" not in optimizer.__dict__
+
+
+def test_MhaElmRegressor_islands():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 6, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    model.fit(X, y, mode="batch", islands=Islands(["BaseGA", "OriginalDE"], migration_interval=2))
+    assert len(model.loss_train) == 6 and np.all(np.diff(model.loss_train) <= 0)
+    assert [stats["optimizer"] for stats in model.island_stats] == ["BaseGA", "OriginalDE"]
+    assert model.best_fit == min(stats["best_fit"] for stats in model.island_stats) == model.loss_train[-1]
+    assert model.population.shape == (10, model.network.get_ndim())
+    with pytest.raises(ValueError):
+        model.fit(X, y, islands=2, patience=3)
+    # A single island runs the same epochs as solve(), also with an optimizer that depends on the epoch
+    for optim in ("BaseGA", "OriginalGWO"):
+        model.set_params(optim=optim)
+        loss = model.fit(X, y, mode="batch").loss_train
+        assert np.allclose(model.fit(X, y, mode="batch", islands=Islands(1, migration_interval=4)).loss_train, loss)
+
+
+@pytest.mark.parametrize("search_space", ["full", "scale", "low_rank"])
+def test_MhaElmRegressor_feature_selection(search_space):
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 20))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 5, "pop_size": 10}
+    dense = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42, search_space=search_space, rank=2).fit(X, y)
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA", optim_paras=opt_paras,
+                            verbose=False, seed=42, search_space=search_space, rank=2, feature_selection=True,
+                            sparsity_penalty=0.1)
+    model.fit(X, y, mode="batch")
+    assert model.network.get_ndim() == dense.network.get_ndim() + 20
+    assert np.all(model.optimizer.problem.lb[-20:] == 0) and np.all(model.optimizer.problem.ub[-20:] == 1)
+    assert model.feature_mask.dtype == bool and 1 <= model.feature_mask.sum() <= 20
+    assert np.allclose(model.batch_fitness_function(model.population),
+                       [model.fitness_function(solution) for solution in model.population])
+    # The dropped features are not read by the prediction
+    X_dropped = X.copy()
+    X_dropped[:, ~model.feature_mask] = np.nan
+    assert np.allclose(model.predict(X_dropped), model.predict(X))
+
+
+@pytest.mark.parametrize("search_space", ["full", "scale", "low_rank"])
+def test_MhaElmRegressor_width_selection(search_space):
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 5, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(12, 8), act_name="sigmoid", obj_name="RMSE", optim="BaseGA", optim_paras=opt_paras,
+                            verbose=False, seed=42, search_space=search_space, rank=2, width_selection=True,
+                            width_penalty=0.1, feature_selection=True)
+    model.fit(X, y, mode="batch")
+    lb, ub = model.optimizer.problem.lb, model.optimizer.problem.ub
+    assert np.all(lb[-7:-5] == 1) and list(ub[-7:-5]) == [12, 8]
+    assert 1 <= model.active_sizes[0] <= 12 and 1 <= model.active_sizes[1] <= 8
+    assert [weight.shape[1] for weight in model.network.weights] == model.active_sizes
+    assert len(model.network.beta) == model.active_sizes[-1]
+    assert np.allclose(model.batch_fitness_function(model.population),
+                       [model.fitness_function(solution) for solution in model.population])
+    assert np.allclose(model.network.get_active_sizes(model.network.encode()), model.active_sizes)
+
+
+@pytest.mark.parametrize("search_space", ["full", "scale", "low_rank"])
+def test_MhaElmRegressor_auto_bounds(search_space):
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 5, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, 5), act_name="tanh", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42, search_space=search_space, rank=2)
+    model.fit(X, y, lb="auto", ub="auto")
+    lb, ub = model.optimizer.problem.lb, model.optimizer.problem.ub
+    assert lb.shape == ub.shape == (model.network.get_ndim(), )
+    assert np.all(lb < 0) and np.allclose(lb, -ub)
+    # The pre-activations of the first layer stay within the active range of tanh
+    assert np.std(np.dot(X, model.network.weights[0])) < 2 * model.network.ACTIVE_RANGES["tanh"]
+    with pytest.raises(ValueError):
+        model.fit(X, y, lb="auto", ub=(10., ))
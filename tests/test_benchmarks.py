@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+import copy
+
+import numpy as np
+
+from intelelm.benchmarks import run_benchmarks, compare_results, save_results, load_results
+
+
+def test_run_benchmarks(tmp_path):
+    results = run_benchmarks(datasets=["Iris", "diabetes"], hidden_sizes=(5, ), repeats=1, epochs=2, verbose=False)
+    assert len(results["results"]) == 4
+    for record in results["results"]:
+        assert record["fit_throughput"] > 0 and record["predict_throughput"] > 0 and record["peak_memory"] > 0
+        if record["model"] == "mha":
+            assert record["fitness_evals"] > 0 and record["fitness_evals_per_second"] > 0
+        else:
+            assert record["fitness_evals"] is None
+    path = tmp_path / "results.json"
+    save_results(results, path)
+    assert load_results(path) == results
+
+
+def test_run_benchmarks_bounds():
+    results = run_benchmarks(datasets=["diabetes"], models=["mha"], hidden_sizes=(5, ), repeats=1, epochs=3,
+                             bounds=("default", "auto"), verbose=False)
+    assert [record["bounds"] for record in results["results"]] == ["default", "auto"]
+    best = min(record["loss_curve"][-1][1] for record in results["results"])
+    for record in results["results"]:
+        assert len(record["loss_curve"]) == 3
+        assert np.isclose(record["target_loss"], best * 1.01)
+        final_evals, final_loss = record["loss_curve"][-1]
+        # Only the bounds ending within 1% of the best final loss reach the target
+        if final_loss <= record["target_loss"]:
+            assert record["evals_to_target"] <= final_evals
+        else:
+            assert record["evals_to_target"] is None
+    assert any(record["evals_to_target"] is not None for record in results["results"])
+
+
+def test_run_benchmarks_modes():
+    results = run_benchmarks(datasets=["diabetes"], models=["mha"], hidden_sizes=(5, ), solvers=("cholesky", ), repeats=1,
+                             epochs=2, modes=("swarm", "batch"), verbose=False)
+    assert [record["mode"] for record in results["results"]] == ["swarm", "batch"]
+    swarm, batch = results["results"]
+    assert swarm["speedup"] == 1.0 and batch["speedup"] == swarm["fit_time"] / batch["fit_time"]
+    # The modes evaluate the same solutions, the batch mode records one fitness duration per population
+    assert swarm["fitness_evals"] == batch["fitness_evals"]
+    assert np.allclose(swarm["loss_curve"], batch["loss_curve"])
+
+
+def test_compare_results():
+    record = {"dataset": "Iris", "model": "elm", "hidden_size": 10, "solver": "pinv", "fit_throughput": 100.0,
+              "predict_throughput": 1000.0, "fitness_evals_per_second": None, "peak_memory": 1000}
+    baseline = {"results": [record]}
+    current = copy.deepcopy(baseline)
+    assert compare_results(baseline, current) == []
+    current["results"][0].update(fit_throughput=50.0, predict_throughput=1200.0, peak_memory=2000)
+    regressions = compare_results(baseline, current, threshold=0.1)
+    assert sorted(reg["metric"] for reg in regressions) == ["fit_throughput", "peak_memory"]
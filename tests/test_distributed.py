@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+from multiprocessing import AuthenticationError
+
+import numpy as np
+import pytest
+
+from intelelm import MhaElmRegressor
+from intelelm.utils.distributed import WorkQueueBackend, run_worker
+
+np.random.seed(42)
+
+
+def get_model():
+    return MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                           optim_paras={"epoch": 5, "pop_size": 10}, verbose=False, seed=42)
+
+
+def test_WorkQueueBackend_workers():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+    expected = get_model().fit(X, y, mode="swarm").loss_train
+    expected_subsample = get_model().fit(X, y, mode="swarm", subsample=50).loss_train
+    with WorkQueueBackend(n_local_workers=2, task_size=3) as backend:
+        model = get_model().fit(X, y, mode="swarm", backend=backend)
+        assert np.allclose(model.loss_train, expected)
+        assert backend.stats["tasks"] > 0 and backend.stats["local"] == 0
+        model = get_model().fit(X, y, mode="swarm", backend=backend, subsample=50)
+        assert np.allclose(model.loss_train, expected_subsample)
+        with pytest.raises(ValueError):
+            get_model().fit(X, y, mode="single", backend=backend)
+
+
+def test_WorkQueueBackend_without_workers():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+    expected = get_model().fit(X, y, mode="batch").loss_train
+    # The tasks that no worker returns are evaluated by the model itself
+    with WorkQueueBackend(task_timeout=0.01, max_retries=1) as backend:
+        model = get_model().fit(X, y, mode="batch", backend=backend)
+        assert np.allclose(model.loss_train, expected)
+        assert backend.stats["local"] == backend.stats["tasks"] > 0
+
+
+def test_WorkQueueBackend_authkey():
+    # A reachable server needs an explicit secret, on loopback a random key is generated
+    with pytest.raises(ValueError):
+        WorkQueueBackend(address=("0.0.0.0", 0))
+    assert len(WorkQueueBackend().authkey) == 32 and WorkQueueBackend().authkey != WorkQueueBackend().authkey
+    with WorkQueueBackend() as backend:
+        with pytest.raises(AuthenticationError):
+            run_worker(backend.address, b"wrong key", max_reconnects=0)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pytest
+from permetrics import RegressionMetric, ClassificationMetric
+
+from intelelm.utils.metric import FitnessMetric, REGRESSION_KERNELS, CLASSIFICATION_LABEL_KERNELS
+
+np.random.seed(42)
+
+
+@pytest.mark.parametrize("name", list(REGRESSION_KERNELS.keys()))
+@pytest.mark.parametrize("n_outputs", [1, 3])
+def test_regression_kernels(name, n_outputs):
+    y_true = np.random.normal(size=(100, n_outputs))
+    y_preds = y_true + np.random.normal(scale=0.3, size=(4, 100, n_outputs))
+    metric = FitnessMetric(name, y_true, task="regression")
+    expected = [RegressionMetric(y_true, y_pred).get_metric_by_name(name)[name] for y_pred in y_preds]
+    assert metric.native
+    assert np.allclose(metric.batch(y_preds), expected)
+    assert np.allclose(metric(y_preds[0]), expected[0])
+
+
+@pytest.mark.parametrize("name", list(CLASSIFICATION_LABEL_KERNELS.keys()) + ["CEL"])
+def test_classification_kernels(name):
+    y_true = np.random.randint(0, 3, size=100)
+    if name == "CEL":
+        y_preds = np.random.uniform(size=(4, 100, 3))
+    else:
+        y_preds = np.random.randint(0, 3, size=(4, 100))
+    metric = FitnessMetric(name, y_true, task="classification")
+    expected = [ClassificationMetric(y_true, y_pred).get_metric_by_name(name)[name] for y_pred in y_preds]
+    assert metric.native
+    assert np.allclose(metric.batch(y_preds), expected)
+    assert np.isclose(metric(y_preds[0]), expected[0])
+
+
+def test_permetrics_fallback():
+    y_true = np.random.randint(0, 3, size=100)
+    y_pred = np.random.uniform(size=(100, 3))
+    metric = FitnessMetric("HL", y_true, task="classification")
+    assert not metric.native
+    assert np.isclose(metric(y_pred), ClassificationMetric(y_true, y_pred).get_metric_by_name("HL")["HL"])
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from intelelm import MhaElmRegressor
+from intelelm.utils.profiler import Profiler, record
+
+np.random.seed(42)
+
+
+def test_Profiler_nested_phases():
+    with Profiler() as profiler:
+        with record("outer"):
+            with record("inner"):
+                data = np.ones(100000)
+            del data
+    report = profiler.get_report().to_dataframe()
+    assert report.loc["inner", "count"] == 1
+    assert report.loc["outer", "total"] >= report.loc["inner", "total"]
+    # The peak of the nested phase is also counted in the outer phase
+    assert report.loc["outer", "peak_memory"] >= report.loc["inner", "peak_memory"] >= 800000
+    # Nothing is recorded without an active profiler
+    with record("outer"):
+        pass
+    assert profiler.get_report().to_dataframe().loc["outer", "count"] == 1
+
+
+def test_MhaElmRegressor_profile():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 3, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    with model.profile():
+        model.fit(X, y, mode="batch")
+        model.predict(X)
+    report = model.profile_report_.to_dataframe()
+    assert {"fit", "predict", "fitness", "forward", "solve", "metric", "optimizer"} <= set(report.index)
+    assert report.loc["optimizer", "count"] == 3
+    assert report.loc["fit", "total"] >= report.loc["fitness", "total"]
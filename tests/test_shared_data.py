@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+import os
+import pickle
+import numpy as np
+
+from intelelm import MhaElmRegressor
+from intelelm.utils.shared_data import SharedDataset, SharedArray
+
+np.random.seed(42)
+
+
+def test_SharedDataset_pickle_by_name():
+    X = np.random.uniform(size=(1000, 20))
+    with SharedDataset() as dataset:
+        shared = dataset.share(X)
+        assert dataset.share(X) is shared
+        data = pickle.dumps(shared)
+        assert len(data) < 1000
+        loaded = pickle.loads(data)
+        assert isinstance(loaded, SharedArray) and np.array_equal(loaded, X)
+        # Views are not backed by the whole file, they are pickled by value
+        assert np.array_equal(pickle.loads(pickle.dumps(shared[:10])), X[:10])
+    assert not os.path.exists(dataset.path)
+
+
+def test_MhaElmRegressor_process_shared_data():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+
+    opt_paras = {"epoch": 2, "pop_size": 10}
+    model = MhaElmRegressor(layer_sizes=(10, ), act_name="elu", obj_name="RMSE", optim="BaseGA",
+                            optim_paras=opt_paras, verbose=False, seed=42)
+    model.fit(X, y, mode="process")
+    assert np.all(np.isfinite(model.loss_train))
+    assert not isinstance(model.X_temp, SharedArray)
+    assert not isinstance(model.fitness_context.X, SharedArray)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pytest
+from intelelm import ElmRegressor
+from intelelm.utils.solver import solve_output_weights, SUPPORTED_SOLVERS
+
+
+@pytest.mark.parametrize("shape", [(200, 10), (10, 50)])
+@pytest.mark.parametrize("solver", SUPPORTED_SOLVERS)
+def test_solve_output_weights(shape, solver):
+    generator = np.random.default_rng(42)
+    H = generator.standard_normal(size=shape)
+    y = generator.standard_normal(size=(shape[0], 2))
+    beta = solve_output_weights(H, y, solver=solver, alpha=0.)
+    assert np.allclose(beta, np.linalg.pinv(H) @ y)
+    if shape[0] >= shape[1]:
+        ridge = np.linalg.solve(H.T @ H + 0.5 * np.eye(shape[1]), H.T @ y)
+    else:
+        ridge = H.T @ np.linalg.solve(H @ H.T + 0.5 * np.eye(shape[0]), y)
+    assert np.allclose(solve_output_weights(H, y, solver=solver, alpha=0.5), ridge)
+
+
+@pytest.mark.parametrize("solver", SUPPORTED_SOLVERS)
+def test_solver_rank_deficient(solver):
+    H = np.ones((100, 5))
+    beta = solve_output_weights(H, np.ones(100), solver=solver)
+    assert np.allclose(beta, 0.2)
+
+
+def test_ElmRegressor_solver():
+    X = np.random.uniform(low=0.0, high=1.0, size=(100, 5))
+    y = 2 * X[:, 0] + 1
+    pred_pinv = ElmRegressor(layer_sizes=(10, ), act_name="elu", seed=42).fit(X, y).predict(X)
+    pred_auto = ElmRegressor(layer_sizes=(10, ), act_name="elu", seed=42, solver="auto").fit(X, y).predict(X)
+    assert np.allclose(pred_pinv, pred_auto)